@@ -0,0 +1,169 @@
+import numpy as np
+from typing import Optional, Sequence, Tuple
+
+from scaled_propagation import cascade_scaled, combine_feed_states
+from solver_kernel import BatchedFeedSolver, apply_abcd, line_section_abcd, unit_line_parameters
+
+
+def build_adaptive_mesh(num_grids: int, anchors: Sequence[int], max_cell: int, refine_radius: int = 4,
+                        growth: float = 1.3) -> np.ndarray:
+    """在均匀网格的节点 0..num_grids 中选取自适应网格的节点
+
+    元件/馈电所在网格段 k 两侧 refine_radius 个网格段内保留全部节点，
+    远离元件处网格按 growth 的比例逐渐变粗，最长 max_cell 个网格步长。
+
+    参数：
+        num_grids: 均匀网格数（节点 num_grids 为右端边界）
+        anchors: 元件和馈电的网格索引
+        max_cell: 最长网格（以原网格步长计）
+        refine_radius: 元件两侧保持原网格步长的网格段数
+        growth: 相邻网格长度的最大比例
+
+    返回：
+        np.ndarray，升序的原网格节点序号，包含 0 和 num_grids
+    """
+    max_cell = max(1, int(max_cell))
+    anchors = np.unique([a for a in anchors if 0 <= a < num_grids])
+    # 必须保留的节点：元件网格段的两端及其邻域
+    required = set()
+    for k in anchors:
+        required.update(range(max(0, k - refine_radius), min(num_grids, k + 1 + refine_radius) + 1))
+    required.update((0, num_grids))
+    required = np.array(sorted(required))
+
+    nodes = [0]
+    position = 0
+    while position < num_grids:
+        next_required = required[np.searchsorted(required, position, side='right')]
+        if anchors.size:
+            # 与前后最近元件的距离（网格数）决定本网格的长度上限
+            i = np.searchsorted(anchors, position, side='right')
+            distance_before = position - (anchors[i - 1] + 1) if i > 0 else np.inf
+            distance_after = anchors[i] - position if i < anchors.size else np.inf
+            length = min(1 + (growth - 1) * distance_before, (1 + (growth - 1) * distance_after) / growth)
+        else:
+            length = max_cell
+        length = int(max(1, min(max_cell, length)))
+        position = min(position + length, next_required)
+        nodes.append(position)
+    return np.array(nodes)
+
+
+class AdaptiveMeshSolver:
+    """非均匀自适应网格求解器
+
+    Antenna 中的索引仍以均匀网格为准；求解时只在元件/馈电附近保留原网格，
+    平直传输线段合并为长网格，每个网格的 RLGC 按其长度（原网格步长的整数倍）计算，
+    用闭式解得到其 ABCD。节点数通常减少一个数量级以上，而馈电阻抗与均匀网格完全一致。
+    沿合并网格内部的电压/电流由网格起点状态按闭式解精确恢复到原网格，
+    因此结果形状、归一化与 NodalSolver / ScaledPropagationSolver 相同。
+    """
+
+    def __init__(self, solver: BatchedFeedSolver, max_cell: Optional[int] = None, refine_radius: int = 4,
+                 growth: float = 1.3, points_per_wavelength: int = 40):
+        """
+        max_cell 缺省时按最高频率下每个波长至少 points_per_wavelength 个网格确定。
+        """
+        self.solver = solver
+        if max_cell is None:
+            max_cell = self._default_max_cell(points_per_wavelength)
+        self.max_cell = max_cell
+        anchors = solver.table.indices[solver.table.indices >= 0].tolist()
+        self.mesh_nodes = build_adaptive_mesh(solver.num_grids, anchors, max_cell, refine_radius, growth)
+        self.cell_lengths = np.diff(self.mesh_nodes)
+
+    @classmethod
+    def from_data_source(cls, data_source, frequencies_ghz=None, load_impedance: complex = 50.0, **options):
+        return cls(BatchedFeedSolver.from_data_source(data_source, frequencies_ghz, load_impedance), **options)
+
+    def _default_max_cell(self, points_per_wavelength: int) -> int:
+        """最高频率下，一个波长至少包含 points_per_wavelength 个自适应网格"""
+        beta = np.abs(self.solver.gamma.imag)
+        if beta.size == 0 or np.max(beta) == 0:
+            return 1
+        return max(1, int(2 * np.pi / (points_per_wavelength * np.max(beta))))
+
+    def cell_rlgc(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """各自适应网格的 (R, L, G, C)，为单位网格 RLGC 乘以网格长度"""
+        lengths = self.cell_lengths.astype(float)
+        return tuple(value * lengths for value in self.solver.rlgc_per_step)
+
+    def cell_matrices(self, sections, frequency_slice=slice(None)) -> np.ndarray:
+        """各自适应网格的 ABCD 矩阵 (网格数, F, 2, 2)；元件网格取元件矩阵"""
+        frequencies = self.solver.frequencies_ghz[frequency_slice]
+        R, L, G, C = (value[:, None] for value in self.cell_rlgc())
+        gamma, zc = unit_line_parameters((R, L, G, C), frequencies)
+        matrices = line_section_abcd(gamma, zc, 1)
+        starts = self.mesh_nodes[:-1]
+        for index, abcd in sections.items():
+            cell = np.searchsorted(starts, index)
+            if cell < starts.size and starts[cell] == index and self.cell_lengths[cell] == 1:
+                matrices[cell] = abcd[frequency_slice]
+        return matrices
+
+    @property
+    def node_count(self) -> int:
+        """自适应网格的节点数（不含右端边界）"""
+        return len(self.mesh_nodes) - 1
+
+    def solve(self, chunk_size: int = 128, expand: bool = True) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """求解全部频点和馈电
+
+        expand=True 时返回原均匀网格上的 (电压, 电流, 输入阻抗)，形状同 NodalSolver.solve；
+        否则电压/电流只包含自适应网格节点 mesh_nodes[:-1]。
+        """
+        solver = self.solver
+        N = solver.num_grids
+        num_freqs = len(solver.frequencies_ghz)
+        num_feeds = len(solver.feed_rows)
+        num_nodes = N if expand else self.node_count
+        voltage = np.full((num_freqs, num_nodes, num_feeds), np.nan + 0j, dtype=complex)
+        current = np.full((num_freqs, num_nodes, num_feeds), np.nan + 0j, dtype=complex)
+        impedance = np.full((num_freqs, num_feeds), np.nan + 0j, dtype=complex)
+        if N < 1:
+            return voltage, current, impedance
+
+        sections = solver.section_matrices()
+        for start in range(0, num_freqs, chunk_size):
+            frequency_slice = slice(start, min(start + chunk_size, num_freqs))
+            matrices = self.cell_matrices(sections, frequency_slice)
+            for column, feed_index in enumerate(solver.table.feed_indices.tolist()):
+                if not 0 <= feed_index < N:
+                    if start == 0:
+                        print(f"馈电节点索引 {feed_index} 无效，跳过此馈电点。")
+                    continue
+                cell = int(np.searchsorted(self.mesh_nodes, feed_index))
+                # 馈电自身所在的网格段不参与本馈电的求解
+                left, left_log = cascade_scaled(matrices[:cell], inverse=False)
+                right, right_log = cascade_scaled(matrices[cell + 1:], inverse=True)
+                states, Z = combine_feed_states(left, left_log, right, right_log)
+                impedance[frequency_slice, column] = Z
+                if expand:
+                    states = self._expand_states(states, solver.gamma[frequency_slice],
+                                                 solver.zc[frequency_slice])[:N]
+                    # 与打靶法输出一致：馈电节点的电流取两侧电流之和
+                    if 0 < feed_index < N - 1:
+                        states[feed_index, :, 1] = states[feed_index - 1, :, 1] + states[feed_index + 1, :, 1]
+                else:
+                    states = states[:-1]
+                voltage[frequency_slice, :, column] = states[..., 0].T
+                current[frequency_slice, :, column] = states[..., 1].T
+        return voltage, current, impedance
+
+    def _expand_states(self, mesh_states: np.ndarray, gamma: np.ndarray, zc: np.ndarray) -> np.ndarray:
+        """由自适应网格节点状态恢复原网格所有节点的状态 (num_grids + 1, F, 2)
+
+        长度为 m 的网格内部第 j 个节点的状态为 U^j 乘以网格起点状态，U 为单位网格 ABCD；
+        长度相同的网格共享 U^j，一次批量计算。
+        """
+        states = np.empty((self.solver.num_grids + 1,) + mesh_states.shape[1:], dtype=complex)
+        states[self.mesh_nodes] = mesh_states
+        starts = self.mesh_nodes[:-1]
+        for length in np.unique(self.cell_lengths[self.cell_lengths > 1]):
+            cells = np.flatnonzero(self.cell_lengths == length)
+            offsets = np.arange(1, length)
+            powers = line_section_abcd(gamma[None, :] * offsets[:, None], zc[None, :], 1)  # (m-1, F, 2, 2)
+            with np.errstate(over='ignore', invalid='ignore'):
+                interior = apply_abcd(powers[None], mesh_states[cells][:, None])  # (网格, m-1, F, 2)
+            states[(starts[cells][:, None] + offsets[None, :]).ravel()] = interior.reshape((-1,) + interior.shape[2:])
+        return states
@@ -1,10 +1,15 @@
 import numpy as np
-import cmath
-import math
 from PyQt5 import QtCore, QtWidgets # 添加 QtWidgets 导入
 from antsim_data import AntSimData # 导入基础数据类
 # 修改相对导入为绝对导入
 from calculation import ElementCalculation, FeedCalculation
+from element_table import ElementKind, element_table_of
+import solver_backends
+from solver_kernel import BatchedFeedSolver, line_section_abcd, unit_line_parameters
+from progress import ProgressReporter
+from sweep_result import LazySweepResult
+from multiport import MultiportSolver
+from result_cache import input_hash
 from result_plot import ResultPlot
 
 import matplotlib.pyplot as plt
@@ -18,9 +23,14 @@ class AntSimCalculator(QtCore.QObject):
     """
     calculation_started = QtCore.pyqtSignal()
     calculation_progress = QtCore.pyqtSignal(int) # 报告进度 (0-100)
+    progress_info = QtCore.pyqtSignal(object) # 详细进度 {'done', 'total', 'percent', 'rate', 'elapsed', 'eta'}，见 ProgressReporter
     calculation_complete = QtCore.pyqtSignal(object, object, object, object) # 发射结果 (V, I, Zin, Gamma)
     error_occurred = QtCore.pyqtSignal(str) # 报告错误信息
 
+    # 可选的求解方法：'auto'（按问题规模自动选择后端）、打靶法（逐频点逐网格段 ABCD 级联），
+    # 以及 solver_backends 中注册的批量求解后端（nodal、scaled、adaptive、compiled 等）
+    SOLVER_METHODS = ('auto', 'shooting') + tuple(solver_backends.backend_names(available_only=False))
+
     def __init__(self, data_source: AntSimData, result_widget=None, parent=None):
         super().__init__(parent)
         self.data_source = data_source
@@ -31,48 +41,73 @@ class AntSimCalculator(QtCore.QObject):
         # 存储单频点计算结果
         self.single_freq_voltage_matrix = None
         self.single_freq_current_matrix = None
+        self.single_freq_ghz = None # 单频点结果对应的频率（GHz）
         # 存储频率扫描计算结果
         self.sweep_voltage_matrix = None
         self.sweep_current_matrix = None
-        self.input_impedance_array = None # (频率数)
-        self.reflection_coefficient_array = None # (频率数)
+        self.input_impedance_array = None # (频率数, 馈电数)
+        self.reflection_coefficient_array = None # (频率数, 馈电数)
+        self.single_freq_input_impedance = None # (馈电数)
+        self.single_freq_reflection_coefficient = None # (馈电数)
         self.load_impedance = 50 + 0j # 默认或从数据中设置
+        self.solver_method = 'auto' # 当前求解方法，见 SOLVER_METHODS
+        self.last_backend = None # 最近一次实际使用的求解后端
+        self.progress_interval = 0.1 # 进度报告的最小间隔（s）
+        self.sweep_chunk_size = 64 # 批量求解频率扫描时每块的频点数（每块之后报告一次进度）
+        self.lazy_sweep = True # 批量求解时频率扫描只计算馈电量，电压/电流分布按需计算
+        self.sweep_cache_size = 8 # 按需计算时缓存的频点分布个数
+        self.sweep_result = None # 最近一次按需计算的扫描结果（LazySweepResult）
+        self.multiport_network = None # 最近一次计算的馈电端口多端口网络（MultiportNetwork）
+        self.result_cache = None # 扫描结果的磁盘缓存（ResultCache），为 None 时不使用
+        self.sweep_key = None # 当前扫描结果对应的输入哈希（result_cache.input_hash），用作缓存键
 
         # 内部状态
         self._antenna_abcd_matrices = {} # 存储当前频率的 Antenna ABCD
         self._abcd_matrix_complete = None # 存储当前频率的完整 ABCD
+        self._unit_abcd_cache = None # (RLGC, 频率数组, GHz 频率, {频率: 序号}, 单位网格 ABCD 栈)，见 _unit_abcd_stack
+
+        # 数据变化后的自动重算由 auto_trigger.AutoRecompute 在后台完成（设置中的“自动触发”），
+        # 不在此处同步连接 run_frequency_sweep
+
+    def _unit_abcd_stack(self):
+        """完整频率数组上的单位网格 ABCD 矩阵，对整个频率数组一次向量化计算
 
-        # 连接数据源的更新信号，以便在数据变化时可以触发重新计算（如果需要自动）
-        # self.data_source.data_updated.connect(self.run_frequency_sweep) # 例如：数据变了就自动重算
+        按 (单位网格 RLGC, 频率数组对象) 缓存：只有传输线、网格或频率设置改变时才重新计算，
+        元件值的修改不影响。数据源没有 get_freq_array()（只提供 GHz 频率）时按频率数组的内容比较。
+        返回 (频率 GHz -> 序号 的字典, 形状 (F, 2, 2) 的 ABCD)。
+        """
+        rlgc = tuple(float(value) for value in self.data_source.get_unit_rlgc_per_step())
+        cache = self._unit_abcd_cache
+        if hasattr(self.data_source, 'get_freq_array'):
+            freq_array = self.data_source.get_freq_array()
+            frequencies_ghz = np.asarray(freq_array, dtype=float) / 1e9
+            # 缓存中保留频率数组本身，按对象比较，数组被替换（频率设置改变）后即失效
+            stale = cache is None or cache[1] is not freq_array
+        else:
+            freq_array = None
+            frequencies_ghz = np.asarray(self.data_source.get_freq_array_ghz(), dtype=float)
+            stale = cache is None or cache[1] is not None or not np.array_equal(cache[2], frequencies_ghz)
+        if stale or cache[0] != rlgc:
+            gamma, zc = unit_line_parameters(rlgc, frequencies_ghz)
+            stack = line_section_abcd(gamma, zc, 1)
+            stack.flags.writeable = False
+            positions = {frequency: i for i, frequency in enumerate(frequencies_ghz.tolist())}
+            cache = self._unit_abcd_cache = (rlgc, freq_array, frequencies_ghz, positions, stack)
+        return cache[3], cache[4]
 
     def _calculate_unit_abcd_matrix(self, current_frequency):
-        """根据存储的单位网格 RLGC 和当前频率计算单位网格的 ABCD 矩阵"""
-        R, L, G, C = self.data_source.get_unit_rlgc_per_step()
+        """单位网格在 current_frequency（GHz）上的 ABCD 矩阵
+
+        频点在扫描频率数组中时直接取缓存的 ABCD 栈（见 _unit_abcd_stack），否则单独计算该频点。
+        """
         try:
-            # 假设 current_frequency 单位是 GHz，需要转换为 Hz
-            current_frequency_hz = current_frequency * 1e9  
-            omega = 2 * math.pi * current_frequency_hz
-            Z = R + 1j * omega * L
-            Y = G + 1j * omega * C
-            gamma = cmath.sqrt(Z * Y)
-            Zc = float('inf') + 0j
-            if Y != 0:
-                try: Zc = cmath.sqrt(Z / Y)
-                except ZeroDivisionError: pass
-    
-            cosh_gamma = cmath.cosh(gamma)
-            sinh_gamma = cmath.sinh(gamma)
-            A = D = cosh_gamma
-            C_abcd = 0 + 0j
-            if Zc != 0 and not cmath.isinf(Zc): C_abcd = (1 / Zc) * sinh_gamma
-            B = Zc * sinh_gamma
-            abcd_matrix = np.array([[A, B], [C_abcd, D]], dtype=complex)
-            
-            # 新增打印语句
-            print(f"频率 {current_frequency} GHz 的单位 ABCD 矩阵值为:\n{abcd_matrix}")
-            
-            return abcd_matrix
-        except (ValueError, ZeroDivisionError, TypeError) as e:
+            positions, stack = self._unit_abcd_stack()
+            index = positions.get(float(current_frequency))
+            if index is not None:
+                return stack[index]
+            gamma, zc = unit_line_parameters(self.data_source.get_unit_rlgc_per_step(), [current_frequency])
+            return line_section_abcd(gamma, zc, 1)[0]
+        except (ValueError, TypeError) as e:
             msg = f"计算频率 {current_frequency} GHz 的单位 ABCD 矩阵时出错: {e}"
             print(msg)
             self.error_occurred.emit(msg)
@@ -80,7 +115,7 @@ class AntSimCalculator(QtCore.QObject):
 
     def _update_antenna_abcd(self, freq):
         # 假设 freq 单位是 GHz，已经正确传递给 ElementCalculation 和 FeedCalculation
-        antenna_elements = self.data_source.antenna_elements_data
+        table = element_table_of(self.data_source)
         self._antenna_abcd_matrices = {}
     
         if self._abcd_matrix_complete is None:
@@ -88,14 +123,17 @@ class AntSimCalculator(QtCore.QObject):
             self.error_occurred.emit("错误: _abcd_matrix_complete 为 None，无法更新天线 ABCD 矩阵。")
             return
     
-        for index, element in enumerate(antenna_elements):
-            element_type = element['类型']
-            element_str = element['值']
+        for record in table:
+            index = record.row
+            element_type = table.elements[index].get('类型')
+            element_str = record.value
+            if record.diagnostics:
+                continue # 未通过校验的行已在元件表中标出，计算时直接跳过
     
             try:
-                if element_type == '元件':
+                if record.kind == ElementKind.ELEMENT:
                     abcd_matrix_4x1 = ElementCalculation(element_str, freq)  # 假设 freq 单位是 GHz
-                elif element_type == '馈电':
+                elif record.kind == ElementKind.FEED:
                     abcd_matrix_4x1 = FeedCalculation(element_str, freq)  # 假设 freq 单位是 GHz
                 else:
                     print(f"未知的元件类型: {element_type}")
@@ -108,16 +146,25 @@ class AntSimCalculator(QtCore.QObject):
                 else:
                     abcd_matrix_2x2 = abcd_matrix_4x1
     
-                if 0 <= index < len(self._abcd_matrix_complete):
-                    self._abcd_matrix_complete[index] = abcd_matrix_2x2
+                # 元件的 ABCD 矩阵放在其网格索引处（而不是其在表格中的行号）
+                grid_index = record.index
+                if 0 <= grid_index < len(self._abcd_matrix_complete):
+                    self._abcd_matrix_complete[grid_index] = abcd_matrix_2x2
                 else:
-                    print(f"索引 {index} 超出 _abcd_matrix_complete 的范围，跳过此赋值。")
-                    self.error_occurred.emit(f"索引 {index} 超出 _abcd_matrix_complete 的范围，跳过此赋值。")
+                    print(f"索引 {grid_index} 超出 _abcd_matrix_complete 的范围，跳过此赋值。")
+                    self.error_occurred.emit(f"索引 {grid_index} 超出 _abcd_matrix_complete 的范围，跳过此赋值。")
     
             except Exception as e:
                 print(f"计算 {element_type} {index} 的 ABCD 矩阵时出错: {e}")
                 self.error_occurred.emit(f"计算 {element_type} {index} 的 ABCD 矩阵时出错: {e}")
 
+    @staticmethod
+    def _report_invalid_rows(table):
+        """每次计算开始时在控制台列出一次被跳过的无效行（界面上已在元件表中标出）"""
+        summary = table.invalid_summary()
+        if summary:
+            print(f"以下 {len(table.invalid_rows)} 行未通过校验，计算时跳过：\n{summary}")
+
     def _update_complete_abcd(self, freq):
         # 获取网格数组
         grid_array = self.data_source.get_grid_array()
@@ -133,25 +180,40 @@ class AntSimCalculator(QtCore.QObject):
         # 再调用 _update_antenna_abcd 函数，给 antenna 节点附上相应的 abcd 矩阵值
         self._update_antenna_abcd(freq)
 
-    def _calculate_voltage_current_distribution(self, freq_index, current_frequency, is_single_freq=False):
+    @staticmethod
+    def _port_impedance(left_voltage, left_current, right_voltage, right_current):
+        """根据馈电点两侧的打靶结果计算端口输入阻抗
+
+        左右两侧电流均以指向左侧为正，因此左侧网络阻抗为 V_L/I_L，
+        右侧网络阻抗为 -V_R/I_R，端口输入阻抗为两者并联。
+        """
+        denominator = left_current * right_voltage - right_current * left_voltage
+        if denominator == 0:
+            return complex(np.inf, 0)
+        return left_voltage * right_voltage / denominator
+
+    def _solve_frequency(self, current_frequency):
+        """求解单个频点（GHz）
+
+        返回 (电压列表, 电流列表, 输入阻抗列表)，每个有效馈电对应一项；
+        网格为空时返回 None。
+        """
         self._update_complete_abcd(current_frequency)
         # 1. 先检查 antenna 数据，看有几个类型为馈电的
-        antenna_elements = self.data_source.antenna_elements_data
-        feed_points = [element for element in antenna_elements if element['类型'] == '馈电']
-        num_feeds = len(feed_points)
+        feed_indices = element_table_of(self.data_source).feed_indices.tolist()
         grid_array = self.data_source.get_grid_array()
         num_grids = len(grid_array)
     
         if num_grids < 1:
-            return  # 至少需要一个点
+            return None  # 至少需要一个点
     
         all_voltages = []
         all_currents = []
+        all_impedances = []
     
         # 3. 遍历 antenna 中为馈电类型的节点
-        for feed_point in feed_points:
-            feed_index = feed_point.get('索引')
-            if feed_index is None or feed_index < 0 or feed_index >= num_grids:
+        for feed_index in feed_indices:
+            if feed_index < 0 or feed_index >= num_grids:
                 print(f"馈电节点索引 {feed_index} 无效，跳过此馈电点。")
                 continue
     
@@ -192,6 +254,10 @@ class AntSimCalculator(QtCore.QObject):
     
             left_voltage = voltage_boundary[feed_index + 1]
             right_voltage = voltage_boundary[feed_index + 2]
+            all_impedances.append(self._port_impedance(
+                left_voltage, current_boundary[feed_index + 1],
+                right_voltage, current_boundary[feed_index + 2]
+            ))
             if right_voltage != 0:
                 factor = left_voltage / right_voltage
                 voltage_boundary[feed_index + 2:] *= factor
@@ -203,29 +269,160 @@ class AntSimCalculator(QtCore.QObject):
     
             all_voltages.append(voltage_boundary[1:-1])
             all_currents.append(current_boundary[1:-1])
+
+        return all_voltages, all_currents, all_impedances
+
+    def _calculate_voltage_current_distribution(self, freq_index, current_frequency, is_single_freq=False):
+        result = self._solve_frequency(current_frequency)
+        if result is None:
+            return
+        all_voltages, all_currents, all_impedances = result
     
         if all_voltages and all_currents:
+            num_solved = len(all_impedances)
+            input_impedance = np.array(all_impedances, dtype=complex)
+            reflection = self._reflection_coefficient(input_impedance)
             if is_single_freq:
                 self.single_freq_voltage_matrix = np.array(all_voltages).T
+                self.single_freq_input_impedance = input_impedance
+                self.single_freq_reflection_coefficient = reflection
             self.single_freq_current_matrix = np.array(all_currents).T
             print(f"单频点电流矩阵（频率{current_frequency} GHz）: {self.single_freq_current_matrix}")
             if is_single_freq is False:  # 检查是否不是单频点计算
                 self.sweep_voltage_matrix[freq_index, :, :len(all_voltages)] = np.array(all_voltages).T
                 self.sweep_current_matrix[freq_index, :, :len(all_currents)] = np.array(all_currents).T
+                self.input_impedance_array[freq_index, :num_solved] = input_impedance
+                self.reflection_coefficient_array[freq_index, :num_solved] = reflection
                 print(f"频率扫描点{freq_index}（频率{current_frequency} GHz）电流矩阵: {self.sweep_current_matrix[freq_index, :, :len(all_currents)]}")
 
+    def _reflection_coefficient(self, input_impedance):
+        """以 load_impedance 为参考阻抗计算反射系数"""
+        z_ref = self.load_impedance
+        with np.errstate(divide='ignore', invalid='ignore'):
+            gamma = (input_impedance - z_ref) / (input_impedance + z_ref)
+        # 输入阻抗为无穷大（开路）时反射系数为 1
+        return np.where(np.isinf(input_impedance), 1.0 + 0j, gamma)
+
+    def set_solver_method(self, method):
+        """选择求解方法（见 SOLVER_METHODS），各方法结果可相互比较"""
+        if method not in ('auto', 'shooting') and method not in solver_backends.backend_names(available_only=False):
+            msg = f"未知的求解方法: {method}"
+            print(msg)
+            self.error_occurred.emit(msg)
+            return
+        self.solver_method = method
+        print(f"求解方法已切换为: {method}")
+
+    def _emit_progress(self, info):
+        self.calculation_progress.emit(info['percent'])
+        self.progress_info.emit(info)
+
+    def _solve_batched(self, frequencies_ghz, quantities=solver_backends.QUANTITIES, progress=None):
+        """用求解后端（'auto' 时自动选择）一次求解多个频点，返回 {量: 数组}，失败时返回 None
+
+        电压/电流形状为 (频率数, 网格数, 馈电数)，按单位馈电电流归一化；输入阻抗形状为 (频率数, 馈电数)。
+        传入 progress(已完成频点数) 时按 sweep_chunk_size 分块求解，每块之后回调一次。
+        """
+        kernel = BatchedFeedSolver.from_data_source(self.data_source, frequencies_ghz, self.load_impedance)
+        try:
+            if progress is None:
+                self.last_backend, result = solver_backends.solve(kernel, quantities, self.solver_method)
+            else:
+                self.last_backend, result = solver_backends.solve_chunked(
+                    kernel, quantities, self.solver_method, self.sweep_chunk_size, progress)
+        except ValueError as e:
+            msg = f"求解失败: {e}"
+            print(msg)
+            self.error_occurred.emit(msg)
+            return None
+        print(f"使用求解后端: {self.last_backend}")
+        return result
+
+    def calculate_feed_impedance(self, frequencies_ghz):
+        """在给定频点（GHz）上逐点精确求解各馈电的输入阻抗
+
+        不改动已存储的单频/扫描结果，供代理模型等功能调用。
+        返回形状为 (频率数, 馈电数) 的复数数组，无效馈电对应 NaN。
+        """
+        frequencies_ghz = np.atleast_1d(np.asarray(frequencies_ghz, dtype=float))
+        num_feeds = element_table_of(self.data_source).num_feeds
+        impedances = np.full((len(frequencies_ghz), num_feeds), np.nan + 0j, dtype=complex)
+        if self.solver_method != 'shooting':
+            result = self._solve_batched(frequencies_ghz, ('impedance',))
+            return impedances if result is None else result['impedance']
+        for i, freq in enumerate(frequencies_ghz):
+            result = self._solve_frequency(freq)
+            if result is None:
+                continue
+            all_impedances = result[2]
+            impedances[i, :len(all_impedances)] = all_impedances
+        return impedances
+
+    def calculate_multiport(self, frequencies_ghz=None):
+        """计算全部馈电端口之间的 Z/Y/S 矩阵（默认使用扫描频率），返回 MultiportNetwork，失败时返回 None
+
+        每个频点只分解一次节点导纳矩阵，所有端口共用；结果保存在 multiport_network。
+        """
+        if frequencies_ghz is None:
+            frequencies_ghz = self.data_source.get_freq_array_ghz()
+        frequencies_ghz = np.atleast_1d(np.asarray(frequencies_ghz, dtype=float))
+        if len(frequencies_ghz) == 0 or len(self.data_source.get_grid_array()) == 0:
+            msg = "频率点或网格点数量为零，无法计算多端口参数。"
+            print(msg)
+            self.error_occurred.emit(msg)
+            return None
+        solver = MultiportSolver.from_data_source(self.data_source, frequencies_ghz, self.load_impedance)
+        if not solver.solver.feed_rows:
+            msg = "没有馈电，无法计算多端口参数。"
+            print(msg)
+            self.error_occurred.emit(msg)
+            return None
+        self.multiport_network = solver.solve()
+        print(f"多端口参数计算完成：{self.multiport_network.num_ports} 个端口，{len(frequencies_ghz)} 个频点")
+        return self.multiport_network
+
+    def export_touchstone(self, path: str, data_format: str = 'RI') -> bool:
+        """把扫描频率上馈电端口的 S 参数写成 Touchstone 文件（.sNp，N 为馈电数），成功返回 True
+
+        按 sweep_chunk_size 分块求解，每块算完即写入文件并报告进度，不保留整个扫描的矩阵。
+        """
+        frequencies_ghz = self.data_source.get_freq_array_ghz()
+        if len(frequencies_ghz) == 0 or len(self.data_source.get_grid_array()) == 0:
+            msg = "频率点或网格点数量为零，无法导出 Touchstone 文件。"
+            print(msg)
+            self.error_occurred.emit(msg)
+            return False
+        solver = MultiportSolver.from_data_source(self.data_source, frequencies_ghz, self.load_impedance)
+        if not solver.solver.feed_rows:
+            msg = "没有馈电，无法导出 Touchstone 文件。"
+            print(msg)
+            self.error_occurred.emit(msg)
+            return False
+        reporter = ProgressReporter(len(frequencies_ghz), self._emit_progress, self.progress_interval)
+        reporter.update(0)
+        try:
+            solver.write_touchstone(path, self.sweep_chunk_size, reporter.update, data_format,
+                                    comments=["AntSim 馈电端口 S 参数"])
+        except (ValueError, OSError) as e:
+            msg = f"导出 Touchstone 文件失败: {e}"
+            print(msg)
+            self.error_occurred.emit(msg)
+            return False
+        print(f"已导出 Touchstone 文件：{path}")
+        return True
+
     def run_frequency_sweep(self):
         """执行整个频率扫描计算"""
         self.calculation_started.emit()
         print("开始频率扫描计算...")
 
-        freq_array = self.data_source.get_freq_array()
+        freq_array = self.data_source.get_freq_array_ghz() # 计算统一使用 GHz
         grid_array = self.data_source.get_grid_array()
         num_freqs = len(freq_array)
         num_grids = len(grid_array)
-        antenna_elements = self.data_source.antenna_elements_data
-        feed_points = [element for element in antenna_elements if element['类型'] == '馈电']
-        num_feeds = len(feed_points)
+        table = element_table_of(self.data_source)
+        num_feeds = table.num_feeds
+        self._report_invalid_rows(table)
 
         if num_freqs == 0 or num_grids == 0:
             msg = "频率点或网格点数量为零，无法计算。"
@@ -234,21 +431,56 @@ class AntSimCalculator(QtCore.QObject):
             self.calculation_complete.emit(None, None, None, None) # 发射空结果
             return
 
+        # 输入与缓存中的某次扫描完全一致时直接载入
+        if self.load_cached_sweep():
+            return
+        sweep_key = input_hash(self.data_source, self.load_impedance, self._cache_family())
+        self.sweep_key = None
+
+        # 按时间节流报告进度（含速率、已用时间和剩余时间）
+        reporter = ProgressReporter(num_freqs, self._emit_progress, self.progress_interval)
+        reporter.update(0)
+        self.sweep_result = None
+        failed = False
+
+        if self.solver_method != 'shooting' and self.lazy_sweep:
+            # 只计算馈电输入阻抗，电压/电流分布在被查看时按频点计算
+            if self._run_lazy_sweep(freq_array, reporter.update) is None:
+                reporter.update(num_freqs)
+                failed = True
+            freq_array = [] # 跳过逐频点的打靶法循环
+
         # 初始化频率扫描结果矩阵
-        self.sweep_voltage_matrix = np.zeros((num_freqs, num_grids, num_feeds), dtype=complex)
-        self.sweep_current_matrix = np.zeros((num_freqs, num_grids, num_feeds), dtype=complex)
+        if self.sweep_result is None:
+            self.sweep_voltage_matrix = np.zeros((num_freqs, num_grids, num_feeds), dtype=complex)
+            self.sweep_current_matrix = np.zeros((num_freqs, num_grids, num_feeds), dtype=complex)
+            self.input_impedance_array = np.full((num_freqs, num_feeds), np.nan + 0j, dtype=complex)
+            self.reflection_coefficient_array = np.full((num_freqs, num_feeds), np.nan + 0j, dtype=complex)
+
+        if self.solver_method != 'shooting' and len(freq_array) > 0:
+            # 批量求解后端对全部频点和馈电分块求解
+            result = self._solve_batched(freq_array, progress=reporter.update)
+            if result is not None:
+                self.sweep_voltage_matrix[...] = result['voltage']
+                self.sweep_current_matrix[...] = result['current']
+                self.input_impedance_array[...] = result['impedance']
+                self.reflection_coefficient_array[...] = self._reflection_coefficient(result['impedance'])
+            else:
+                reporter.update(num_freqs)
+                failed = True
+            freq_array = [] # 跳过逐频点的打靶法循环
 
-        total_calculations = num_freqs
         for i, freq in enumerate(freq_array):
             print(f"\n--- 计算频率: {freq * 1000:.2f} MHz ({i+1}/{num_freqs}) ---")
-            self._update_complete_abcd(freq)
             self._calculate_voltage_current_distribution(i, freq)
 
             # 报告进度
-            progress = int(((i + 1) / total_calculations) * 100)
-            self.calculation_progress.emit(progress)
+            reporter.update(i + 1)
 
         print("\n频率扫描计算完成。")
+        if not failed:
+            self.sweep_key = sweep_key
+            self.store_sweep_cache()
         self.calculation_complete.emit(
             self.sweep_voltage_matrix,
             self.sweep_current_matrix,
@@ -256,13 +488,102 @@ class AntSimCalculator(QtCore.QObject):
             self.reflection_coefficient_array
         )
 
+    def _run_lazy_sweep(self, frequencies_ghz, progress=None):
+        """创建按需计算的扫描结果并更新扫描结果属性，失败时返回 None
+
+        sweep_voltage_matrix / sweep_current_matrix 为 LazyDistribution 视图，按频点索引时才求解。
+        """
+        kernel = BatchedFeedSolver.from_data_source(self.data_source, frequencies_ghz, self.load_impedance)
+        try:
+            result = LazySweepResult(kernel, self.solver_method, self.sweep_cache_size, self.sweep_chunk_size,
+                                     progress)
+        except ValueError as e:
+            msg = f"求解失败: {e}"
+            print(msg)
+            self.error_occurred.emit(msg)
+            return None
+        self.last_backend = result.impedance_backend
+        print(f"使用求解后端: {self.last_backend}（电压/电流分布按需计算）")
+        self._set_sweep_result(result)
+        return result
+
+    def _set_sweep_result(self, result: LazySweepResult):
+        self.sweep_result = result
+        self.sweep_voltage_matrix = result.voltage
+        self.sweep_current_matrix = result.current
+        self.input_impedance_array = result.input_impedance
+        self.reflection_coefficient_array = result.reflection_coefficient
+
+    def _cache_family(self):
+        """结果缓存中区分结果来源：打靶法与批量求解后端分开保存"""
+        return 'shooting' if self.solver_method == 'shooting' else 'batched'
+
+    def load_cached_sweep(self, family: str = None) -> bool:
+        """结果缓存中有与当前输入一致的扫描时载入它并发出 calculation_complete，返回是否命中
+
+        条目含电压/电流分布时直接使用；只含馈电量（按需计算的扫描，或分布太大未保存）时，
+        批量求解用缓存的输入阻抗创建 LazySweepResult，分布在被查看时再求解，打靶法则视为未命中。
+        """
+        if self.result_cache is None or len(self.data_source.get_freq_array_ghz()) == 0:
+            return False
+        family = family or self._cache_family()
+        key = input_hash(self.data_source, self.load_impedance, family)
+        entry = self.result_cache.load(key)
+        if entry is None:
+            return False
+        if 'voltage' in entry:
+            self.sweep_result = None
+            self.sweep_voltage_matrix = entry['voltage']
+            self.sweep_current_matrix = entry['current']
+            self.input_impedance_array = entry['impedance']
+            self.reflection_coefficient_array = entry['reflection']
+        elif family == 'batched':
+            kernel = BatchedFeedSolver.from_data_source(self.data_source, None, self.load_impedance)
+            self._set_sweep_result(LazySweepResult(kernel, self.solver_method, self.sweep_cache_size,
+                                                   self.sweep_chunk_size, input_impedance=entry['impedance']))
+        else:
+            return False
+        self.last_backend = 'cache'
+        self.sweep_key = key
+        print("输入与已缓存的扫描结果一致，直接载入。")
+        self.calculation_progress.emit(100)
+        self.calculation_complete.emit(
+            self.sweep_voltage_matrix,
+            self.sweep_current_matrix,
+            self.input_impedance_array,
+            self.reflection_coefficient_array
+        )
+        return True
+
+    def store_sweep_cache(self) -> bool:
+        """以 sweep_key 把当前扫描结果写入结果缓存；按需计算的结果只保存馈电量
+
+        sweep_key 在扫描开始时由当时的输入求得，之后输入即使已被修改也不会存错键。
+        """
+        if self.result_cache is None or self.sweep_key is None or self.input_impedance_array is None:
+            return False
+        if self.sweep_result is not None:
+            return self.result_cache.store(self.sweep_key, self.input_impedance_array,
+                                           self.reflection_coefficient_array)
+        return self.result_cache.store(self.sweep_key, self.input_impedance_array, self.reflection_coefficient_array,
+                                       self.sweep_voltage_matrix, self.sweep_current_matrix)
+
+    def get_sweep_distribution(self, freq):
+        """返回扫描中离 freq（GHz）最近的频点的 (电压, 电流)，形状 (网格数, 馈电数)，无扫描结果时返回 None"""
+        if self.sweep_result is not None:
+            return self.sweep_result.distribution_at(freq)
+        if self.sweep_voltage_matrix is None:
+            return None
+        index = int(np.argmin(np.abs(self.data_source.get_freq_array_ghz() - freq)))
+        return self.sweep_voltage_matrix[index], self.sweep_current_matrix[index]
+
     def calculate_single_frequency(self, freq):
         """执行单频点计算"""
         grid_array = self.data_source.get_grid_array()
         num_grids = len(grid_array)
-        antenna_elements = self.data_source.antenna_elements_data
-        feed_points = [element for element in antenna_elements if element['类型'] == '馈电']
-        num_feeds = len(feed_points)
+        table = element_table_of(self.data_source)
+        num_feeds = table.num_feeds
+        self._report_invalid_rows(table)
 
         if num_grids < 1:
             msg = "网格点数量为零，无法计算。"
@@ -271,11 +592,21 @@ class AntSimCalculator(QtCore.QObject):
             return
 
         # 初始化单频点结果矩阵
+        self.single_freq_ghz = freq
         self.single_freq_voltage_matrix = np.zeros((num_grids, num_feeds), dtype=complex)
         self.single_freq_current_matrix = np.zeros((num_grids, num_feeds), dtype=complex)
 
         print(f"\n--- 计算频率: {freq * 1000:.2f} MHz ---")
-        self._calculate_voltage_current_distribution(0, freq, is_single_freq=True)
+        if self.solver_method != 'shooting':
+            result = self._solve_batched([freq])
+            if result is None:
+                return
+            self.single_freq_voltage_matrix = result['voltage'][0]
+            self.single_freq_current_matrix = result['current'][0]
+            self.single_freq_input_impedance = result['impedance'][0]
+            self.single_freq_reflection_coefficient = self._reflection_coefficient(result['impedance'][0])
+        else:
+            self._calculate_voltage_current_distribution(0, freq, is_single_freq=True)
 
         print("\n单频点计算完成。")
         self.calculation_complete.emit(
@@ -306,3 +637,6 @@ class AntSimCalculator(QtCore.QObject):
 
     def get_reflection_coefficient_array(self):
         return self.reflection_coefficient_array
+
+    def get_single_freq_input_impedance(self):
+        return self.single_freq_input_impedance
@@ -2,6 +2,54 @@ import numpy as np
 from PyQt5 import QtCore
 from settings import Settings # 假设 Settings 在同一目录下或可访问
 from device import Antenna # 假设 Antenna 在 device.py 中
+from element_table import ElementTable
+
+def build_freq_array(freq_settings):
+    """根据频率设置（GHz）生成频率数组（Hz），不依赖界面，可在工作进程中使用"""
+    start_freq = float(freq_settings.get('start_freq', 0)) * 1e9 # GHz 转 Hz
+    end_freq = float(freq_settings.get('end_freq', 0)) * 1e9 # GHz 转 Hz
+    freq_count = int(freq_settings.get('freq_count', 0))
+    if freq_count > 1:
+        return np.linspace(start_freq, end_freq, freq_count)
+    elif freq_count == 1:
+        return np.array([start_freq])
+    return np.array([])
+
+def build_grid_array(grid_settings):
+    """根据网格设置（mm）生成网格数组和网格步长（m）"""
+    # 将 antenna_length 从 mm 转换为 m
+    antenna_length = float(grid_settings.get('antenna_length', 0)) / 1000
+    grid_count = int(grid_settings.get('grid_count', 0))
+    if grid_count > 1:
+        return np.linspace(0, antenna_length, grid_count), antenna_length / (grid_count - 1)
+    elif grid_count == 1:
+        return np.array([0]), 0 # 单点网格步长为 0
+    return np.array([]), 0
+
+def unit_rlgc_per_length(line_settings):
+    """根据传输线设置计算单位长度 RLGC，返回 (Ohm/m, H/m, S/m, F/m)"""
+    # 将 unit_R 和 unit_G 从 mm 转换为 m
+    unit_R = float(line_settings.get('unit_R', 0)) * 1000  # Ohm/m
+    unit_G = float(line_settings.get('unit_G', 0)) * 1000# S/m
+    # 修改 ref_freq 为 GHz 单位
+    ref_freq_GHz = float(line_settings.get('ref_freq', 100)) # GHz
+    # 将 ref_wavelength 从 mm 转换为 m
+    ref_wavelength_quarter = float(line_settings.get('ref_wavelength', 0.75)) / 1000 # m
+
+    f_ref = ref_freq_GHz * 1e9 # Hz，直接乘以 1e9 转换为 Hz
+    lambda_full = 4 * ref_wavelength_quarter # m
+    v = 3e8 # Default speed of light (m/s)
+    if f_ref != 0 and lambda_full != 0:
+         v = f_ref * lambda_full
+    if v == 0: v = 3e8 # Fallback
+
+    unit_L = 0.0
+    unit_C = 0.0
+    Z0 = float(line_settings.get('characteristic_impedance', 50)) # Ohm 补充 Z0 的获取
+    if v != 0 and Z0 != 0:
+        unit_L = Z0 / v       # H/m
+        unit_C = 1 / (v * Z0) # F/m
+    return unit_R, unit_L, unit_G, unit_C
 
 class AntSimData(QtCore.QObject): # 继承 QObject 以使用信号
     """
@@ -21,6 +69,8 @@ class AntSimData(QtCore.QObject): # 继承 QObject 以使用信号
         self.grid_array = np.array([]) # 网格位置数组 (m)
         self.grid_step = 0.0           # 网格步长 (m)
         self.antenna_elements_data = [] # 存储提取的 Antenna 数据
+        self.element_table = None # 由 antenna_elements_data 构建的 ElementTable，数据或网格步长变化后重建
+        self._element_table_source = None
         self.current_line_settings = self.settings_instance.line_settings.copy()
         self.unit_R = 0.0 # Ohm/m
         self.unit_L = 0.0 # H/m
@@ -102,16 +152,7 @@ class AntSimData(QtCore.QObject): # 继承 QObject 以使用信号
         """根据频率设置更新频率数组"""
         try:
             freq_settings = self.settings_instance._read_settings_from_tree("频率设置")
-            start_freq = float(freq_settings.get('start_freq', 0)) * 1e6 # 转 Hz
-            end_freq = float(freq_settings.get('end_freq', 0)) * 1e6 # 转 Hz
-            freq_count = int(freq_settings.get('freq_count', 0))
-            # print(f"更新频率数组：起始={start_freq} Hz, 终止={end_freq} Hz, 点数={freq_count}")
-            if freq_count > 1:
-                self.freq_array = np.linspace(start_freq, end_freq, freq_count)
-            elif freq_count == 1:
-                self.freq_array = np.array([start_freq])
-            else:
-                self.freq_array = np.array([])
+            self.freq_array = build_freq_array(freq_settings)
         except (ValueError, KeyError, TypeError) as e:
                 print(f"更新频率数组错误: {e}")
                 self.freq_array = np.array([])
@@ -120,18 +161,7 @@ class AntSimData(QtCore.QObject): # 继承 QObject 以使用信号
         """根据网格设置更新网格数组和网格步长，并触发 RLGC 更新"""
         try:
             grid_settings = self.settings_instance._read_settings_from_tree("网格设置")
-            # 将 antenna_length 从 mm 转换为 m
-            antenna_length = float(grid_settings.get('antenna_length', 0)) / 1000
-            grid_count = int(grid_settings.get('grid_count', 0))
-            if grid_count > 1:
-                self.grid_array = np.linspace(0, antenna_length, grid_count)
-                self.grid_step = antenna_length / (grid_count - 1) if grid_count > 1 else 0
-            elif grid_count == 1:
-                 self.grid_array = np.array([0])
-                 self.grid_step = 0 # 单点网格步长为 0
-            else:
-                 self.grid_array = np.array([])
-                 self.grid_step = 0
+            self.grid_array, self.grid_step = build_grid_array(grid_settings)
             # print(f"网格步长更新为: {self.grid_step}")
 
             self._update_unit_rlgc_params() # 更新依赖 grid_step 的参数
@@ -147,27 +177,7 @@ class AntSimData(QtCore.QObject): # 继承 QObject 以使用信号
         # print("正在更新单位长度和单位网格 RLGC 参数...")
         line_settings = self.current_line_settings
         try:
-            # 将 unit_R 和 unit_G 从 mm 转换为 m
-            self.unit_R = float(line_settings.get('unit_R', 0)) * 1000  # Ohm/m
-            self.unit_G = float(line_settings.get('unit_G', 0)) * 1000# S/m
-            # 修改 ref_freq 为 GHz 单位
-            ref_freq_GHz = float(line_settings.get('ref_freq', 100)) # GHz
-            # 将 ref_wavelength 从 mm 转换为 m
-            ref_wavelength_quarter = float(line_settings.get('ref_wavelength', 0.75)) / 1000 # m
-
-            f_ref = ref_freq_GHz * 1e9 # Hz，直接乘以 1e9 转换为 Hz
-            lambda_full = 4 * ref_wavelength_quarter # m
-            v = 3e8 # Default speed of light (m/s)
-            if f_ref != 0 and lambda_full != 0:
-                 v = f_ref * lambda_full
-            if v == 0: v = 3e8 # Fallback
-
-            self.unit_L = 0.0
-            self.unit_C = 0.0
-            Z0 = float(line_settings.get('characteristic_impedance', 50)) # Ohm 补充 Z0 的获取
-            if v != 0 and Z0 != 0:
-                self.unit_L = Z0 / v       # H/m
-                self.unit_C = 1 / (v * Z0) # F/m
+            self.unit_R, self.unit_L, self.unit_G, self.unit_C = unit_rlgc_per_length(line_settings)
 
             self.R_per_step = self.unit_R * self.grid_step # Ohm
             self.G_per_step = self.unit_G * self.grid_step # S
@@ -197,6 +207,7 @@ class AntSimData(QtCore.QObject): # 继承 QObject 以使用信号
              self.antenna_elements_data = self.get_antenna_data_fallback() # 保留旧逻辑作为后备
 
         print(f"Antenna 数据已更新: {self.antenna_elements_data}")
+        self.get_element_table() # 每次变化只构建一次，供所有计算路径共用
         self.data_updated.emit() # 发射信号表明数据已更新
 
     def get_antenna_data_fallback(self):
@@ -228,6 +239,10 @@ class AntSimData(QtCore.QObject): # 继承 QObject 以使用信号
     def get_freq_array(self):
         return self.freq_array
 
+    def get_freq_array_ghz(self):
+        """返回以 GHz 为单位的频率数组（计算器内部统一使用 GHz）"""
+        return self.freq_array / 1e9
+
     def get_grid_array(self):
         return self.grid_array
 
@@ -239,4 +254,13 @@ class AntSimData(QtCore.QObject): # 继承 QObject 以使用信号
 
     def get_antenna_elements_data(self):
         # 返回内部存储的数据，而不是每次都重新读取
-        return self.antenna_elements_data
\ No newline at end of file
+        return self.antenna_elements_data
+
+    def get_element_table(self):
+        """当前元件数据的 ElementTable；元件数据被替换、网格步长改变或引用的文件变化时重建，值未变的编译句柄沿用"""
+        table = self.element_table
+        if (table is None or self._element_table_source is not self.antenna_elements_data
+                or table.grid_step != self.grid_step or table.files_changed()):
+            self.element_table = ElementTable(self.antenna_elements_data, self.grid_step, previous=table)
+            self._element_table_source = self.antenna_elements_data
+        return self.element_table
\ No newline at end of file
@@ -0,0 +1,179 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PyQt5 import QtCore
+
+import solver_backends
+from element_table import element_table_of
+from progress import ProgressReporter
+from result_cache import input_hash
+from solver_kernel import BatchedFeedSolver
+from sweep_result import LazySweepResult
+
+
+class JobCancelled(Exception):
+    """后台任务因输入已过期而取消"""
+
+
+class AutoRecompute(QtCore.QObject):
+    """自动触发：数据变化后静默一段时间再在后台重算频率扫描
+
+    - 每次 AntSimData.data_updated 都重新开始 quiet_ms 计时，连续编辑只在停下后计算一次；
+    - 输入一变化，正在进行的任务即视为过期，在下一个频率分块处停止；
+    - 任务完成时再次比较输入快照，只有与当前输入一致的结果才写回计算器并发出 calculation_complete。
+    后台任务在输入快照上运行，不读写界面和计算器状态；打靶法依赖计算器的内部状态，
+    因此 solver_method 为 'shooting' 时后台改用自动选择的后端。
+    """
+    job_finished = QtCore.pyqtSignal(int, object, object) # (任务序号, 输入签名, 结果)
+    job_progress = QtCore.pyqtSignal(int, object) # (任务序号, 进度 info)
+
+    def __init__(self, calculator, quiet_ms: int = 500, chunk_size: int = 32, parent=None):
+        """
+        参数：
+            calculator: AntSimCalculator，提供数据源、负载阻抗和求解方法，并保存扫描结果
+            quiet_ms: 最后一次变化后等待的时间（ms）
+            chunk_size: 每个分块的频点数，分块之间检查任务是否过期
+        """
+        super().__init__(parent)
+        self.calculator = calculator
+        self.data_source = calculator.data_source
+        self.chunk_size = int(chunk_size)
+        self.enabled = False
+
+        self._generation = 0
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(int(quiet_ms))
+        self._timer.timeout.connect(self._submit)
+        self.job_finished.connect(self._publish) # 工作线程发出，排队到主线程执行
+        self.job_progress.connect(self._report_progress)
+        self.data_source.data_updated.connect(self.schedule)
+
+    def set_enabled(self, enabled: bool):
+        """开启/关闭自动触发；开启时按当前输入安排一次计算"""
+        self.enabled = bool(enabled)
+        print(f"自动触发: {'开启' if self.enabled else '关闭'}")
+        if self.enabled:
+            self.schedule()
+        else:
+            self._timer.stop()
+            self._generation += 1 # 作废正在进行的任务
+
+    @QtCore.pyqtSlot()
+    def schedule(self):
+        """输入已变化：作废正在进行的任务，并重新开始静默计时"""
+        self._generation += 1
+        if self.enabled:
+            self._timer.start()
+
+    def shutdown(self):
+        """停止计时并作废任务，不等待工作线程"""
+        self._timer.stop()
+        self._generation += 1
+        self._executor.shutdown(wait=False)
+
+    def _method(self):
+        method = self.calculator.solver_method
+        return 'auto' if method == 'shooting' else method
+
+    def _signature(self):
+        """当前输入的签名，用于判断结果是否仍然有效"""
+        data_source = self.data_source
+        return (data_source.get_freq_array_ghz().tobytes(), len(data_source.get_grid_array()),
+                tuple(data_source.get_unit_rlgc_per_step()), element_table_of(data_source).signature(),
+                self.calculator.load_impedance, self._method())
+
+    def _submit(self):
+        if not self.enabled:
+            return
+        data_source = self.data_source
+        if len(data_source.get_freq_array_ghz()) == 0 or len(data_source.get_grid_array()) == 0:
+            return
+        if self.calculator.load_cached_sweep('batched'): # 后台任务总是批量求解
+            return
+        task = {
+            'generation': self._generation,
+            'signature': self._signature(),
+            'frequencies_ghz': np.array(data_source.get_freq_array_ghz(), dtype=float),
+            'num_grids': len(data_source.get_grid_array()),
+            'rlgc_per_step': tuple(data_source.get_unit_rlgc_per_step()),
+            'antenna_elements': element_table_of(data_source), # 表构建后不再修改，编译句柄与界面线程共用
+            'load_impedance': self.calculator.load_impedance,
+            'method': self._method(),
+            'lazy': self.calculator.lazy_sweep,
+            'cache_size': self.calculator.sweep_cache_size,
+        }
+        print(f"自动触发：开始后台计算（任务 {task['generation']}）")
+        self._executor.submit(self._run, task)
+
+    def _check(self, generation):
+        if generation != self._generation:
+            raise JobCancelled()
+
+    def _run(self, task):
+        """工作线程：按频率分块求解，分块之间检查任务是否过期"""
+        generation = task['generation']
+        start_time = time.time()
+        try:
+            kernel = BatchedFeedSolver(task['frequencies_ghz'], task['num_grids'], task['rlgc_per_step'],
+                                       task['antenna_elements'], task['load_impedance'])
+            reporter = ProgressReporter(len(kernel.frequencies_ghz),
+                                        lambda info: self.job_progress.emit(generation, info),
+                                        self.calculator.progress_interval)
+
+            def on_chunk(done):
+                self._check(generation)
+                reporter.update(done)
+
+            if task['lazy']:
+                # 只计算馈电量，分布在被查看时于主线程按需计算
+                sweep = LazySweepResult(kernel, task['method'], task['cache_size'], self.chunk_size, on_chunk)
+                result = {'sweep': sweep, 'backend': sweep.impedance_backend}
+            else:
+                name, result = solver_backends.solve_chunked(kernel, solver_backends.QUANTITIES, task['method'],
+                                                             self.chunk_size, on_chunk)
+                result['backend'] = name
+            result['elapsed'] = time.time() - start_time
+        except JobCancelled:
+            print(f"自动触发：任务 {generation} 的输入已过期，已取消")
+            return
+        except Exception as e:
+            print(f"自动触发：任务 {generation} 计算出错: {e}")
+            result = {'error': str(e)}
+        self.job_finished.emit(generation, task['signature'], result)
+
+    def _report_progress(self, generation, info):
+        """主线程：转发当前任务的进度"""
+        if generation == self._generation:
+            self.calculator._emit_progress(info)
+
+    def _publish(self, generation, signature, result):
+        """主线程：只发布与当前输入一致的结果"""
+        if generation != self._generation or signature != self._signature():
+            print(f"自动触发：任务 {generation} 的结果已过期，丢弃")
+            return
+        calculator = self.calculator
+        if 'error' in result:
+            calculator.error_occurred.emit(f"自动计算失败: {result['error']}")
+            return
+        if 'sweep' in result:
+            calculator._set_sweep_result(result['sweep'])
+        else:
+            calculator.sweep_result = None
+            calculator.sweep_voltage_matrix = result['voltage']
+            calculator.sweep_current_matrix = result['current']
+            calculator.input_impedance_array = result['impedance']
+            calculator.reflection_coefficient_array = calculator._reflection_coefficient(result['impedance'])
+        calculator.last_backend = result['backend']
+        calculator.sweep_key = input_hash(self.data_source, calculator.load_impedance, 'batched') # 输入已确认未变
+        calculator.store_sweep_cache()
+        print(f"自动触发：任务 {generation} 完成，耗时 {result['elapsed']:.2f} s（后端 {result['backend']}）")
+        calculator.calculation_progress.emit(100)
+        calculator.calculation_complete.emit(
+            calculator.sweep_voltage_matrix,
+            calculator.sweep_current_matrix,
+            calculator.input_impedance_array,
+            calculator.reflection_coefficient_array
+        )
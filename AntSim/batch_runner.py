@@ -0,0 +1,224 @@
+import itertools
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from antsim_data import build_freq_array, build_grid_array, unit_rlgc_per_length
+from circuit import circuit_leaf_values
+from element_table import ElementTable
+from settings import Settings
+from solver_kernel import BatchedFeedSolver, reflection_coefficient
+
+# 可作为扫描参数的设置类别
+SETTING_CATEGORIES = ('line_settings', 'grid_settings')
+
+
+def _derive_grid_count(grid_settings: dict) -> dict:
+    """与 Settings._update_grid_settings 相同：由天线长度和网格步进推出网格数"""
+    grid_settings = dict(grid_settings)
+    try:
+        antenna_length = float(grid_settings.get('antenna_length', 0))
+        grid_step = float(grid_settings.get('grid_step', 0))
+        if grid_step > 0:
+            grid_settings['grid_count'] = str(int(antenna_length / grid_step) + 1)
+    except (ValueError, TypeError):
+        pass
+    return grid_settings
+
+
+def _solve_task(task: dict):
+    """工作进程入口：对一组共享传输线/网格设置的参数组合做一次批量求解"""
+    solver = BatchedFeedSolver(task['frequencies_ghz'], task['num_grids'], task['rlgc_per_step'],
+                               task['antenna_elements'], task['load_impedance'], task['nominal_sections'])
+    overrides = {row: values for row, values in task['overrides'].items()}
+    impedance = solver.feed_impedance(overrides if overrides else None)
+    run_count = len(task['runs'])
+    impedance = np.broadcast_to(impedance, (run_count,) + impedance.shape[-2:])
+    return task['runs'], np.array(impedance)
+
+
+class BatchJob:
+    """参数网格批量计算任务
+
+    任务描述（dict 或 JSON 文件）示例：
+        {
+            "base": {
+                "frequency_settings": {...}, "grid_settings": {...}, "line_settings": {...},
+                "antenna": [{"类型": "馈电", "索引": 200, "值": ""}, ...]
+            },
+            "mode": "cartesian",
+            "parameters": {
+                "line_settings.characteristic_impedance": [100, 200],
+                "grid_settings.grid_step": [0.05, 0.1],
+                "element.1.0": [1.5, 2.0, 2.5]
+            },
+            "workers": 4,
+            "output": "results.npz"
+        }
+
+    base 中缺省的设置使用 Settings 的默认值。参数名为 "类别.键"，或
+    "element.行号.数值序号"（该行值字符串中第几个 p/n/o 数值）。
+    mode 为 cartesian 时取各参数的笛卡尔积，为 list 时各参数列表逐项对应。
+    传输线/网格设置相同的组合归为一组，组内元件取值作为批量维度一次求解，
+    各组在工作进程中并行计算；结果写入一个列式的 .npz 文件。
+    """
+
+    def __init__(self, spec: dict):
+        base = spec.get('base', {})
+        self.frequency_settings = dict(Settings.frequency_settings, **base.get('frequency_settings', {}))
+        self.grid_settings = dict(Settings.grid_settings, **base.get('grid_settings', {}))
+        self.line_settings = dict(Settings.line_settings, **base.get('line_settings', {}))
+        self.antenna_elements = [dict(row) for row in base.get('antenna', [])]
+        self.mode = spec.get('mode', 'cartesian')
+        self.parameters = {key: list(values) for key, values in spec.get('parameters', {}).items()}
+        self.workers = int(spec.get('workers', 1))
+        self.chunk_size = int(spec.get('chunk_size', 256))
+        self.output = spec.get('output', 'batch_results.npz')
+        self.load_impedance = complex(spec.get('load_impedance', 50.0))
+        self._validate()
+
+    @classmethod
+    def from_file(cls, path: str):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    @classmethod
+    def from_data_source(cls, data_source, parameters: dict, **options):
+        """以当前界面中的设置和天线数据作为基准创建任务"""
+        settings_instance = data_source.settings_instance
+        spec = {
+            'base': {
+                'frequency_settings': settings_instance._read_settings_from_tree("频率设置"),
+                'grid_settings': settings_instance._read_settings_from_tree("网格设置"),
+                'line_settings': settings_instance._read_settings_from_tree("传输线设置"),
+                'antenna': data_source.get_antenna_elements_data(),
+            },
+            'parameters': parameters,
+        }
+        spec.update(options)
+        return cls(spec)
+
+    def _validate(self):
+        if self.mode not in ('cartesian', 'list'):
+            raise ValueError(f"未知的参数网格模式: {self.mode}")
+        if self.mode == 'list' and len({len(v) for v in self.parameters.values()}) > 1:
+            raise ValueError("list 模式下各参数的取值个数必须相同")
+        for key in self.parameters:
+            parts = key.split('.')
+            if parts[0] in SETTING_CATEGORIES and len(parts) == 2:
+                if parts[1] not in getattr(self, parts[0]):
+                    raise ValueError(f"未知的设置项: {key}")
+            elif parts[0] == 'element' and len(parts) == 3:
+                row, leaf = int(parts[1]), int(parts[2])
+                if not 0 <= row < len(self.antenna_elements):
+                    raise ValueError(f"参数 {key} 的行号超出范围")
+                if not 0 <= leaf < len(circuit_leaf_values(self.antenna_elements[row].get('值', ''))):
+                    raise ValueError(f"参数 {key} 的数值序号超出范围")
+            else:
+                raise ValueError(f"无法识别的参数: {key}（频率设置不支持扫描）")
+
+    def combinations(self) -> List[Dict[str, float]]:
+        """展开参数网格，返回每个组合的 {参数名: 取值}"""
+        keys = list(self.parameters)
+        if not keys:
+            return [{}]
+        if self.mode == 'cartesian':
+            value_sets = itertools.product(*(self.parameters[k] for k in keys))
+        else:
+            value_sets = zip(*(self.parameters[k] for k in keys))
+        return [dict(zip(keys, values)) for values in value_sets]
+
+    def _build_tasks(self, combinations, frequencies_ghz, nominal_sections) -> List[dict]:
+        """按传输线/网格设置分组，每组再按 chunk_size 切分为任务"""
+        setting_keys = [k for k in self.parameters if not k.startswith('element.')]
+        element_keys = [k for k in self.parameters if k.startswith('element.')]
+        groups = {}
+        for run, combination in enumerate(combinations):
+            groups.setdefault(tuple(combination[k] for k in setting_keys), []).append(run)
+
+        nominal_leaves = {row: np.array([v for v, _ in circuit_leaf_values(e.get('值', ''))])
+                          for row, e in enumerate(self.antenna_elements)}
+        tasks = []
+        for group_values, runs in groups.items():
+            line_settings = dict(self.line_settings)
+            grid_settings = dict(self.grid_settings)
+            for key, value in zip(setting_keys, group_values):
+                category, name = key.split('.')
+                (line_settings if category == 'line_settings' else grid_settings)[name] = str(value)
+            grid_settings = _derive_grid_count(grid_settings)
+            grid_array, grid_step = build_grid_array(grid_settings)
+            unit_R, unit_L, unit_G, unit_C = unit_rlgc_per_length(line_settings)
+            rlgc_per_step = (unit_R * grid_step, unit_L * grid_step, unit_G * grid_step, unit_C * grid_step)
+
+            for start in range(0, len(runs), self.chunk_size):
+                chunk = runs[start:start + self.chunk_size]
+                overrides = {}
+                for key in element_keys:
+                    _, row, leaf = key.split('.')
+                    row, leaf = int(row), int(leaf)
+                    if row not in overrides:
+                        overrides[row] = np.tile(nominal_leaves[row], (len(chunk), 1)).astype(float)
+                    overrides[row][:, leaf] = [combinations[run][key] for run in chunk]
+                tasks.append({
+                    'runs': chunk,
+                    'frequencies_ghz': frequencies_ghz,
+                    'num_grids': len(grid_array),
+                    'rlgc_per_step': rlgc_per_step,
+                    'antenna_elements': self.antenna_elements,
+                    'load_impedance': self.load_impedance,
+                    # 元件的标称 ABCD 只与频率有关，所有组共享
+                    'nominal_sections': {r: m for r, m in nominal_sections.items() if r not in overrides},
+                    'overrides': overrides,
+                })
+        return tasks
+
+    def run(self, output: Optional[str] = None) -> dict:
+        """执行全部组合并写出结果文件，返回结果列字典"""
+        start_time = time.time()
+        combinations = self.combinations()
+        frequencies_ghz = build_freq_array(self.frequency_settings) / 1e9
+        table = ElementTable(self.antenna_elements)
+        num_feeds = table.num_feeds
+
+        nominal_sections = BatchedFeedSolver(frequencies_ghz, 1, (0, 0, 0, 0), table,
+                                             self.load_impedance).nominal_sections()
+        tasks = self._build_tasks(combinations, frequencies_ghz, nominal_sections)
+        print(f"批量任务：{len(combinations)} 个组合，{len(tasks)} 个求解任务，{self.workers} 个工作进程")
+
+        impedance = np.full((len(combinations), len(frequencies_ghz), num_feeds), np.nan + 0j, dtype=complex)
+        if self.workers > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                for runs, result in executor.map(_solve_task, tasks):
+                    impedance[runs] = result
+        else:
+            for task in tasks:
+                runs, result = _solve_task(task)
+                impedance[runs] = result
+
+        reflection = reflection_coefficient(impedance, self.load_impedance)
+        columns = {
+            'parameter_names': np.array(list(self.parameters), dtype=str),
+            'frequency_ghz': frequencies_ghz,
+            'input_impedance': impedance,
+            'reflection_coefficient': reflection,
+            'max_gamma': np.nanmax(np.abs(reflection), axis=(1, 2)) if impedance.size else np.array([]),
+        }
+        for key in self.parameters:
+            columns[f'param:{key}'] = np.array([combination[key] for combination in combinations], dtype=float)
+
+        output = output or self.output
+        if output:
+            np.savez_compressed(output, **columns)
+            print(f"结果已写入 {output}（耗时 {time.time() - start_time:.2f} s）")
+        return columns
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("用法: python batch_runner.py job.json [output.npz]")
+        sys.exit(1)
+    BatchJob.from_file(sys.argv[1]).run(sys.argv[2] if len(sys.argv) > 2 else None)
@@ -1,14 +1,18 @@
 import re
 import numpy as np
 from typing import Union, List, Tuple
-from PyQt5 import QtWidgets  # 新增导入 PyQt5 的 QtWidgets
 # 修改相对导入为绝对导入
 from circuit import SeriesCircuit
 from circuit import ParallelCircuit
+from circuit import CircuitEvaluator, circuit_impedance_array, circuit_leaf_values
+from touchstone import load_touchstone, is_file_reference
 
 def ElementCalculation(element_str: str, frequency_ghz: Union[float, List[float]] = 1.0) -> Union[np.ndarray, List[np.ndarray]]:
     """计算复杂电路表达式的ABCD矩阵
-    
+
+    解析失败时抛出 ValueError，不弹出任何界面提示（可在工作线程或进程中调用）；
+    逐行的错误说明见 validation.validate_expression。
+
     参数：
         element_str: str，复杂电路表达式，如S(2p+3n)+P((3p+1n+50o)/3p)
         frequency_ghz: float或float列表，工作频率（GHz），默认为1.0GHz
@@ -19,79 +23,56 @@ def ElementCalculation(element_str: str, frequency_ghz: Union[float, List[float]
     # 移除所有空白字符
     element_str = re.sub(r'\s+', '', element_str)
     
-    def find_matching_parenthesis(s: str, start: int) -> int:
-        """找到匹配的右括号位置"""
-        count = 1
-        for i in range(start + 1, len(s)):
-            if s[i] == '(':
-                count += 1
-            elif s[i] == ')':
-                count -= 1
-                if count == 0:
-                    return i
-        raise ValueError("括号不匹配")
-    
     def parse_circuit_expression(expr: str) -> Union[np.ndarray, List[np.ndarray]]:
         """解析电路表达式，返回ABCD矩阵"""
-        try:
-            # 如果表达式为空，返回单位矩阵
-            if not expr:
-                if isinstance(frequency_ghz, (list, tuple)):
-                    return [np.array([[1], [0], [0], [1]], dtype=complex) for _ in range(len(frequency_ghz))]
-                return np.array([[1], [0], [0], [1]], dtype=complex)
-            
-            # 查找最后一个+号，用于分割级联电路
-            last_plus = -1
-            i = 0
-            while i < len(expr):
-                if expr[i] == '(':
-                    i = find_matching_parenthesis(expr, i)
-                elif expr[i] == '+':
-                    last_plus = i
-                i += 1
+        # 如果表达式为空，返回单位矩阵
+        if not expr:
+            if isinstance(frequency_ghz, (list, tuple)):
+                return [np.array([[1], [0], [0], [1]], dtype=complex) for _ in range(len(frequency_ghz))]
+            return np.array([[1], [0], [0], [1]], dtype=complex)
+        
+        # 按顶层的 + 号一次拆分为级联项，从左到右依次级联
+        terms = split_cascade_terms(expr)
+        if len(terms) > 1:
+            # 计算级联
+            def cascade_abcd(l, r):
+                # 将4x1向量转换为2x2矩阵进行计算
+                l_mat = np.array([[l[0,0], l[1,0]], [l[2,0], l[3,0]]], dtype=complex)
+                r_mat = np.array([[r[0,0], r[1,0]], [r[2,0], r[3,0]]], dtype=complex)
+                result = np.matmul(l_mat, r_mat)
+                # 将结果转换回4x1向量
+                return np.array([[result[0,0]], [result[0,1]], [result[1,0]], [result[1,1]]], dtype=complex)
             
-            if last_plus != -1:
-                # 存在级联电路，递归处理
-                left_expr = expr[:last_plus]
-                right_expr = expr[last_plus + 1:]
-                left_abcd = parse_circuit_expression(left_expr)
-                right_abcd = parse_circuit_expression(right_expr)
-                
-                # 计算级联
-                def cascade_abcd(l, r):
-                    # 将4x1向量转换为2x2矩阵进行计算
-                    l_mat = np.array([[l[0,0], l[1,0]], [l[2,0], l[3,0]]], dtype=complex)
-                    r_mat = np.array([[r[0,0], r[1,0]], [r[2,0], r[3,0]]], dtype=complex)
-                    result = np.matmul(l_mat, r_mat)
-                    # 将结果转换回4x1向量
-                    return np.array([[result[0,0]], [result[0,1]], [result[1,0]], [result[1,1]]], dtype=complex)
-                
-                if isinstance(left_abcd, list):
-                    return [cascade_abcd(l, r) for l, r in zip(left_abcd, right_abcd)]
-                return cascade_abcd(left_abcd, right_abcd)
+            result = parse_circuit_expression(terms[0])
+            for term in terms[1:]:
+                right_abcd = parse_circuit_expression(term)
+                if isinstance(result, list):
+                    result = [cascade_abcd(l, r) for l, r in zip(result, right_abcd)]
+                else:
+                    result = cascade_abcd(result, right_abcd)
+            return result
+        
+        # 引用 Touchstone 文件的项：T(文件.s2p)、S(文件.s1p)、P(文件.s1p)
+        if expr[:2] in ('S(', 'P(', 'T(') and expr.endswith(')') and is_file_reference(expr[2:-1]):
+            matrices = touchstone_term_abcd(expr, np.atleast_1d(frequency_ghz))
+            vectors = [np.array([[m[0, 0]], [m[0, 1]], [m[1, 0]], [m[1, 1]]], dtype=complex) for m in matrices]
+            return vectors if isinstance(frequency_ghz, (list, tuple)) else vectors[0]
+
+        # 处理S(...)或P(...)格式的表达式
+        if expr.startswith('S(') or expr.startswith('P('):
+            circuit_type = expr[0]  # S或P
+            if not (expr[1] == '(' and expr[-1] == ')'):
+                raise ValueError(f"无效的{circuit_type}表达式：{expr}")
             
-            # 处理S(...)或P(...)格式的表达式
-            if expr.startswith('S(') or expr.startswith('P('):
-                circuit_type = expr[0]  # S或P
-                if not (expr[1] == '(' and expr[-1] == ')'):
-                    raise ValueError(f"无效的{circuit_type}表达式：{expr}")
-                
-                inner_expr = expr[2:-1]  # 提取括号内的内容
-                
-                # 根据类型创建相应的电路对象
-                if circuit_type == 'S':
-                    return SeriesCircuit(inner_expr, frequency_ghz).get_abcd()
-                else:  # circuit_type == 'P'
-                    return ParallelCircuit(inner_expr, frequency_ghz).get_abcd()
+            inner_expr = expr[2:-1]  # 提取括号内的内容
             
-            raise ValueError(f"无效的电路表达式：{expr}")
-        except Exception as e:
-            # 显示错误弹窗
-            app = QtWidgets.QApplication.instance()
-            if app is None:
-                app = QtWidgets.QApplication([])
-            QtWidgets.QMessageBox.critical(None, "解析错误", f"解析电路表达式时出错：{str(e)}")
-            raise
+            # 根据类型创建相应的电路对象
+            if circuit_type == 'S':
+                return SeriesCircuit(inner_expr, frequency_ghz).get_abcd()
+            else:  # circuit_type == 'P'
+                return ParallelCircuit(inner_expr, frequency_ghz).get_abcd()
+        
+        raise ValueError(f"无效的电路表达式：{expr}")
 
     try:
         return parse_circuit_expression(element_str)
@@ -130,3 +111,116 @@ def FeedCalculation(element_str: str, frequency_ghz: Union[float, List[float]] =
         # 处理单频率情况
         input_impedance = calculate_input_impedance(abcd)
         return impedance_to_parallel_abcd(input_impedance)
+
+
+def split_cascade_terms(element_str: str) -> List[str]:
+    """按顶层的 + 号把元件表达式拆分为级联的 S(...)/P(...) 项"""
+    element_str = re.sub(r'\s+', '', element_str)
+    terms = []
+    depth = 0
+    start = 0
+    for i, ch in enumerate(element_str):
+        if ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+            if depth < 0:
+                raise ValueError("括号不匹配")
+        elif ch == '+' and depth == 0:
+            terms.append(element_str[start:i])
+            start = i + 1
+    if depth != 0:
+        raise ValueError("括号不匹配")
+    if element_str:
+        terms.append(element_str[start:])
+    return terms
+
+
+def touchstone_term_abcd(term: str, frequency_ghz: np.ndarray) -> np.ndarray:
+    """引用 Touchstone 文件的级联项的 ABCD 矩阵 (F, 2, 2)
+
+    T(文件.s2p) 为 2 端口网络；S(文件.s1p)/P(文件.s1p) 把 1 端口文件的输入阻抗串联/并联接入。
+    文件只解析一次（见 touchstone.load_touchstone），数据按 frequency_ghz 插值。
+    """
+    data = load_touchstone(term[2:-1])
+    if term[0] == 'T':
+        return data.abcd(frequency_ghz)
+    z = data.impedance(frequency_ghz)
+    abcd = np.zeros(z.shape + (2, 2), dtype=complex)
+    abcd[..., 0, 0] = 1
+    abcd[..., 1, 1] = 1
+    if term[0] == 'S':
+        abcd[..., 0, 1] = z
+    else:
+        abcd[..., 1, 0] = 1 / z
+    return abcd
+
+
+def element_leaf_count(element_str: str) -> int:
+    """元件表达式中可替换的元件数值（p/n/o）个数"""
+    return len(circuit_leaf_values(element_str))
+
+
+def element_abcd_array(element_str: str, frequency_ghz: np.ndarray, leaf_values: np.ndarray = None,
+                       evaluator: CircuitEvaluator = None) -> np.ndarray:
+    """ElementCalculation 的向量化版本，不弹出任何界面提示
+
+    参数：
+        element_str: str，元件表达式，如 S(2p+3n)+P(50o)
+        frequency_ghz: np.ndarray，频率数组（GHz），形状 (F,)
+        leaf_values: np.ndarray，可选，形状 (..., 数值个数)，批量替换表达式中的数值
+        evaluator: CircuitEvaluator，可选，同一频率批次的求值器，各行相同的子电路只计算一次
+                   （不替换数值时使用）
+
+    返回：
+        np.ndarray：ABCD 矩阵，形状 (..., F, 2, 2)
+    """
+    frequency_ghz = np.asarray(frequency_ghz, dtype=float)
+    if leaf_values is not None:
+        leaf_values = np.asarray(leaf_values, dtype=float)
+        batch_shape = leaf_values.shape[:-1]
+    else:
+        batch_shape = ()
+    abcd = np.broadcast_to(np.identity(2, dtype=complex), batch_shape + frequency_ghz.shape + (2, 2)).copy()
+
+    offset = 0
+    for term in split_cascade_terms(element_str):
+        if term[:2] in ('S(', 'P(', 'T(') and term.endswith(')') and is_file_reference(term[2:-1]):
+            abcd = abcd @ touchstone_term_abcd(term, frequency_ghz)
+            continue
+        if not (term.startswith('S(') or term.startswith('P(')) or not term.endswith(')'):
+            raise ValueError(f"无效的电路表达式：{term}")
+        inner = term[2:-1]
+        count = element_leaf_count(inner)
+        values = None if leaf_values is None else leaf_values[..., offset:offset + count]
+        offset += count
+        if evaluator is not None and values is None:
+            z = evaluator.impedance(inner)
+        else:
+            z = circuit_impedance_array(inner, frequency_ghz, values)
+        term_abcd = np.zeros(z.shape + (2, 2), dtype=complex)
+        term_abcd[..., 0, 0] = 1
+        term_abcd[..., 1, 1] = 1
+        if term[0] == 'S':
+            term_abcd[..., 0, 1] = z
+        else:
+            term_abcd[..., 1, 0] = 1 / z
+        abcd = abcd @ term_abcd
+    return abcd
+
+
+def feed_abcd_array(element_str: str, frequency_ghz: np.ndarray, leaf_values: np.ndarray = None,
+                    load_impedance: float = 50.0, evaluator: CircuitEvaluator = None) -> np.ndarray:
+    """FeedCalculation 的向量化版本：馈电网络端接负载后的输入阻抗以并联形式给出
+
+    返回：
+        np.ndarray：并联形式 ABCD 矩阵，形状 (..., F, 2, 2)
+    """
+    abcd = element_abcd_array(element_str, frequency_ghz, leaf_values, evaluator)
+    A, B, C, D = abcd[..., 0, 0], abcd[..., 0, 1], abcd[..., 1, 0], abcd[..., 1, 1]
+    z = (A * load_impedance + B) / (C * load_impedance + D)
+    result = np.zeros(abcd.shape, dtype=complex)
+    result[..., 0, 0] = 1
+    result[..., 1, 1] = 1
+    result[..., 1, 0] = 1 / z
+    return result
@@ -1,7 +1,11 @@
 import numpy as np
 import re
+import weakref
+from functools import lru_cache
 from typing import Union, List, Tuple
 
+from touchstone import file_reference_spans, is_file_reference
+
 def parse_circuit_string(circuit_str: str, frequency_ghz: Union[float, List[float]] = 1.0) -> Union[complex, List[complex]]:
     """解析表示元件关系的字符串。
     
@@ -25,109 +29,240 @@ def parse_circuit_string(circuit_str: str, frequency_ghz: Union[float, List[floa
         complex或complex列表：解析后的电路阻抗。当输入频率为单个值时返回complex，
         当输入频率为列表时返回对应的阻抗列表
     """
-    # 移除所有空白字符
-    circuit_str = re.sub(r'\s+', '', circuit_str)
-    
-    def parse_value(value_str: str) -> Union[complex, List[complex]]:
-        """解析元件值字符串，转换为复数阻抗。"""
-        # 提取数值和单位
-        match = re.match(r'(\d+\.?\d*)(p|n|o)', value_str)
-        if not match:
-            raise ValueError(f"无效的元件值格式：{value_str}")
-            
-        value, unit = float(match.group(1)), match.group(2)
-        
-        # 处理频率数组情况
-        if isinstance(frequency_ghz, (list, tuple)):
-            impedances = []
-            for freq in frequency_ghz:
-                omega = 2 * 3.14159 * freq * 1e9  # 使用当前频率计算角频率
-                
-                if unit == 'p':  # 电容，单位pF
-                    # 电容的阻抗：Z = -j/(ωC)
-                    capacitance = value * 1e-12  # 转换为法拉
-                    impedances.append(complex(0, -1 / (omega * capacitance)))
-                elif unit == 'n':  # 电感，单位nH
-                    # 电感的阻抗：Z = jωL
-                    inductance = value * 1e-9  # 转换为亨利
-                    impedances.append(complex(0, omega * inductance))
-                else:  # 电阻，单位欧姆
-                    impedances.append(complex(value, 0))
-            return impedances
+    scalar = not isinstance(frequency_ghz, (list, tuple))
+    omega = 2 * np.pi * np.atleast_1d(np.asarray(frequency_ghz, dtype=float)) * 1e9  # 使用当前频率计算角频率
+    impedance = evaluate_impedance(parse_circuit(circuit_str), omega)
+    if scalar:
+        return complex(impedance[0])
+    return [complex(z) for z in impedance]
+
+# 电路字符串的记号：元件数值（数值 + 单位 p/n/o）、运算符、括号
+TOKEN_PATTERN = re.compile(r'(?P<value>\d+\.?\d*)(?P<unit>[pno])|(?P<op>[+/])|(?P<open>\()|(?P<close>\))')
+
+class CircuitSyntaxError(ValueError):
+    """电路字符串的语法错误，position 为出错位置（去掉空白后的字符串中，从 0 开始）"""
+
+    def __init__(self, position: int, message: str):
+        super().__init__(message)
+        self.position = position
+
+def tokenize(circuit_str: str) -> List[Tuple[str, object, int]]:
+    """一次扫描把（去掉空白的）电路字符串切分为记号 [(类型, 内容, 位置)]
+
+    类型为 'value'（内容为 (数值, 单位)）、'op'（'+' 或 '/'）、'open'、'close'。
+    """
+    tokens = []
+    position = 0
+    while position < len(circuit_str):
+        match = TOKEN_PATTERN.match(circuit_str, position)
+        if match is None:
+            raise CircuitSyntaxError(position, f"无法识别的字符 '{circuit_str[position]}'（元件值应为数字加单位 p/n/o）")
+        kind = match.lastgroup
+        if kind == 'unit':
+            tokens.append(('value', (float(match.group('value')), match.group('unit')), position))
         else:
-            # 单个频率的情况
-            omega = 2 * 3.14159 * frequency_ghz * 1e9  # 使用传入的频率计算角频率
-            
-            if unit == 'p':  # 电容，单位pF
-                # 电容的阻抗：Z = -j/(ωC)
-                capacitance = value * 1e-12  # 转换为法拉
-                return complex(0, -1 / (omega * capacitance))
-            elif unit == 'n':  # 电感，单位nH
-                # 电感的阻抗：Z = jωL
-                inductance = value * 1e-9  # 转换为亨利
-                return complex(0, omega * inductance)
-            else:  # 电阻，单位欧姆
-                return complex(value, 0)
-    
-    def find_matching_parenthesis(s: str, start: int) -> int:
-        """找到匹配的右括号位置。"""
-        count = 1
-        for i in range(start + 1, len(s)):
-            if s[i] == '(':
-                count += 1
-            elif s[i] == ')':
-                count -= 1
-                if count == 0:
-                    return i
-        raise ValueError("括号不匹配")
-    
-    def parse_expression(expr: str) -> Union[complex, List[complex]]:
-        """递归解析表达式。"""
-        # 如果表达式中没有运算符，则为单个元件
-        if '+' not in expr and '/' not in expr:
-            return parse_value(expr)
-        
-        # 查找最后一个运算符
-        operators = []
-        i = 0
-        while i < len(expr):
-            if expr[i] == '(':
-                i = find_matching_parenthesis(expr, i)
-            elif expr[i] in '+/':
-                operators.append((i, expr[i]))
-            i += 1
-        
-        if not operators:
-            # 如果没有找到运算符，可能是被括号包围的表达式
-            if expr[0] == '(' and expr[-1] == ')':
-                return parse_expression(expr[1:-1])
-            else:
-                return parse_value(expr)
-        
-        # 获取最后一个运算符
-        op_pos, op = operators[-1]
-        
-        # 分割表达式
-        left = expr[:op_pos]
-        right = expr[op_pos + 1:]
-        
-        # 递归处理左右表达式
-        z1 = parse_expression(left)
-        z2 = parse_expression(right)
-        
-        # 根据运算符计算结果
-        if op == '+':
-            # 串联：Z = Z1 + Z2
-            if isinstance(z1, list):
-                return [z1[i] + z2[i] for i in range(len(z1))]
-            return z1 + z2
-        else:  # op == '/'
-            # 并联：Z = (Z1 * Z2)/(Z1 + Z2)
-            if isinstance(z1, list):
-                return [(z1[i] * z2[i])/(z1[i] + z2[i]) for i in range(len(z1))]
-            return (z1 * z2)/(z1 + z2)
-    
-    return parse_expression(circuit_str)
+            tokens.append((kind, match.group(), position))
+        position = match.end()
+    return tokens
+
+class CircuitNode:
+    """电路字符串语法树的节点，结构相同的子树全局只有一个实例（由 leaf_node/combine_nodes 内部化）
+
+    op 为 'leaf'、'+'（串联）或 '/'（并联）；叶子节点的 value、unit 为数值和单位，
+    运算节点的 left、right 为子节点。leaf_count 为子树中元件数值的个数。
+    节点可直接作为字典键，求值时据此在多行之间共用子树的结果。
+    """
+    __slots__ = ('op', 'value', 'unit', 'left', 'right', 'leaf_count', '__weakref__')
+
+    def __init__(self, op: str, value: float = None, unit: str = None, left: 'CircuitNode' = None,
+                 right: 'CircuitNode' = None):
+        self.op = op
+        self.value = value
+        self.unit = unit
+        self.left = left
+        self.right = right
+        self.leaf_count = 1 if op == 'leaf' else left.leaf_count + right.leaf_count
+
+    def __repr__(self):
+        if self.op == 'leaf':
+            return f"{self.value:g}{self.unit}"
+        return f"({self.left!r}{self.op}{self.right!r})"
+
+# {('leaf', 数值, 单位) 或 (运算符, 左子节点, 右子节点): 节点}；弱引用，不再被任何语法树引用的节点自动移除
+_interned = weakref.WeakValueDictionary()
+PARSE_CACHE_SIZE = 4096 # 解析结果缓存的字符串个数，超出时淘汰最久未用的
+
+def leaf_node(value: float, unit: str) -> CircuitNode:
+    key = ('leaf', value, unit)
+    node = _interned.get(key)
+    if node is None:
+        node = _interned[key] = CircuitNode('leaf', value=value, unit=unit)
+    return node
+
+def combine_nodes(op: str, left: CircuitNode, right: CircuitNode) -> CircuitNode:
+    # 子节点已内部化，按对象本身区分即可
+    key = (op, left, right)
+    node = _interned.get(key)
+    if node is None:
+        node = _interned[key] = CircuitNode(op, left=left, right=right)
+    return node
+
+def parse_circuit(circuit_str: str) -> CircuitNode:
+    """把电路字符串解析为内部化的语法树，最近用过的 PARSE_CACHE_SIZE 个字符串只解析一次
+
+    单次扫描、用显式栈处理括号，耗时与字符串长度成正比，嵌套深度不受递归限制。
+    + 和 / 优先级相同、从左到右结合（a+b/c 即 (a+b)/c），与原先按最后一个运算符拆分的规则一致。
+    语法错误时抛出 CircuitSyntaxError（ValueError 的子类）。
+    """
+    return _parse(re.sub(r'\s+', '', circuit_str))
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse(circuit_str: str) -> CircuitNode:
+    stack = [] # 未闭合的括号：(括号前的子树, 括号前的运算符, 左括号位置)
+    current, pending = None, None
+    for kind, content, position in tokenize(circuit_str):
+        expect_operand = current is None or pending is not None
+        if kind in ('value', 'open') and not expect_operand:
+            text = f"{content[0]:g}{content[1]}" if kind == 'value' else content
+            raise CircuitSyntaxError(position, f"'{text}' 前缺少运算符 + 或 /")
+        if kind in ('op', 'close') and expect_operand:
+            raise CircuitSyntaxError(position, f"'{content}' 前缺少元件值")
+        if kind == 'open':
+            stack.append((current, pending, position))
+            current, pending = None, None
+            continue
+        if kind == 'op':
+            pending = content
+            continue
+        if kind == 'value':
+            operand = leaf_node(*content)
+        else:
+            if not stack:
+                raise CircuitSyntaxError(position, "多余的右括号")
+            operand = current
+            current, pending, _ = stack.pop()
+        current = operand if current is None else combine_nodes(pending, current, operand)
+        pending = None
+    if stack:
+        raise CircuitSyntaxError(stack[-1][2], "括号不匹配")
+    if current is None or pending is not None:
+        raise CircuitSyntaxError(len(circuit_str), "缺少元件值")
+    return current
+
+def clear_cache():
+    """清空解析结果缓存；内部化的节点在不再被引用后随之释放"""
+    _parse.cache_clear()
+
+def _leaf_impedance(unit: str, value, omega: np.ndarray) -> np.ndarray:
+    if unit == 'p':  # 电容，单位pF
+        return -1j / (omega * value * 1e-12)
+    elif unit == 'n':  # 电感，单位nH
+        return 1j * omega * value * 1e-9
+    return value + 0j * omega  # 电阻，单位欧姆
+
+def evaluate_impedance(node: CircuitNode, omega: np.ndarray, leaf_values: np.ndarray = None,
+                       memo: dict = None) -> np.ndarray:
+    """按语法树求阻抗 (..., F)，omega 为角频率数组
+
+    leaf_values 形状 (..., 元件数值个数)，按出现顺序替换数值；memo 为 {节点: 阻抗}，
+    给出时（且不替换数值）已求过的子树直接取用。用显式栈后序遍历，不受递归深度限制。
+    """
+    if leaf_values is not None:
+        memo = None
+    results = []
+    stack = [(node, 0, False)]
+    while stack:
+        current, offset, expanded = stack.pop()
+        if memo is not None and current in memo:
+            results.append(memo[current])
+            continue
+        if current.op == 'leaf':
+            value = current.value if leaf_values is None else leaf_values[..., offset, None]
+            z = _leaf_impedance(current.unit, value, omega)
+        elif not expanded:
+            stack.append((current, offset, True))
+            stack.append((current.right, offset + current.left.leaf_count, False))
+            stack.append((current.left, offset, False))
+            continue
+        else:
+            z2 = results.pop()
+            z1 = results.pop()
+            z = z1 + z2 if current.op == '+' else (z1 * z2) / (z1 + z2)
+        if memo is not None:
+            z.flags.writeable = False
+            memo[current] = z
+        results.append(z)
+    return results[0]
+
+class CircuitEvaluator:
+    """一个频率批次内的阻抗求值器：内部化的子树各求值一次，多行之间共用结果
+
+    例如 S(2p+3n) 与 P((2p+3n)/50o) 中的 2p+3n 只计算一次。返回的数组为只读。
+    """
+
+    def __init__(self, frequency_ghz: np.ndarray):
+        self.frequency_ghz = np.asarray(frequency_ghz, dtype=float)
+        self.omega = 2 * np.pi * self.frequency_ghz * 1e9
+        self._memo = {}
+
+    def impedance(self, circuit_str: str) -> np.ndarray:
+        return evaluate_impedance(parse_circuit(circuit_str), self.omega, memo=self._memo)
+
+# 元件数值的匹配模式：数值 + 单位（p/n/o）
+VALUE_PATTERN = re.compile(r'(\d+\.?\d*)(p|n|o)')
+
+def _leaf_matches(circuit_str: str) -> list:
+    """按顺序返回元件数值的匹配，跳过 Touchstone 文件名（如 filter2p.s2p）中的字符"""
+    if is_file_reference(circuit_str):
+        return []
+    spans = file_reference_spans(circuit_str)
+    return [m for m in VALUE_PATTERN.finditer(circuit_str)
+            if not any(start <= m.start() < end for start, end in spans)]
+
+def circuit_leaf_values(circuit_str: str) -> List[Tuple[float, str]]:
+    """按出现顺序列出字符串中所有元件数值及其单位。
+
+    返回：
+        [(数值, 单位)] 列表，单位为 'p'、'n' 或 'o'
+    """
+    circuit_str = re.sub(r'\s+', '', circuit_str)
+    return [(float(m.group(1)), m.group(2)) for m in _leaf_matches(circuit_str)]
+
+def replace_leaf_values(circuit_str: str, new_values: dict) -> str:
+    """把字符串中第 k 个元件数值替换为 new_values[k]，单位保持不变。
+
+    数值以定点小数写回，保证仍能被 parse_circuit_string 解析。
+    """
+    circuit_str = re.sub(r'\s+', '', circuit_str)
+    pieces = []
+    position = 0
+    for k, match in enumerate(_leaf_matches(circuit_str)):
+        if k not in new_values:
+            continue
+        text = np.format_float_positional(abs(float(new_values[k])), precision=6, unique=True, fractional=False, trim='-')
+        pieces.append(circuit_str[position:match.start()] + f"{text}{match.group(2)}")
+        position = match.end()
+    return ''.join(pieces) + circuit_str[position:]
+
+def circuit_impedance_array(circuit_str: str, frequency_ghz: np.ndarray, leaf_values: np.ndarray = None) -> np.ndarray:
+    """parse_circuit_string 的向量化版本，可批量替换元件数值。
+
+    参数：
+        circuit_str: str，电路字符串，规则同 parse_circuit_string
+        frequency_ghz: np.ndarray，频率数组（GHz），形状 (F,)
+        leaf_values: np.ndarray，可选，形状 (..., 元件数值个数)，按出现顺序
+                     替换字符串中的数值，前导维度作为批量维度
+
+    返回：
+        np.ndarray：阻抗，形状 (..., F)
+    """
+    node = parse_circuit(circuit_str)
+    omega = 2 * np.pi * np.asarray(frequency_ghz, dtype=float) * 1e9
+    if leaf_values is not None:
+        leaf_values = np.asarray(leaf_values, dtype=float)
+        if leaf_values.shape[-1] != node.leaf_count:
+            raise ValueError(f"元件数值个数不匹配：需要 {node.leaf_count} 个，提供了 {leaf_values.shape[-1]} 个")
+    return evaluate_impedance(node, omega, leaf_values)
 
 class SeriesCircuit:
     """串联电路类，用于计算串联电路的ABCD矩阵"""
@@ -0,0 +1,185 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+import numpy as np
+
+from scaled_propagation import ScaledPropagationSolver
+from solver_kernel import BatchedFeedSolver
+
+
+def remap_elements(antenna_elements: List[dict], step_ratio: float, num_grids: int) -> List[dict]:
+    """把元件索引换算到另一套网格（物理位置不变），step_ratio = 原网格步长 / 新网格步长"""
+    remapped = []
+    for element in antenna_elements:
+        element = dict(element)
+        index = element.get('索引')
+        if index is not None:
+            element['索引'] = int(min(max(round(index * step_ratio), 0), num_grids - 1))
+        remapped.append(element)
+    return remapped
+
+
+def _solve_level(task: dict):
+    """工作进程入口：求解一个网格密度，返回馈电阻抗和比较位置上的电流"""
+    start_time = time.time()
+    solver = BatchedFeedSolver(task['frequencies_ghz'], task['num_grids'], task['rlgc_per_step'],
+                               task['antenna_elements'], task['load_impedance'])
+    _, current, impedance = ScaledPropagationSolver(solver).solve()
+    return impedance, current[:, task['compare_indices']], time.time() - start_time
+
+
+class ConvergenceResult:
+    """网格收敛分析结果
+
+    属性：
+        levels: 每个网格密度一项 {'grid_step', 'grid_count', 'impedance_change', 'current_change', 'elapsed'}，
+                change 为与下一级（更密）网格的最大相对差，最后一级为 NaN；grid_step 单位 mm
+        tolerance: 收敛容差
+        recommended: 满足容差的最便宜（网格数最少）的级别序号，未收敛时为 None
+    """
+
+    def __init__(self, levels: List[dict], tolerance: float):
+        self.levels = levels
+        self.tolerance = tolerance
+        self.recommended = None
+        for i, level in enumerate(levels):
+            if level['impedance_change'] < tolerance and level['current_change'] < tolerance:
+                self.recommended = i
+                break
+
+    @property
+    def converged(self) -> bool:
+        return self.recommended is not None
+
+    def recommended_grid(self) -> Optional[dict]:
+        """推荐网格的 {'grid_step': mm, 'grid_count': 网格数}，未收敛时为 None"""
+        if self.recommended is None:
+            return None
+        level = self.levels[self.recommended]
+        return {'grid_step': level['grid_step'], 'grid_count': level['grid_count']}
+
+    def summary(self) -> str:
+        """用于打印的结果表"""
+        lines = [f"{'步长(mm)':>10} {'网格数':>8} {'Zin变化':>12} {'电流变化':>12} {'耗时(s)':>8}"]
+        for i, level in enumerate(self.levels):
+            mark = ' <- 推荐' if i == self.recommended else ''
+            lines.append(f"{level['grid_step']:>10.5g} {level['grid_count']:>8} {level['impedance_change']:>12.3e} "
+                         f"{level['current_change']:>12.3e} {level['elapsed']:>8.2f}{mark}")
+        if self.converged:
+            lines.append(f"满足容差 {self.tolerance:g} 的最少网格数为 {self.levels[self.recommended]['grid_count']}")
+        else:
+            lines.append(f"在已计算的网格密度内未达到容差 {self.tolerance:g}")
+        return '\n'.join(lines)
+
+
+class MeshConvergenceStudy:
+    """网格收敛分析
+
+    从较粗的网格开始，每级按 refinement 倍加密（元件保持物理位置不变），
+    比较相邻两级的馈电输入阻抗和电流分布（在最粗网格的节点位置上取值，按单位馈电电流归一化），
+    最大相对差小于 tolerance 时停止，并给出满足容差的最便宜网格。
+    workers > 1 时每次并行计算 workers 个级别。
+    """
+
+    def __init__(self, frequencies_ghz, antenna_length: float, rlgc_per_length, antenna_elements: List[dict],
+                 base_step: float, load_impedance: complex = 50.0, tolerance: float = 1e-3,
+                 start_factor: float = 8.0, refinement: float = 2.0, max_levels: int = 6, workers: int = 1):
+        """
+        参数：
+            frequencies_ghz: 频率数组（GHz）
+            antenna_length: 天线长度（m）
+            rlgc_per_length: 单位长度 (R, L, G, C)
+            antenna_elements: 以 base_step 网格为准的天线数据
+            base_step: 当前网格步长（m）
+            tolerance: 相邻两级的最大相对差容差
+            start_factor: 最粗一级步长为 base_step 的倍数
+            refinement: 相邻两级步长之比
+            max_levels: 最多计算的级数
+            workers: 并行进程数
+        """
+        self.frequencies_ghz = np.atleast_1d(np.asarray(frequencies_ghz, dtype=float))
+        self.antenna_length = float(antenna_length)
+        self.rlgc_per_length = tuple(rlgc_per_length)
+        self.antenna_elements = [dict(element) for element in antenna_elements]
+        self.base_step = float(base_step)
+        self.load_impedance = load_impedance
+        self.tolerance = tolerance
+        self.start_factor = start_factor
+        self.refinement = refinement
+        self.max_levels = int(max_levels)
+        self.workers = int(workers)
+        if self.base_step <= 0 or self.antenna_length <= 0:
+            raise ValueError("网格步长和天线长度必须为正")
+
+    @classmethod
+    def from_data_source(cls, data_source, **options):
+        """以当前的频率、网格、传输线设置和天线数据创建分析"""
+        grid_step = data_source.get_grid_step()
+        grid_array = data_source.get_grid_array()
+        if grid_step <= 0 or len(grid_array) < 2:
+            raise ValueError("当前网格无效，无法进行收敛分析")
+        rlgc_per_length = tuple(value / grid_step for value in data_source.get_unit_rlgc_per_step())
+        return cls(data_source.get_freq_array_ghz(), grid_array[-1], rlgc_per_length,
+                   data_source.antenna_elements_data, grid_step, **options)
+
+    def level_steps(self) -> np.ndarray:
+        """各级网格步长（m），由粗到细"""
+        return self.base_step * self.start_factor / self.refinement ** np.arange(self.max_levels)
+
+    def _build_task(self, step: float, compare_positions: np.ndarray) -> dict:
+        num_grids = int(self.antenna_length / step + 1e-9) + 1
+        return {
+            'frequencies_ghz': self.frequencies_ghz,
+            'num_grids': num_grids,
+            'rlgc_per_step': tuple(value * step for value in self.rlgc_per_length),
+            'antenna_elements': remap_elements(self.antenna_elements, self.base_step / step, num_grids),
+            'load_impedance': self.load_impedance,
+            'compare_indices': np.minimum(np.round(compare_positions / step).astype(int), num_grids - 1),
+        }
+
+    @staticmethod
+    def _relative_change(current, reference) -> float:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scale = np.nanmax(np.abs(reference)) if np.any(np.isfinite(reference)) else np.nan
+            if not scale > 0:
+                return float('nan')
+            return float(np.nanmax(np.abs(current - reference)) / scale)
+
+    def run(self) -> ConvergenceResult:
+        """逐级（或每次并行多级）计算，收敛后停止"""
+        steps = self.level_steps()
+        coarse_count = int(self.antenna_length / steps[0] + 1e-9) + 1
+        compare_positions = np.arange(coarse_count) * steps[0]
+        tasks = [self._build_task(step, compare_positions) for step in steps]
+
+        levels, outputs = [], []
+        batch = max(1, self.workers)
+        executor = ProcessPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+        try:
+            for start in range(0, len(tasks), batch):
+                batch_tasks = tasks[start:start + batch]
+                if executor is not None:
+                    results = list(executor.map(_solve_level, batch_tasks))
+                else:
+                    results = [_solve_level(task) for task in batch_tasks]
+                for task, (impedance, current, elapsed) in zip(batch_tasks, results):
+                    levels.append({'grid_step': float(steps[len(levels)] * 1000), 'grid_count': task['num_grids'],
+                                   'impedance_change': float('nan'), 'current_change': float('nan'),
+                                   'elapsed': elapsed})
+                    outputs.append((impedance, current))
+                    if len(outputs) > 1:
+                        previous = levels[-2]
+                        previous['impedance_change'] = self._relative_change(outputs[-2][0], impedance)
+                        previous['current_change'] = self._relative_change(outputs[-2][1], current)
+                        print(f"网格数 {previous['grid_count']} → {task['num_grids']}：Zin 变化 "
+                              f"{previous['impedance_change']:.3e}，电流变化 {previous['current_change']:.3e}")
+                if ConvergenceResult(levels, self.tolerance).converged:
+                    break
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        result = ConvergenceResult(levels, self.tolerance)
+        print(result.summary())
+        return result
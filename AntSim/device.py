@@ -2,6 +2,12 @@ from PyQt5.QtWidgets import (QTreeWidget, QTreeWidgetItem, QComboBox,
                             QSpinBox, QSlider, QLineEdit, QMenu, QWidget)
 from PyQt5.QtCore import Qt, pyqtSignal
 
+from element_bulk import ElementBulkDialog
+from validation import validate_expression, format_diagnostics
+
+# 值未通过校验时值列输入框的样式
+INVALID_VALUE_STYLE = "QLineEdit { border: 1px solid #d9534f; background-color: #fdecea; }"
+
 class Antenna(QTreeWidget):
     data_changed = pyqtSignal() # 添加信号
 
@@ -62,10 +68,14 @@ class Antenna(QTreeWidget):
 
         # --- 连接信号以触发 data_changed ---
         # --- 修改：类型改变不再需要调用 _on_type_changed 来控制编辑状态 ---
+        # 先校验再通知数据变化，计算时元件表中已有本行的校验结果
+        combo.currentIndexChanged.connect(lambda _, it=item: self.validate_row(it))
         combo.currentIndexChanged.connect(self.data_changed.emit) # 类型改变时直接发射信号
         # --- 修改结束 ---
+        line_edit.editingFinished.connect(lambda it=item: self.validate_row(it))
         line_edit.editingFinished.connect(self.data_changed.emit) # 值编辑完成时
 
+        self.validate_row(item)
         # 触发一次初始位置更新
         self.update_position(item, index_val)
 
@@ -84,6 +94,24 @@ class Antenna(QTreeWidget):
     # --- 移除结束 ---
 
 
+    def validate_row(self, item):
+        """校验一行的类型和值，无效时在值列标红并在提示中列出诊断（位置和说明），返回诊断元组
+
+        只在行被编辑时调用一次，结果按字符串缓存；计算时跳过无效行，不再弹出提示。
+        """
+        combo = self.itemWidget(item, 0)
+        line_edit = self.itemWidget(item, 4)
+        if not combo or not line_edit:
+            return ()
+        diagnostics = validate_expression(line_edit.text(), combo.currentText())
+        if diagnostics:
+            line_edit.setStyleSheet(INVALID_VALUE_STYLE)
+            line_edit.setToolTip(f"该行无效，计算时跳过：\n{format_diagnostics(diagnostics)}")
+        else:
+            line_edit.setStyleSheet("")
+            line_edit.setToolTip("")
+        return diagnostics
+
     def update_position(self, item, index):
         # 计算实际位置并更新第1列
         actual_pos = index * self.grid_step
@@ -131,6 +159,9 @@ class Antenna(QTreeWidget):
         add_action = menu.addAction("新建行")
         add_action.triggered.connect(self.add_row_interactive) # 使用新方法
 
+        bulk_action = menu.addAction("批量生成/导入...")
+        bulk_action.triggered.connect(self.add_rows_interactive)
+
         delete_action = menu.addAction("删除选中行")
         delete_action.triggered.connect(self.delete_selected)
 
@@ -140,6 +171,33 @@ class Antenna(QTreeWidget):
         """通过菜单添加新行"""
         self.add_row() # 使用默认值添加
 
+    def add_rows_interactive(self):
+        """通过批量对话框生成或导入多行"""
+        dialog = ElementBulkDialog(self.grid_count, self.grid_step, self)
+        if dialog.exec_() == ElementBulkDialog.Accepted and dialog.rows:
+            self.add_rows(dialog.rows, replace=dialog.replace)
+
+    def add_rows(self, rows, replace=False):
+        """批量添加行，rows 为 get_all_data 格式的字典列表；replace 为 True 时先清空现有行
+
+        期间阻止信号并暂停重绘，完成后只发射一次 data_changed。
+        """
+        self.setUpdatesEnabled(False)
+        self.blockSignals(True)
+        try:
+            if replace:
+                self.clear()
+            for data_item in rows:
+                self.add_row(
+                    index_val=data_item.get('索引', 0),
+                    type_val=data_item.get('类型', "馈电"),
+                    value_val=data_item.get('值', "")
+                )
+        finally:
+            self.blockSignals(False)
+            self.setUpdatesEnabled(True)
+        self.data_changed.emit()
+
     def delete_selected(self):
         items_to_delete = self.selectedItems()
         if not items_to_delete: return
@@ -186,13 +244,17 @@ class Antenna(QTreeWidget):
             })
         return data
 
+    def set_row_values(self, values):
+        """批量修改若干行的值字符串，values 为 {行号: 新字符串}，逐行重新校验后只发射一次 data_changed"""
+        for row, value_str in values.items():
+            item = self.topLevelItem(row)
+            if not item: continue
+            line_edit = self.itemWidget(item, 4)
+            if line_edit:
+                line_edit.setText(value_str) # setText 不会触发 editingFinished，需在此校验
+                self.validate_row(item)
+        self.data_changed.emit()
+
     def set_all_data(self, data_list):
-        """用提供的数据列表完全替换控件内容"""
-        self.clear() # 清除现有所有行
-        for data_item in data_list:
-            self.add_row(
-                index_val=data_item.get('索引', 0),
-                type_val=data_item.get('类型', "馈电"),
-                value_val=data_item.get('值', "0")
-            )
-        # set_all_data 完成后不需要单独发射信号，因为 add_row 内部会发射
\ No newline at end of file
+        """用提供的数据列表完全替换控件内容，只发射一次 data_changed"""
+        self.add_rows(data_list, replace=True)
\ No newline at end of file
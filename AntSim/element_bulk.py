@@ -0,0 +1,196 @@
+import csv
+import json
+import os
+
+import numpy as np
+from PyQt5 import QtWidgets
+
+from validation import validate_expression
+
+ELEMENT_TYPES = ('馈电', '元件')
+# 导入文件的列名和类型名，中英文均可
+COLUMN_ALIASES = {'类型': '类型', 'type': '类型', '索引': '索引', 'index': '索引', '值': '值', 'value': '值',
+                  '实际位置': '实际位置', 'position': '实际位置'}
+TYPE_ALIASES = {'馈电': '馈电', 'feed': '馈电', '元件': '元件', 'element': '元件'}
+
+
+def periodic_elements(value: str, period: int, start: int = 0, count: int = None, stop: int = None,
+                      element_type: str = '元件') -> list:
+    """每隔 period 个网格放置一个相同的元件，索引为 start, start + period, ...
+
+    给出 count 时共 count 个，否则一直放到 stop（不含）为止。
+    """
+    if period < 1:
+        raise ValueError("周期必须至少为 1 个网格")
+    if count is None and stop is None:
+        raise ValueError("需要给出个数 count 或终止索引 stop")
+    indices = np.arange(start, stop if count is None else start + period * count, period)
+    if count is not None and stop is not None:
+        indices = indices[indices < stop]
+    return [{'类型': element_type, '索引': int(index), '值': value} for index in indices]
+
+
+def _normalize_row(raw: dict, row: int, grid_step_mm: float = None) -> dict:
+    """把导入文件中的一行规范为 {'类型', '索引', '值'}；只有实际位置（mm）时按网格步长换算索引"""
+    fields = {}
+    for key, value in raw.items():
+        name = None if key is None else COLUMN_ALIASES.get(key.strip(), COLUMN_ALIASES.get(key.strip().lower()))
+        if name:
+            fields[name] = value
+    type_text = str(fields.get('类型', '元件')).strip()
+    element_type = TYPE_ALIASES.get(type_text.lower(), TYPE_ALIASES.get(type_text))
+    if element_type is None:
+        raise ValueError(f"第 {row + 1} 行：未知的类型 {type_text}")
+    try:
+        if fields.get('索引') not in (None, ''):
+            index = int(float(fields['索引']))
+        elif fields.get('实际位置') not in (None, '') and grid_step_mm:
+            index = int(round(float(fields['实际位置']) / grid_step_mm))
+        else:
+            raise ValueError("缺少索引")
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"第 {row + 1} 行：索引无效（{e}）")
+    return {'类型': element_type, '索引': index, '值': str(fields.get('值', '') or '').strip()}
+
+
+def read_elements_csv(path: str, grid_step_mm: float = None) -> list:
+    """读取 CSV（首行为列名：类型/type、索引/index、值/value、实际位置/position）"""
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        return [_normalize_row(raw, row, grid_step_mm) for row, raw in enumerate(csv.DictReader(f))]
+
+
+def read_elements_json(path: str, grid_step_mm: float = None) -> list:
+    """读取 JSON：行字典的列表，或含 'elements' 列表的对象（如工程文件）"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get('elements', [])
+    if not isinstance(data, list):
+        raise ValueError("JSON 中没有元件列表")
+    return [_normalize_row(raw, row, grid_step_mm) for row, raw in enumerate(data)]
+
+
+def read_elements(path: str, grid_step_mm: float = None) -> list:
+    """按扩展名读取 CSV 或 JSON，格式错误时抛出 ValueError"""
+    extension = os.path.splitext(path)[1].lower()
+    try:
+        if extension == '.csv':
+            return read_elements_csv(path, grid_step_mm)
+        if extension == '.json':
+            return read_elements_json(path, grid_step_mm)
+    except (OSError, json.JSONDecodeError, csv.Error) as e:
+        raise ValueError(f"读取 {path} 失败: {e}")
+    raise ValueError(f"不支持的文件类型: {extension}（应为 .csv 或 .json）")
+
+
+def compile_elements(rows: list, grid_count: int):
+    """一次检查全部行：索引范围、类型，以及值字符串能否解析
+
+    值字符串的校验结果按字符串缓存（见 validation），相同的行只检查一次。返回 (有效的行, [(行序号, 错误信息)])。
+    """
+    valid, errors = [], []
+    for row, element in enumerate(rows):
+        if element.get('类型') not in ELEMENT_TYPES:
+            errors.append((row, f"未知的类型 {element.get('类型')}"))
+            continue
+        if not 0 <= element.get('索引', -1) < grid_count:
+            errors.append((row, f"索引 {element.get('索引')} 超出范围 0 ~ {grid_count - 1}"))
+            continue
+        diagnostics = validate_expression(element.get('值', ''), element['类型'])
+        if diagnostics:
+            errors.append((row, f"值 {element.get('值')} 无效：{diagnostics[0]}"))
+        else:
+            valid.append(element)
+    return valid, errors
+
+
+class ElementBulkDialog(QtWidgets.QDialog):
+    """批量生成（每隔 k 个网格放置一个元件）或从 CSV/JSON 导入元件行
+
+    确定后 rows 为检查通过的行，replace 表示是否替换现有行；由 Antenna.add_rows 一次加入。
+    """
+
+    def __init__(self, grid_count: int, grid_step_mm: float, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("批量添加元件")
+        self.grid_count = grid_count
+        self.grid_step_mm = grid_step_mm
+        self.rows = []
+        self.replace = False
+
+        self.tabs = QtWidgets.QTabWidget()
+        # 周期生成
+        periodic = QtWidgets.QWidget()
+        form = QtWidgets.QFormLayout(periodic)
+        self.type_combo = QtWidgets.QComboBox()
+        self.type_combo.addItems(ELEMENT_TYPES[::-1])
+        self.value_edit = QtWidgets.QLineEdit("S(1p)")
+        last = max(0, grid_count - 1)
+        self.start_spin = QtWidgets.QSpinBox()
+        self.start_spin.setRange(0, last)
+        self.period_spin = QtWidgets.QSpinBox()
+        self.period_spin.setRange(1, max(1, last))
+        self.period_spin.setValue(min(100, max(1, last)))
+        self.count_spin = QtWidgets.QSpinBox()
+        self.count_spin.setRange(0, max(1, grid_count))
+        self.count_spin.setSpecialValueText("直到末端")
+        form.addRow("类型", self.type_combo)
+        form.addRow("值", self.value_edit)
+        form.addRow("起始索引", self.start_spin)
+        form.addRow("周期（网格数）", self.period_spin)
+        form.addRow("个数", self.count_spin)
+        self.tabs.addTab(periodic, "周期生成")
+        # 从文件导入
+        importer = QtWidgets.QWidget()
+        file_layout = QtWidgets.QHBoxLayout(importer)
+        self.path_edit = QtWidgets.QLineEdit()
+        self.path_edit.setPlaceholderText("CSV 或 JSON 文件（列：类型、索引或实际位置、值）")
+        browse = QtWidgets.QPushButton("浏览...")
+        browse.clicked.connect(self._browse)
+        file_layout.addWidget(self.path_edit)
+        file_layout.addWidget(browse)
+        self.tabs.addTab(importer, "从文件导入")
+
+        self.replace_check = QtWidgets.QCheckBox("替换现有行")
+        self.status_label = QtWidgets.QLabel()
+        self.status_label.setWordWrap(True)
+        buttons = QtWidgets.QDialogButtonBox(QtWidgets.QDialogButtonBox.Ok | QtWidgets.QDialogButtonBox.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.addWidget(self.tabs)
+        layout.addWidget(self.replace_check)
+        layout.addWidget(self.status_label)
+        layout.addWidget(buttons)
+
+    def _browse(self):
+        path, _ = QtWidgets.QFileDialog.getOpenFileName(self, "导入元件", "", "元件表 (*.csv *.json)")
+        if path:
+            self.path_edit.setText(path)
+
+    def _requested_rows(self) -> list:
+        if self.tabs.currentIndex() == 0:
+            count = self.count_spin.value() or None
+            return periodic_elements(self.value_edit.text().strip(), self.period_spin.value(), self.start_spin.value(),
+                                     count, self.grid_count, self.type_combo.currentText())
+        return read_elements(self.path_edit.text().strip(), self.grid_step_mm)
+
+    def accept(self):
+        try:
+            rows = self._requested_rows()
+        except ValueError as e:
+            self.status_label.setText(str(e))
+            return
+        valid, errors = compile_elements(rows, self.grid_count)
+        if not valid:
+            self.status_label.setText("没有可添加的行。" + "".join(f"\n第 {row + 1} 行：{msg}" for row, msg in errors[:5]))
+            return
+        if errors:
+            detail = "\n".join(f"第 {row + 1} 行：{msg}" for row, msg in errors[:10])
+            more = f"\n……共 {len(errors)} 行" if len(errors) > 10 else ""
+            answer = QtWidgets.QMessageBox.question(self, "部分行无效", f"{detail}{more}\n\n跳过这些行，添加其余 {len(valid)} 行？")
+            if answer != QtWidgets.QMessageBox.Yes:
+                return
+        self.rows = valid
+        self.replace = self.replace_check.isChecked()
+        super().accept()
@@ -0,0 +1,188 @@
+import re
+from enum import IntEnum
+
+import numpy as np
+
+from calculation import element_abcd_array, feed_abcd_array, element_leaf_count
+from touchstone import FILE_REFERENCE, file_signature, referenced_files
+from validation import validate_expression
+
+
+class ElementKind(IntEnum):
+    """元件表中一行的类型"""
+    UNKNOWN = -1
+    FEED = 0     # 馈电
+    ELEMENT = 1  # 元件
+
+
+KIND_BY_NAME = {'馈电': ElementKind.FEED, '元件': ElementKind.ELEMENT}
+NAME_BY_KIND = {kind: name for name, kind in KIND_BY_NAME.items()}
+
+
+class CompiledExpression:
+    """值字符串的编译句柄
+
+    整张表中每个 (类型, 去空白的值) 只有一个句柄，值相同的行共用；表重建时未变化的值沿用原句柄。
+    句柄缓存最近一次（频率数组, 负载阻抗）下的标称 ABCD，多个内核在同一频率上求解时不重复计算；
+    引用 Touchstone 文件时键还包括各文件的路径、大小和修改时间，文件改变后重新计算。
+    返回的数组为只读，供多行、多个内核（包括后台线程）共用。
+    valid 由构建表时的校验给出，无效的句柄不做计算。
+    """
+    __slots__ = ('kind', 'text', 'valid', 'references_files', '_leaf_count', '_cache')
+
+    def __init__(self, kind: ElementKind, text: str):
+        self.kind = kind
+        self.text = text
+        self.valid = True
+        self.references_files = FILE_REFERENCE.search(text) is not None
+        self._leaf_count = None
+        self._cache = (None, None) # (键, ABCD)，整体替换，其他线程不会读到不一致的键和值
+
+    @property
+    def leaf_count(self) -> int:
+        """可替换的元件数值个数"""
+        if self._leaf_count is None:
+            self._leaf_count = element_leaf_count(self.text)
+        return self._leaf_count
+
+    def abcd(self, frequencies_ghz: np.ndarray, leaf_values=None, load_impedance: complex = 50.0,
+             evaluator=None) -> np.ndarray:
+        """ABCD 矩阵 (..., F, 2, 2)；馈电为端接 load_impedance 后的并联形式。解析失败时抛出 ValueError
+
+        evaluator 为同一 frequencies_ghz 上的 circuit.CircuitEvaluator，各行共用的子电路只求值一次。
+        """
+        if not self.valid:
+            raise ValueError(f"值 {self.text} 未通过校验")
+        if self.kind == ElementKind.FEED:
+            compute = lambda: feed_abcd_array(self.text, frequencies_ghz, leaf_values, load_impedance, evaluator)
+        elif self.kind == ElementKind.ELEMENT:
+            compute = lambda: element_abcd_array(self.text, frequencies_ghz, leaf_values, evaluator)
+        else:
+            raise ValueError(f"未知的元件类型，无法计算 {self.text}")
+        if leaf_values is not None:
+            return compute()
+        key = (np.asarray(frequencies_ghz, dtype=float).tobytes(), complex(load_impedance))
+        if self.references_files:
+            key += (tuple(sorted(referenced_files(self.text).items())),)
+        cache = self._cache
+        if cache[0] != key:
+            value = compute()
+            value.flags.writeable = False
+            cache = self._cache = (key, value)
+        return cache[1]
+
+
+class ElementRecord:
+    """元件表中的一行"""
+    __slots__ = ('row', 'kind', 'index', 'position', 'value', 'expression', 'diagnostics')
+
+    def __init__(self, row: int, kind: ElementKind, index: int, position: float, value: str,
+                 expression: CompiledExpression, diagnostics: tuple = ()):
+        self.row = row                # 在表格中的行号
+        self.kind = kind              # ElementKind
+        self.index = index            # 网格索引，未给出时为 -1
+        self.position = position      # 实际位置（m），由索引和网格步长求得
+        self.value = value            # 原始值字符串
+        self.expression = expression  # CompiledExpression
+        self.diagnostics = diagnostics  # validation.Diagnostic 元组，空表示有效
+
+    def __repr__(self):
+        return f"ElementRecord({self.row}, {self.kind.name}, {self.index}, {self.value!r})"
+
+
+class ElementTable:
+    """结构化的元件表，在元件数据或网格变化时构建一次，供所有计算路径直接使用
+
+    属性：
+        elements: 原始的行字典列表（兼容按 '类型'/'索引'/'值' 读取的旧接口）
+        records: ElementRecord 元组
+        kinds / indices / positions: 逐行的类型、网格索引（未给出为 -1）、实际位置（m）数组
+        feed_rows / element_rows: 馈电行、元件行的行号数组
+        feed_indices: 各馈电的网格索引
+        invalid_rows: 未通过校验的行号，所有计算路径直接跳过（不弹出任何提示）
+        expressions: 表中全部不同的 CompiledExpression
+        files: 构建时引用的 Touchstone 文件 {文件名: touchstone.file_signature}
+    """
+
+    def __init__(self, elements, grid_step: float = 0.0, previous: 'ElementTable' = None):
+        """previous 为上一次构建的表，其中值未变化的编译句柄（及其缓存）被沿用；引用文件的句柄总是新建"""
+        self.elements = list(elements)
+        self.grid_step = grid_step
+        compiled = {}
+        if previous is not None:
+            compiled.update(((expression.kind, expression.text), expression) for expression in previous.expressions
+                            if not expression.references_files)
+        used = {}
+        records = []
+        for row, element in enumerate(self.elements):
+            kind = KIND_BY_NAME.get(element.get('类型'), ElementKind.UNKNOWN)
+            index = element.get('索引')
+            index = -1 if index is None else int(index)
+            value = element.get('值', '') or ''
+            key = (kind, re.sub(r'\s+', '', value))
+            expression = used.get(key) or compiled.get(key) or CompiledExpression(*key)
+            # 校验结果按字符串缓存；引用的文件可能已变化，沿用的句柄也重新确定是否有效
+            diagnostics = validate_expression(value, element.get('类型'))
+            if key not in used:
+                expression.valid = not diagnostics
+            used[key] = expression
+            position = index * grid_step if index >= 0 else np.nan
+            records.append(ElementRecord(row, kind, index, position, value, expression, diagnostics))
+        self.records = tuple(records)
+        self.expressions = list(used.values())
+        self.kinds = np.array([record.kind for record in records], dtype=np.int8)
+        self.indices = np.array([record.index for record in records], dtype=np.int64)
+        self.positions = np.array([record.position for record in records], dtype=float)
+        self.feed_rows = np.flatnonzero(self.kinds == ElementKind.FEED)
+        self.element_rows = np.flatnonzero(self.kinds == ElementKind.ELEMENT)
+        self.feed_indices = self.indices[self.feed_rows]
+        self.invalid_rows = np.array([record.row for record in records if record.diagnostics], dtype=np.int64)
+        self.files = {}
+        for expression in self.expressions:
+            if expression.references_files:
+                self.files.update(referenced_files(expression.text))
+
+    @classmethod
+    def coerce(cls, elements) -> 'ElementTable':
+        """ElementTable 原样返回，行字典列表则构建新表"""
+        return elements if isinstance(elements, ElementTable) else cls(elements)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def __getitem__(self, row: int) -> ElementRecord:
+        return self.records[row]
+
+    @property
+    def num_feeds(self) -> int:
+        return len(self.feed_rows)
+
+    def valid_rows(self, num_grids: int) -> np.ndarray:
+        """网格索引在 [0, num_grids) 内且通过校验的行号"""
+        valid = (self.indices >= 0) & (self.indices < num_grids)
+        valid[self.invalid_rows] = False
+        return np.flatnonzero(valid)
+
+    def invalid_summary(self) -> str:
+        """未通过校验的行的说明（每行一条，取第一条诊断），全部有效时为空字符串"""
+        return "\n".join(f"第 {row + 1} 行 {self.records[row].value}：{self.records[row].diagnostics[0]}"
+                         for row in self.invalid_rows.tolist())
+
+    def files_changed(self) -> bool:
+        """引用的文件在构建之后是否被修改、删除或新建"""
+        return any(file_signature(name) != signature for name, signature in self.files.items())
+
+    def signature(self) -> tuple:
+        """(类型, 索引, 去空白的值) 元组，用于判断两张表的输入是否一致"""
+        return tuple((int(record.kind), record.index, record.expression.text) for record in self.records)
+
+
+def element_table_of(data_source) -> ElementTable:
+    """数据源的元件表：AntSimData 提供缓存的表，其他同接口对象按 antenna_elements_data 临时构建"""
+    if hasattr(data_source, 'get_element_table'):
+        return data_source.get_element_table()
+    grid_step = data_source.get_grid_step() if hasattr(data_source, 'get_grid_step') else 0.0
+    return ElementTable(data_source.antenna_elements_data, grid_step)
@@ -0,0 +1,95 @@
+import time
+
+from PyQt5 import QtCore
+
+from element_table import element_table_of
+from scaled_propagation import ScaledPropagationSolver
+from solver_kernel import BatchedFeedSolver
+
+
+class InteractiveSession(QtCore.QObject):
+    """实时单频点模式
+
+    开启后，拖动元件滑块或修改元件值（AntSimData.data_updated）时自动重算当前频点的电流分布：
+    - 编辑请求先合并，按 frame_interval 节流，两次刷新之间的中间请求直接丢弃，只计算最新状态；
+    - 元件 ABCD 按 (类型, 值字符串) 缓存，只移动元件位置时不重新解析；
+    - 用按块归一化的打靶法在单频点上求解，结果写回计算器的单频点结果，
+      并通过 ResultPlot.update_single_freq_curve(interactive=True) 原地更新曲线。
+    """
+    update_finished = QtCore.pyqtSignal(float) # 一次刷新完成，参数为耗时（ms）
+
+    def __init__(self, calculator, result_plot, frequency_getter, frame_interval_ms: int = 33, parent=None):
+        """
+        参数：
+            calculator: AntSimCalculator，提供数据源和负载阻抗，并保存单频点结果
+            result_plot: ResultPlot，用于原地更新曲线
+            frequency_getter: 返回当前频点（GHz）的函数，如 Settings.get_current_freq
+            frame_interval_ms: 目标帧间隔（ms）
+        """
+        super().__init__(parent)
+        self.calculator = calculator
+        self.data_source = calculator.data_source
+        self.result_plot = result_plot
+        self.frequency_getter = frequency_getter
+        self.frame_interval_ms = frame_interval_ms
+        self.enabled = False
+        self.last_elapsed_ms = 0.0
+
+        self._pending = False
+        self._last_update = 0.0
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._flush)
+        self.data_source.data_updated.connect(self.request_update)
+
+    def set_enabled(self, enabled: bool):
+        """开启/关闭实时模式；开启时立即刷新一次"""
+        self.enabled = bool(enabled)
+        print(f"实时单频点模式: {'开启' if self.enabled else '关闭'}")
+        if self.enabled:
+            self.request_update()
+        else:
+            self._timer.stop()
+            self._pending = False
+
+    @QtCore.pyqtSlot()
+    def request_update(self):
+        """记录一次编辑请求；距上次刷新不足一个帧间隔时延后到帧边界，期间的请求合并"""
+        if not self.enabled:
+            return
+        self._pending = True
+        if self._timer.isActive():
+            return
+        elapsed_ms = (time.perf_counter() - self._last_update) * 1000
+        self._timer.start(int(max(0, self.frame_interval_ms - elapsed_ms)))
+
+    def _flush(self):
+        if not self._pending or not self.enabled:
+            return
+        self._pending = False
+        self.update_now()
+        self._last_update = time.perf_counter()
+
+    def update_now(self):
+        """立即按当前数据重算单频点分布并更新曲线"""
+        start_time = time.perf_counter()
+        frequency = float(self.frequency_getter())
+        grid_array = self.data_source.get_grid_array()
+        if len(grid_array) < 1:
+            return
+        # 元件表的编译句柄在拖动之间保留，值未变化的元件直接使用句柄缓存的 ABCD
+        kernel = BatchedFeedSolver([frequency], len(grid_array), self.data_source.get_unit_rlgc_per_step(),
+                                   element_table_of(self.data_source), self.calculator.load_impedance)
+        voltage, current, impedance = ScaledPropagationSolver(kernel).solve()
+
+        calculator = self.calculator
+        calculator.single_freq_ghz = frequency
+        calculator.single_freq_voltage_matrix = voltage[0]
+        calculator.single_freq_current_matrix = current[0]
+        calculator.single_freq_input_impedance = impedance[0]
+        calculator.single_freq_reflection_coefficient = calculator._reflection_coefficient(impedance[0])
+        if self.result_plot is not None and current.shape[2] > 0:
+            self.result_plot.update_single_freq_curve(interactive=True)
+
+        self.last_elapsed_ms = (time.perf_counter() - start_time) * 1000
+        self.update_finished.emit(self.last_elapsed_ms)
@@ -3,7 +3,14 @@ import sys
 import settings
 from antsim_data import AntSimData
 from antsim_calculator import AntSimCalculator # <--- 导入 Calculator
-from result_plot import ResultPlot
+from result_plot import ResultPlot, PatternPlot, TimeDomainPlot
+from radiation_pattern import RadiationPattern
+from time_domain import TimeDomainAnalysis
+from interactive import InteractiveSession
+from auto_trigger import AutoRecompute
+from progress import ProgressReporter, format_duration
+from result_cache import ResultCache
+import project
 from device import Antenna
 from simulation_button import SimulationButton, SimulationState # <--- 导入 SimulationButton
 import numpy as np
@@ -134,16 +141,185 @@ class MainWindow(QtWidgets.QMainWindow):
 
         # 点击 SimSweep 按钮时，触发频率扫描
         sim_sweep_button_widget.clicked.connect(lambda: (
-            print(f"当前频率扫描起始频率: {self.data_source.get_freq_array()[0] / 1e6:.2f} MHz"),
-            print(f"当前频率扫描结束频率: {self.data_source.get_freq_array()[-1] / 1e6:.2f} MHz"),
+            print(f"当前频率扫描起始频率: {self.ant_sim_data.get_freq_array()[0] / 1e6:.2f} MHz"),
+            print(f"当前频率扫描结束频率: {self.ant_sim_data.get_freq_array()[-1] / 1e6:.2f} MHz"),
             self.calculator.run_frequency_sweep()
         ))
         # --- 修改结束 ---
         # simulation_button_widget.clicked.connect(self.calculator.run_frequency_sweep) # 移除旧的连接
 
+        # 实时单频点模式：勾选后拖动元件即更新当前频点的电流曲线
+        self.interactive_session = InteractiveSession(self.calculator, self.result_plot,
+                                                      settings_instance.get_current_freq, parent=self)
+        interactive_checkbox = self.findChild(QtWidgets.QCheckBox, 'Interactive')
+        if interactive_checkbox:
+            interactive_checkbox.toggled.connect(self.interactive_session.set_enabled)
+        self.interactive_session.update_finished.connect(
+            lambda elapsed_ms: self.statusBar().showMessage(f"实时更新耗时 {elapsed_ms:.1f} ms", 2000))
+
+        # 方向图页：由扫描或单频点的电流分布计算远场方向图和方向性系数
+        self.pattern_plot = PatternPlot(self.result_widget)
+        self.pattern_source = self.findChild(QtWidgets.QComboBox, 'PatternSource')
+        pattern_button = self.findChild(QtWidgets.QPushButton, 'PatternCalc')
+        if pattern_button:
+            pattern_button.clicked.connect(lambda: self.show_pattern(settings_instance.get_current_freq()))
+
+        # 时域页：由扫描结果计算 TDR/TDT
+        self.time_domain_plot = TimeDomainPlot(self.result_widget)
+        self.time_axis = self.findChild(QtWidgets.QComboBox, 'TimeAxis')
+        time_domain_button = self.findChild(QtWidgets.QPushButton, 'TimeDomainCalc')
+        if time_domain_button:
+            time_domain_button.clicked.connect(self.show_time_domain)
+
+        # 自动触发：数据变化并静默一段时间后在后台重算频率扫描
+        self.auto_recompute = AutoRecompute(self.calculator, parent=self)
+        settings_instance.auto_trigger_changed.connect(self.auto_recompute.set_enabled)
+        self.auto_recompute.set_enabled(settings_instance.is_auto_trigger())
+        QtWidgets.QApplication.instance().aboutToQuit.connect(self.auto_recompute.shutdown)
+
+        # 状态栏：频率扫描进度条和进度说明（速率、已用时间、剩余时间）
+        self.progress_bar = QtWidgets.QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setMaximumWidth(200)
+        self.progress_bar.setVisible(False)
+        self.statusBar().addPermanentWidget(self.progress_bar)
+        self.calculator.progress_info.connect(self.on_progress_info)
+
+        # 文件菜单：工程的打开/保存，导出馈电端口的 S 参数
+        # 扫描结果按输入哈希缓存在磁盘上：打开/保存工程后在工程旁；未保存为工程时只在设置了 ANTSIM_CACHE_DIR 时缓存
+        self.settings_instance = settings_instance
+        self.project_path = None
+        directory = project.default_cache_directory()
+        if directory:
+            self.calculator.result_cache = ResultCache(directory)
+        for name, slot in (('actionOpenProject', self.open_project), ('actionSaveProject', self.save_project),
+                           ('actionSaveProjectAs', self.save_project_as),
+                           ('actionExportTouchstone', self.export_touchstone)):
+            action = self.findChild(QtWidgets.QAction, name)
+            if action:
+                action.triggered.connect(slot)
+
 
         self.show()
 
+    def show_pattern(self, freq_ghz):
+        """按所选数据源计算方向图，并显示 freq_ghz 处的切面"""
+        sweep = self.pattern_source is None or self.pattern_source.currentIndex() == 0
+        try:
+            pattern = RadiationPattern.from_calculator(self.calculator, sweep=sweep)
+        except ValueError as e:
+            msg = f"计算方向图失败: {e}"
+            print(msg)
+            self.statusBar().showMessage(msg, 5000)
+            return
+        if pattern is None:
+            msg = f"没有可用的{'频率扫描' if sweep else '单频点'}结果，请先计算。"
+            print(msg)
+            self.statusBar().showMessage(msg, 5000)
+            return
+        self.pattern_plot.plot(pattern, freq_ghz)
+        index = int(np.argmin(np.abs(pattern.frequencies_ghz - freq_ghz)))
+        self.statusBar().showMessage(f"方向性系数 {pattern.directivity_dbi[index, 0]:.2f} dBi，"
+                                     f"最大辐射方向 θ = {pattern.peak_theta[index, 0]:.1f}°", 5000)
+
+    def _set_project_path(self, path):
+        self.project_path = path
+        self.calculator.result_cache = ResultCache(project.cache_directory(path))
+        self.setWindowTitle(f"AntSim - {path}")
+
+    def open_project(self):
+        """打开工程：恢复设置和元件表，缓存中有一致的扫描结果时直接显示"""
+        path, _ = QtWidgets.QFileDialog.getOpenFileName(self, "打开工程", "",
+                                                        f"AntSim 工程 (*{project.PROJECT_EXTENSION})")
+        if not path:
+            return
+        try:
+            data = project.load_project(path)
+        except ValueError as e:
+            print(e)
+            self.statusBar().showMessage(str(e), 5000)
+            return
+        project.apply_project(data, path, self.settings_instance, self.antenna_widget, self.calculator)
+        self._set_project_path(path)
+        if self.calculator.load_cached_sweep():
+            self.statusBar().showMessage(f"已打开 {path}，扫描结果从缓存载入", 5000)
+        else:
+            self.statusBar().showMessage(f"已打开 {path}", 5000)
+
+    def save_project(self):
+        if self.project_path is None:
+            self.save_project_as()
+            return
+        try:
+            project.save_project(self.project_path, self.settings_instance, self.antenna_widget, self.calculator)
+        except OSError as e:
+            msg = f"保存工程失败: {e}"
+            print(msg)
+            self.statusBar().showMessage(msg, 5000)
+            return
+        self.calculator.store_sweep_cache() # 已有的扫描结果写入工程旁的缓存
+        self.statusBar().showMessage(f"已保存 {self.project_path}", 5000)
+
+    def save_project_as(self):
+        path, _ = QtWidgets.QFileDialog.getSaveFileName(self, "工程另存为", f"antenna{project.PROJECT_EXTENSION}",
+                                                        f"AntSim 工程 (*{project.PROJECT_EXTENSION})")
+        if not path:
+            return
+        if not path.lower().endswith(project.PROJECT_EXTENSION):
+            path += project.PROJECT_EXTENSION
+        self._set_project_path(path)
+        self.save_project()
+
+    def export_touchstone(self):
+        """选择文件名并导出 Touchstone 文件，扩展名由馈电数决定"""
+        num_feeds = self.ant_sim_data.get_element_table().num_feeds
+        if num_feeds == 0:
+            self.statusBar().showMessage("没有馈电，无法导出 Touchstone 文件。", 5000)
+            return
+        extension = f".s{num_feeds}p"
+        path, _ = QtWidgets.QFileDialog.getSaveFileName(self, "导出 Touchstone", f"antenna{extension}",
+                                                        f"Touchstone (*{extension})")
+        if not path:
+            return
+        if not path.lower().endswith(extension):
+            path += extension
+        if self.calculator.export_touchstone(path):
+            self.statusBar().showMessage(f"已导出 {path}", 5000)
+
+    def show_time_domain(self):
+        """由频率扫描结果计算并显示 TDR/TDT"""
+        try:
+            analysis = TimeDomainAnalysis.from_calculator(self.calculator)
+        except ValueError as e:
+            msg = f"计算时域响应失败: {e}"
+            print(msg)
+            self.statusBar().showMessage(msg, 5000)
+            return
+        if analysis is None:
+            msg = "没有可用的频率扫描结果，请先计算。"
+            print(msg)
+            self.statusBar().showMessage(msg, 5000)
+            return
+        use_distance = self.time_axis is not None and self.time_axis.currentIndex() == 1
+        self.time_domain_plot.plot(analysis, use_distance)
+        reflections = analysis.find_reflections()
+        if reflections:
+            time_s, distance, magnitude = reflections[0]
+            where = f"{distance * 1000:.2f} mm" if distance is not None else f"{time_s * 1e9:.3f} ns"
+            self.statusBar().showMessage(f"最强反射位于 {where}，幅度 {magnitude:.3f}", 5000)
+
+    def on_progress_info(self, info):
+        """显示计算进度；同步计算时事件循环被占用，因此直接重绘进度控件"""
+        finished = info['done'] >= info['total']
+        self.progress_bar.setVisible(not finished)
+        self.progress_bar.setValue(info['percent'])
+        if finished:
+            self.statusBar().showMessage(f"计算完成：{info['total']} 频点，用时 {format_duration(info['elapsed'])}，"
+                                         f"{info['rate']:.1f} 频点/s", 5000)
+        else:
+            self.statusBar().showMessage(ProgressReporter.describe(info))
+        self.statusBar().repaint()
+
 
 
 if __name__ == '__main__':
@@ -0,0 +1,230 @@
+import numpy as np
+from typing import List
+
+from nodal_solver import NodalSolver, solve_tridiagonal_multi
+from solver_kernel import BatchedFeedSolver
+from touchstone import TouchstoneWriter
+
+
+def _batched_inverse(matrices: np.ndarray) -> np.ndarray:
+    """批量求逆 (..., P, P)，奇异的矩阵得到 NaN"""
+    try:
+        return np.linalg.inv(matrices)
+    except np.linalg.LinAlgError:
+        flat = matrices.reshape((-1,) + matrices.shape[-2:])
+        result = np.full(flat.shape, np.nan + 0j, dtype=complex)
+        for i, matrix in enumerate(flat):
+            try:
+                result[i] = np.linalg.inv(matrix)
+            except np.linalg.LinAlgError:
+                pass
+        return result.reshape(matrices.shape)
+
+
+class MultiportNetwork:
+    """馈电端口之间的多端口网络
+
+    端口为各馈电所在的连接点（馈电网格段视为理想连接），端口参数不含馈电自身的匹配网络和负载；
+    termination_admittance 记录各馈电（匹配网络端接负载后）的并联导纳，
+    embedded_impedance 由此还原单馈电求解中“其余馈电接各自负载”的输入阻抗。
+
+    属性：
+        frequencies_ghz: (F,)
+        z: (F, P, P) 开路阻抗矩阵
+        reference_impedance: S 参数的参考阻抗
+        port_names: 端口名称
+        port_nodes: 各端口所在的网格索引（未给出时视为互不相同）
+    """
+
+    def __init__(self, frequencies_ghz, z: np.ndarray, reference_impedance: complex = 50.0,
+                 port_names: List[str] = None, termination_admittance: np.ndarray = None, port_nodes=None):
+        self.frequencies_ghz = np.atleast_1d(np.asarray(frequencies_ghz, dtype=float))
+        self.z = np.asarray(z, dtype=complex)
+        self.reference_impedance = reference_impedance
+        num_ports = self.z.shape[-1]
+        self.port_names = list(port_names) if port_names is not None else [f'P{i + 1}' for i in range(num_ports)]
+        if termination_admittance is None:
+            termination_admittance = np.zeros((len(self.frequencies_ghz), num_ports), dtype=complex)
+        self.termination_admittance = np.asarray(termination_admittance, dtype=complex)
+        self.port_nodes = np.arange(num_ports) if port_nodes is None else np.asarray(port_nodes, dtype=np.int64)
+
+    @property
+    def num_ports(self) -> int:
+        return self.z.shape[-1]
+
+    @property
+    def y(self) -> np.ndarray:
+        """短路导纳矩阵 (F, P, P)"""
+        return _batched_inverse(self.z)
+
+    def s(self, reference_impedance: complex = None) -> np.ndarray:
+        """S 参数矩阵 (F, P, P)，S = (Z - Z0)(Z + Z0)^-1，默认参考阻抗为 reference_impedance"""
+        z0 = self.reference_impedance if reference_impedance is None else reference_impedance
+        identity = np.identity(self.num_ports)
+        return (self.z - z0 * identity) @ _batched_inverse(self.z + z0 * identity)
+
+    def active_impedance(self, weights, excitation: str = 'wave') -> np.ndarray:
+        """各端口的有源阻抗 (F, P)
+
+        weights 为 (P,) 或 (F, P) 的复激励权重：
+            'wave'：入射波 a，Γ_act = (S a) / a，Z_act = Z0 (1 + Γ) / (1 - Γ)
+            'current'：端口电流 J，Z_act = (Z J) / J
+        权重为 0 的端口结果为 NaN。
+        """
+        weights = np.broadcast_to(np.asarray(weights, dtype=complex), (len(self.frequencies_ghz), self.num_ports))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if excitation == 'current':
+                return np.einsum('fij,fj->fi', self.z, weights) / weights
+            if excitation == 'wave':
+                z0 = self.reference_impedance
+                gamma = np.einsum('fij,fj->fi', self.s(), weights) / weights
+                return z0 * (1 + gamma) / (1 - gamma)
+        raise ValueError(f"未知的激励方式: {excitation}")
+
+    def active_reflection(self, weights) -> np.ndarray:
+        """入射波激励 weights 下各端口的有源反射系数 (F, P)"""
+        weights = np.broadcast_to(np.asarray(weights, dtype=complex), (len(self.frequencies_ghz), self.num_ports))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.einsum('fij,fj->fi', self.s(), weights) / weights
+
+    def embedded_impedance(self) -> np.ndarray:
+        """单独驱动每个端口、其余端口接 termination_admittance 时的输入阻抗 (F, P)
+
+        与 BatchedFeedSolver.feed_impedance（单馈电求解）的定义一致：
+            无效端口（Z 为 NaN）为 NaN，接地节点上的端口为 0；
+            与被驱动端口在同一网格索引上的端口不接负载（单馈电求解跳过整个馈电网格段）；
+            其余端口按网格索引合并（同一索引上以最后一个馈电的端接为准，与 section_matrices 一致）后再求逆，
+            Z 矩阵不会因重合端口而奇异。
+        """
+        diagonal = np.diagonal(self.z, axis1=1, axis2=2)
+        valid = np.all(np.isfinite(diagonal), axis=0)
+        grounded = valid & np.all(diagonal == 0, axis=0) # 接地端口的 Z 行列为 0
+        live = np.flatnonzero(valid & ~grounded)
+        result = np.full((len(self.frequencies_ghz), self.num_ports), np.nan + 0j, dtype=complex)
+        result[:, grounded] = 0
+        for p in live.tolist():
+            # 其余节点各取一个代表端口，端接取该节点上最后一个馈电的
+            others = {}
+            for q in live.tolist():
+                if self.port_nodes[q] != self.port_nodes[p]:
+                    others.setdefault(int(self.port_nodes[q]), []).append(q)
+            ports = [p] + [group[0] for group in others.values()]
+            termination = np.zeros((len(self.frequencies_ghz), len(ports)), dtype=complex)
+            for k, group in enumerate(others.values(), start=1):
+                termination[:, k] = self.termination_admittance[:, group[-1]]
+            y = _batched_inverse(self.z[:, ports][:, :, ports])
+            y += np.einsum('fi,ij->fij', termination, np.identity(len(ports)))
+            result[:, p] = _batched_inverse(y)[:, 0, 0]
+        return result
+
+    def save(self, path: str):
+        """保存为 .npz"""
+        np.savez(path, frequencies_ghz=self.frequencies_ghz, z=self.z,
+                 reference_impedance=np.asarray(self.reference_impedance, dtype=complex),
+                 port_names=np.asarray(self.port_names), termination_admittance=self.termination_admittance,
+                 port_nodes=self.port_nodes)
+
+    @classmethod
+    def load(cls, path: str) -> 'MultiportNetwork':
+        data = np.load(path)
+        return cls(data['frequencies_ghz'], data['z'], complex(data['reference_impedance']),
+                   [str(name) for name in data['port_names']], data['termination_admittance'],
+                   data['port_nodes'] if 'port_nodes' in data.files else None)
+
+
+class MultiportSolver:
+    """在节点导纳矩阵上求全部馈电端口之间的 Z 矩阵
+
+    每个频点只组装并分解一次三对角导纳矩阵（所有馈电网格段视为理想连接，不含馈电负载），
+    再以各端口的单位注入电流为右端项一起回代，得到 Z[i, j] = 端口 i 电压 / 端口 j 注入电流。
+    """
+
+    def __init__(self, solver: BatchedFeedSolver):
+        self.solver = solver
+
+    @classmethod
+    def from_data_source(cls, data_source, frequencies_ghz=None, load_impedance: complex = 50.0):
+        return cls(BatchedFeedSolver.from_data_source(data_source, frequencies_ghz, load_impedance))
+
+    def solve(self, chunk_size: int = 128) -> MultiportNetwork:
+        network, port_indices = self._empty_network()
+        for frequency_slice, block in self._solve_chunks(port_indices, network.num_ports, chunk_size):
+            network.z[frequency_slice] = block
+        return network
+
+    def write_touchstone(self, path: str, chunk_size: int = 128, progress=None, data_format: str = 'RI',
+                         comments=()) -> MultiportNetwork:
+        """把端口 S 参数写成 Touchstone 文件（.sNp，N 为馈电数），每算完一块频点就写出一块
+
+        progress(已完成频点数) 在每块写出后调用。返回的网络只含端口名称和端接导纳，不保留 Z 矩阵。
+        """
+        network, port_indices = self._empty_network()
+        frequencies = network.frequencies_ghz
+        comments = list(comments) + [f"端口: {' '.join(network.port_names)}"]
+        with TouchstoneWriter(path, network.num_ports, network.reference_impedance, data_format, comments) as writer:
+            for frequency_slice, block in self._solve_chunks(port_indices, network.num_ports, chunk_size):
+                chunk = MultiportNetwork(frequencies[frequency_slice], block, network.reference_impedance)
+                writer.write(chunk.frequencies_ghz, chunk.s())
+                if progress is not None:
+                    progress(frequency_slice.stop)
+        return network
+
+    def _empty_network(self):
+        """返回 (端口名称和端接导纳已填好、Z 矩阵为 NaN 的网络, {端口列: 网格索引})，无效的端口不在字典中"""
+        solver = self.solver
+        num_freqs = len(solver.frequencies_ghz)
+        num_ports = len(solver.feed_rows)
+        z = np.full((num_freqs, num_ports, num_ports), np.nan + 0j, dtype=complex)
+        termination = np.zeros((num_freqs, num_ports), dtype=complex)
+        names = []
+        nominal = solver.nominal_sections()
+        port_indices = {}
+        for column, (row, index) in enumerate(zip(solver.feed_rows, solver.table.feed_indices.tolist())):
+            names.append(f'P{column + 1}@{index}')
+            if not 0 <= index < solver.num_grids:
+                print(f"馈电节点索引 {index} 无效，跳过此端口。")
+                continue
+            port_indices[column] = index
+            if nominal.get(row) is not None:
+                termination[:, column] = nominal[row][..., 1, 0]
+        network = MultiportNetwork(solver.frequencies_ghz, z, solver.load_impedance, names, termination,
+                                   solver.table.feed_indices)
+        return network, port_indices
+
+    def _solve_chunks(self, port_indices: dict, num_ports: int, chunk_size: int):
+        """按频率分块求解，逐块产生 (频率切片, 该块的 Z 矩阵 (f, P, P))"""
+        solver = self.solver
+        num_freqs = len(solver.frequencies_ghz)
+        if not port_indices or solver.num_grids < 1:
+            for start in range(0, num_freqs, chunk_size):
+                stop = min(start + chunk_size, num_freqs)
+                yield slice(start, stop), np.full((stop - start, num_ports, num_ports), np.nan + 0j, dtype=complex)
+            return
+        sections = solver.section_matrices()
+
+        # 所有馈电网格段替换为理想连接
+        bare = dict(sections)
+        identity = np.broadcast_to(np.identity(2, dtype=complex), (num_freqs, 2, 2))
+        for index in port_indices.values():
+            bare[index] = identity
+        nodal = NodalSolver(solver)
+        merge = nodal._merge_flags(bare)
+        columns = list(port_indices)
+
+        for start in range(0, num_freqs, chunk_size):
+            frequency_slice = slice(start, min(start + chunk_size, num_freqs))
+            _, supernode, grounded, diag, off_lower, off_upper = nodal.assemble(bare, merge, frequency_slice)
+            port_super = supernode[[port_indices[c] for c in columns]]
+            block = np.zeros((diag.shape[0], len(columns), len(columns)), dtype=complex)
+            unknown = np.flatnonzero(~grounded)
+            if unknown.size:
+                first, last = unknown[0], unknown[-1] + 1
+                rhs = np.zeros((last - first, len(columns)), dtype=complex)
+                live = ~grounded[port_super] # 接地（短路）端口的电压为 0
+                rhs[port_super[live] - first, np.flatnonzero(live)] = 1
+                node_voltage = solve_tridiagonal_multi(off_lower[:, first:last - 1], diag[:, first:last],
+                                                       off_upper[:, first:last - 1], rhs)
+                block[:, live] = node_voltage[:, port_super[live] - first]
+            z = np.full((diag.shape[0], num_ports, num_ports), np.nan + 0j, dtype=complex)
+            z[:, np.ix_(columns, columns)[0], np.ix_(columns, columns)[1]] = block
+            yield frequency_slice, z
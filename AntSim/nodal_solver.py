@@ -0,0 +1,258 @@
+import numpy as np
+from typing import Dict, Tuple
+
+from solver_kernel import BatchedFeedSolver, line_section_abcd
+
+
+def solve_tridiagonal(lower: np.ndarray, diag: np.ndarray, upper: np.ndarray, rhs: np.ndarray) -> np.ndarray:
+    """批量三对角方程组求解（Thomas 算法），沿最后一个维度消元
+
+    参数：
+        lower: (..., n - 1)，下对角线
+        diag: (..., n)，主对角线
+        upper: (..., n - 1)，上对角线
+        rhs: (..., n)，右端项
+    所有数组的前导维度需可广播。
+    """
+    shape = np.broadcast_shapes(diag.shape, rhs.shape)
+    n = shape[-1]
+    c_prime = np.empty(shape[:-1] + (max(n - 1, 0),), dtype=complex)
+    d_prime = np.empty(shape, dtype=complex)
+    denominator = np.broadcast_to(diag[..., 0], shape[:-1])
+    d_prime[..., 0] = rhs[..., 0] / denominator
+    for i in range(1, n):
+        c_prime[..., i - 1] = upper[..., i - 1] / denominator
+        denominator = diag[..., i] - lower[..., i - 1] * c_prime[..., i - 1]
+        d_prime[..., i] = (rhs[..., i] - lower[..., i - 1] * d_prime[..., i - 1]) / denominator
+    solution = np.empty(shape, dtype=complex)
+    solution[..., n - 1] = d_prime[..., n - 1]
+    for i in range(n - 2, -1, -1):
+        solution[..., i] = d_prime[..., i] - c_prime[..., i] * solution[..., i + 1]
+    return solution
+
+
+def solve_tridiagonal_multi(lower: np.ndarray, diag: np.ndarray, upper: np.ndarray, rhs: np.ndarray) -> np.ndarray:
+    """同一批三对角矩阵、多个右端项：消元系数只计算一次（一次分解），再对所有右端项回代
+
+    参数：
+        lower / diag / upper: (..., n - 1) / (..., n) / (..., n - 1)
+        rhs: (..., n, K)，K 个右端项
+    """
+    n = diag.shape[-1]
+    c_prime = np.empty(diag.shape[:-1] + (max(n - 1, 0),), dtype=complex)
+    denominator = np.empty(diag.shape, dtype=complex)
+    denominator[..., 0] = diag[..., 0]
+    for i in range(1, n):
+        c_prime[..., i - 1] = upper[..., i - 1] / denominator[..., i - 1]
+        denominator[..., i] = diag[..., i] - lower[..., i - 1] * c_prime[..., i - 1]
+    d_prime = np.empty(np.broadcast_shapes(diag.shape + (1,), rhs.shape), dtype=complex)
+    d_prime[..., 0, :] = rhs[..., 0, :] / denominator[..., 0, None]
+    for i in range(1, n):
+        d_prime[..., i, :] = (rhs[..., i, :] - lower[..., i - 1, None] * d_prime[..., i - 1, :]) / denominator[..., i, None]
+    solution = np.empty_like(d_prime)
+    solution[..., n - 1, :] = d_prime[..., n - 1, :]
+    for i in range(n - 2, -1, -1):
+        solution[..., i, :] = d_prime[..., i, :] - c_prime[..., i, None] * solution[..., i + 1, :]
+    return solution
+
+
+class NodalSolver:
+    """带状节点导纳法求解器，可替代打靶法
+
+    网格模型与打靶法相同：节点 0..N，网格段 k 位于节点 k 与 k+1 之间，两端接地（短路）。
+    B ≠ 0 的网格段（传输线、串联元件）按二端口 Y 参数接入；B = 0 的网格段
+    （并联元件、馈电）把相邻节点合并为一个超节点，其 C 作为该节点的并联导纳；
+    被求解馈电所在的网格段是理想连接并注入单位电流。合并后的节点导纳矩阵为
+    三对角矩阵，所有频点和馈电一起批量消元，不存在打靶法的指数增长问题。
+
+    结果按单位馈电电流归一化（打靶法按左端单位电流归一化），
+    可用 match_shooting_scale 转换后与打靶法比较。
+    """
+
+    def __init__(self, solver: BatchedFeedSolver):
+        self.solver = solver
+
+    @classmethod
+    def from_data_source(cls, data_source, frequencies_ghz=None, load_impedance: complex = 50.0):
+        return cls(BatchedFeedSolver.from_data_source(data_source, frequencies_ghz, load_impedance))
+
+    def solve(self, chunk_size: int = 128) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """求解全部频点和馈电
+
+        返回：
+            (电压, 电流, 输入阻抗)，形状分别为 (F, 网格数, 馈电数)、(F, 网格数, 馈电数)、(F, 馈电数)；
+            电流以指向左侧为正，与打靶法一致；无效馈电对应 NaN
+        """
+        solver = self.solver
+        num_freqs = len(solver.frequencies_ghz)
+        num_feeds = len(solver.feed_rows)
+        voltage = np.full((num_freqs, solver.num_grids, num_feeds), np.nan + 0j, dtype=complex)
+        current = np.full((num_freqs, solver.num_grids, num_feeds), np.nan + 0j, dtype=complex)
+        impedance = np.full((num_freqs, num_feeds), np.nan + 0j, dtype=complex)
+        if solver.num_grids < 1 or num_feeds == 0:
+            return voltage, current, impedance
+
+        sections = solver.section_matrices()
+        feed_indices = {}
+        for column, index in enumerate(solver.table.feed_indices.tolist()):
+            if 0 <= index < solver.num_grids:
+                feed_indices[column] = index
+            else:
+                print(f"馈电节点索引 {index} 无效，跳过此馈电点。")
+
+        # 馈电所在网格段不是并联型（被后面的串联元件覆盖）时，该馈电需单独建立拓扑
+        base_merge = self._merge_flags(sections)
+        groups = {}
+        for column, index in feed_indices.items():
+            key = None if base_merge[index] else index
+            groups.setdefault(key, []).append(column)
+
+        for start in range(0, num_freqs, chunk_size):
+            frequency_slice = slice(start, min(start + chunk_size, num_freqs))
+            for key, columns in groups.items():
+                group_sections = sections
+                if key is not None:
+                    group_sections = dict(sections)
+                    group_sections[key] = np.broadcast_to(np.identity(2, dtype=complex),
+                                                          (num_freqs, 2, 2)).copy()
+                V, I, Z = self._solve_group(group_sections, [feed_indices[c] for c in columns], frequency_slice)
+                voltage[frequency_slice, :, columns] = V
+                current[frequency_slice, :, columns] = I
+                impedance[frequency_slice, columns] = Z
+        return voltage, current, impedance
+
+    def _merge_flags(self, sections: Dict[int, np.ndarray]) -> np.ndarray:
+        """各网格段是否为 B = 0 的并联型网格段（合并相邻节点）"""
+        merge = np.zeros(self.solver.num_grids, dtype=bool)
+        for index, abcd in sections.items():
+            merge[index] = np.all(abcd[..., 0, 1] == 0)
+        return merge
+
+    def assemble(self, sections: Dict[int, np.ndarray], merge: np.ndarray, frequency_slice):
+        """组装一个频点块的超节点导纳矩阵（三对角）
+
+        返回：
+            ((A, B, C, D) 逐网格段 (F, N)、节点→超节点映射 (N + 1,)、接地超节点标记、
+             主对角线、下对角线 Y[s+1, s]、上对角线 Y[s, s+1])
+        """
+        solver = self.solver
+        N = solver.num_grids
+        unit = line_section_abcd(solver.gamma[frequency_slice], solver.zc[frequency_slice], 1)
+        abcd = np.broadcast_to(unit[:, None], (unit.shape[0], N, 2, 2)).copy()
+        for index, matrix in sections.items():
+            abcd[:, index] = matrix[frequency_slice]
+        A, B, C, D = abcd[..., 0, 0], abcd[..., 0, 1], abcd[..., 1, 0], abcd[..., 1, 1]
+
+        # 节点 → 超节点；含节点 0 或节点 N 的超节点接地
+        supernode = np.concatenate([[0], np.cumsum(~merge)])
+        num_super = supernode[-1] + 1
+        grounded = np.zeros(num_super, dtype=bool)
+        grounded[supernode[0]] = grounded[supernode[N]] = True
+
+        num_freqs = A.shape[0]
+        diag = np.zeros((num_freqs, num_super), dtype=complex)
+        off_lower = np.zeros((num_freqs, max(num_super - 1, 0)), dtype=complex)  # Y[s+1, s]
+        off_upper = np.zeros((num_freqs, max(num_super - 1, 0)), dtype=complex)  # Y[s, s+1]
+
+        branch = np.flatnonzero(~merge)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            det = A * D - B * C
+            y11 = D[:, branch] / B[:, branch]   # 端口 1（右侧节点 k+1）
+            y12 = -det[:, branch] / B[:, branch]
+            y21 = -1 / B[:, branch]
+            y22 = A[:, branch] / B[:, branch]   # 端口 2（左侧节点 k）
+        left_super = supernode[branch]
+        np.add.at(diag, (slice(None), left_super + 1), y11)
+        np.add.at(diag, (slice(None), left_super), y22)
+        off_lower[:, left_super] += y12
+        off_upper[:, left_super] += y21
+
+        shunt = np.flatnonzero(merge)
+        shunt_admittance = C[:, shunt]
+        np.add.at(diag, (slice(None), supernode[shunt]), shunt_admittance)
+        return (A, B, C, D), supernode, grounded, diag, off_lower, off_upper
+
+    def _solve_group(self, sections: Dict[int, np.ndarray], feed_indices, frequency_slice):
+        """在共享同一拓扑的若干馈电上批量求解一个频点块"""
+        N = self.solver.num_grids
+        merge = self._merge_flags(sections)
+        for index in feed_indices:
+            merge[index] = True
+        (A, B, C, D), supernode, grounded, diag, off_lower, off_upper = self.assemble(sections, merge, frequency_slice)
+
+        # 每个馈电：去掉自身网格段的并联导纳，在其超节点注入单位电流
+        feed_super = supernode[np.asarray(feed_indices)]
+        feed_diag = np.repeat(diag[:, None, :], len(feed_indices), axis=1)
+        for p, index in enumerate(feed_indices):
+            feed_diag[:, p, feed_super[p]] -= C[:, index]
+        rhs = np.zeros(feed_diag.shape, dtype=complex)
+        rhs[:, np.arange(len(feed_indices)), feed_super] = 1
+
+        unknown = np.flatnonzero(~grounded)
+        node_voltage = np.zeros(feed_diag.shape, dtype=complex)
+        if unknown.size:
+            first, last = unknown[0], unknown[-1] + 1
+            node_voltage[..., first:last] = solve_tridiagonal(
+                off_lower[:, None, first:last - 1], feed_diag[..., first:last],
+                off_upper[:, None, first:last - 1], rhs[..., first:last])
+
+        # 超节点电压展开到原始节点 0..N
+        V = node_voltage[..., supernode]                       # (F, P, N + 1)
+        I = self._node_currents(V, A, B, C, D, merge, feed_indices)
+        Z = node_voltage[:, np.arange(len(feed_indices)), feed_super]
+
+        # 与打靶法输出一致：馈电节点的电流取两侧电流之和
+        for p, index in enumerate(feed_indices):
+            if 0 < index < N - 1:
+                I[:, p, index] = I[:, p, index - 1] + I[:, p, index + 1]
+        return V[..., :N].transpose(0, 2, 1), I[..., :N].transpose(0, 2, 1), Z
+
+    @staticmethod
+    def _node_currents(V, A, B, C, D, merge, feed_indices):
+        """由节点电压恢复各节点指向左侧的电流 (F, P, N + 1)
+
+        节点 j 左侧网格段 j-1 为支路时取其端口 1 电流，否则右侧网格段 j 为支路时取其
+        端口 2 电流；两侧都是并联型网格段的节点沿节点顺序用 KCL 递推。
+        """
+        N = merge.shape[0]
+        num_freqs, num_feeds = V.shape[0], V.shape[1]
+        I = np.full((num_freqs, num_feeds, N + 1), np.nan + 0j, dtype=complex)
+        B_left, D_left = B[:, None, :], D[:, None, :]
+        A_right = A[:, None, :]
+        det = (A * D - B * C)[:, None, :]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            from_left = (D_left * V[..., 1:] - det * V[..., :-1]) / B_left    # 网格段 k 端口 1，节点 k+1
+            from_right = (V[..., 1:] - A_right * V[..., :-1]) / B_left        # 网格段 k 端口 2，节点 k
+        branch = ~merge
+        I[..., 1:] = np.where(branch[None, None, :], from_left, I[..., 1:])
+        unresolved = ~np.concatenate([[False], branch])
+        right_ok = np.concatenate([branch, [False]])
+        use_right = unresolved & right_ok
+        I[..., :-1] = np.where(use_right[None, None, :-1], from_right, I[..., :-1])
+
+        # 两侧均为并联型网格段：I[j] = I[j-1] + C·V - (馈电注入)
+        feed_mask = np.zeros((num_feeds, N), dtype=bool)
+        for p, index in enumerate(feed_indices):
+            feed_mask[p, index] = True
+        for j in np.flatnonzero(unresolved & ~right_ok):
+            if j == 0:
+                continue
+            k = j - 1
+            injected = np.where(feed_mask[:, k], 1.0, 0.0)[None, :]
+            shunt = np.where(feed_mask[:, k][None, :], 0, C[:, k][:, None])
+            I[..., j] = I[..., k] + shunt * V[..., k] - injected
+        if unresolved[0] and not right_ok[0] and N > 0:
+            injected = np.where(feed_mask[:, 0], 1.0, 0.0)[None, :]
+            shunt = np.where(feed_mask[:, 0][None, :], 0, C[:, 0][:, None])
+            I[..., 0] = I[..., 1] - shunt * V[..., 0] + injected
+        return I
+
+
+def match_shooting_scale(voltage: np.ndarray, current: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """把节点导纳法的结果缩放到打靶法的归一化（左端节点电流为 1）
+
+    参数形状为 (..., 网格数, 馈电数)。
+    """
+    scale = current[..., :1, :]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return voltage / scale, current / scale
@@ -0,0 +1,154 @@
+import numpy as np
+from typing import Dict, Optional, Sequence, Tuple
+
+from circuit import circuit_leaf_values, replace_leaf_values
+from solver_kernel import BatchedFeedSolver
+
+
+def band_objective(reflection: np.ndarray, objective: str) -> np.ndarray:
+    """把反射系数 (..., F, 馈电数) 归约为每个候选的目标值 (...)
+
+    objective:
+        'max_gamma'：频带内（所有馈电）最大 |Γ|
+        'mean_vswr'：频带内（所有馈电）平均 VSWR
+    """
+    magnitude = np.abs(reflection)
+    magnitude = np.where(np.isfinite(magnitude), magnitude, 1.0)
+    if objective == 'max_gamma':
+        return magnitude.max(axis=(-2, -1))
+    if objective == 'mean_vswr':
+        clipped = np.minimum(magnitude, 1 - 1e-9)
+        return ((1 + clipped) / (1 - clipped)).mean(axis=(-2, -1))
+    raise ValueError(f"未知的优化目标: {objective}")
+
+
+class ElementOptimizer:
+    """元件/馈电取值优化器
+
+    把若干行值字符串中的元件数值（p/n/o）作为变量，在给定上下界内最小化
+    频带目标（最大 |Γ| 或平均 VSWR）。每一代的全部候选参数集作为批量维度
+    一次交给 BatchedFeedSolver 求解，优化结果可写回 Antenna 控件。
+    """
+
+    def __init__(self, solver: BatchedFeedSolver, variables: Sequence[Tuple[int, int, float, float]],
+                 objective: str = 'max_gamma', feeds: Optional[Sequence[int]] = None):
+        """
+        参数：
+            solver: BatchedFeedSolver，批量求解内核
+            variables: [(行号, 数值序号, 下界, 上界)]，数值序号为该行值字符串中
+                       第几个 p/n/o 数值（从 0 开始），上下界需为正数
+            objective: 'max_gamma' 或 'mean_vswr'
+            feeds: 参与目标计算的馈电序号列表，默认全部馈电
+        """
+        self.solver = solver
+        self.variables = [(int(row), int(leaf), float(lower), float(upper)) for row, leaf, lower, upper in variables]
+        self.objective = objective
+        self.feeds = list(feeds) if feeds is not None else None
+        band_objective(np.zeros((1, 1)), objective)  # 提前检查目标名称
+
+        self._nominal_leaves = {}
+        for row, leaf, lower, upper in self.variables:
+            if not 0 <= row < len(solver.antenna_elements):
+                raise ValueError(f"行号 {row} 超出范围")
+            if row not in self._nominal_leaves:
+                leaves = circuit_leaf_values(solver.antenna_elements[row].get('值', ''))
+                self._nominal_leaves[row] = np.array([value for value, _ in leaves], dtype=float)
+            if not 0 <= leaf < len(self._nominal_leaves[row]):
+                raise ValueError(f"第 {row} 行没有第 {leaf} 个元件数值")
+            if not 0 < lower <= upper:
+                raise ValueError(f"第 {row} 行第 {leaf} 个数值的上下界无效: [{lower}, {upper}]")
+
+        self.best_values = None
+        self.best_cost = None
+        self.history = []  # 每一代的最优目标值
+
+    @classmethod
+    def from_calculator(cls, calculator, variables, frequencies_ghz=None, **kwargs):
+        """用 AntSimCalculator 的数据源构建优化器，默认在完整扫描频带上优化"""
+        solver = BatchedFeedSolver.from_data_source(calculator.data_source, frequencies_ghz,
+                                                    calculator.load_impedance)
+        return cls(solver, variables, **kwargs)
+
+    def initial_values(self) -> np.ndarray:
+        """变量的当前取值"""
+        return np.array([self._nominal_leaves[row][leaf] for row, leaf, _, _ in self.variables])
+
+    def _overrides(self, candidates: np.ndarray) -> Dict[int, np.ndarray]:
+        """把候选矩阵 (B, 变量数) 转换为 solver 需要的 {行号: (B, 数值个数)}"""
+        overrides = {}
+        for column, (row, leaf, _, _) in enumerate(self.variables):
+            if row not in overrides:
+                overrides[row] = np.broadcast_to(
+                    self._nominal_leaves[row], candidates.shape[:-1] + self._nominal_leaves[row].shape).copy()
+            overrides[row][..., leaf] = candidates[..., column]
+        return overrides
+
+    def evaluate(self, candidates) -> np.ndarray:
+        """批量计算候选参数集 (B, 变量数) 的目标值 (B,)"""
+        candidates = np.atleast_2d(np.asarray(candidates, dtype=float))
+        reflection = self.solver.feed_reflection_coefficient(self._overrides(candidates))
+        if self.feeds is not None:
+            reflection = reflection[..., self.feeds]
+        return band_objective(reflection, self.objective)
+
+    def optimize(self, population_size: int = 32, generations: int = 60, seed: Optional[int] = None,
+                 tolerance: float = 1e-6) -> Tuple[np.ndarray, float]:
+        """差分进化（在对数坐标中搜索），每一代整体批量求解
+
+        返回：
+            (最优变量取值, 最优目标值)
+        """
+        rng = np.random.default_rng(seed)
+        lower = np.log([v[2] for v in self.variables])
+        upper = np.log([v[3] for v in self.variables])
+        dimension = len(self.variables)
+        population_size = max(population_size, 4)
+
+        population = rng.uniform(lower, upper, (population_size, dimension))
+        # 把当前取值也放入初始种群
+        population[0] = np.clip(np.log(self.initial_values()), lower, upper)
+        costs = self.evaluate(np.exp(population))
+        self.history = [float(costs.min())]
+
+        for _ in range(generations):
+            # DE/rand/1/bin
+            indices = np.array([rng.choice(population_size, 3, replace=False) for _ in range(population_size)])
+            mutant = population[indices[:, 0]] + 0.6 * (population[indices[:, 1]] - population[indices[:, 2]])
+            crossover = rng.random((population_size, dimension)) < 0.9
+            crossover[np.arange(population_size), rng.integers(dimension, size=population_size)] = True
+            trial = np.clip(np.where(crossover, mutant, population), lower, upper)
+
+            trial_costs = self.evaluate(np.exp(trial))
+            improved = trial_costs < costs
+            population[improved] = trial[improved]
+            costs[improved] = trial_costs[improved]
+
+            previous_best = self.history[-1]
+            self.history.append(float(costs.min()))
+            if previous_best - self.history[-1] < tolerance and np.ptp(costs) < tolerance:
+                break
+
+        best = int(np.argmin(costs))
+        self.best_values = np.exp(population[best])
+        self.best_cost = float(costs[best])
+        print(f"优化完成：{self.objective} = {self.best_cost:.4g}（{len(self.history) - 1} 代）")
+        return self.best_values, self.best_cost
+
+    def updated_strings(self, values=None) -> Dict[int, str]:
+        """把变量取值写入对应行的值字符串，返回 {行号: 新字符串}"""
+        values = self.best_values if values is None else np.asarray(values, dtype=float)
+        if values is None:
+            raise ValueError("尚未运行优化，没有可写回的取值")
+        replacements = {}
+        for (row, leaf, _, _), value in zip(self.variables, values):
+            replacements.setdefault(row, {})[leaf] = value
+        return {
+            row: replace_leaf_values(self.solver.antenna_elements[row].get('值', ''), leaf_values)
+            for row, leaf_values in replacements.items()
+        }
+
+    def apply_to_antenna(self, antenna, values=None) -> Dict[int, str]:
+        """把优化结果写回 Antenna 控件的对应行（只触发一次 data_changed）"""
+        updated = self.updated_strings(values)
+        antenna.set_row_values(updated)
+        return updated
@@ -0,0 +1,114 @@
+import numpy as np
+from typing import Tuple
+
+from solver_kernel import BatchedFeedSolver, abcd_inverse, apply_abcd, port_impedance
+
+
+def _boundary_states(matrices: np.ndarray):
+    """计算从两端边界 (0, 1) 出发的前缀/后缀状态
+
+    返回：
+        prefix: (网格数 + 1, F, 2)，prefix[k] 为从左边界级联 M[0..k-1] 后在节点 k 的状态
+        suffix: (网格数 + 1, F, 2)，suffix[k] 为从右边界级联 M[N-1..k] 的逆后在节点 k 的状态
+        inverses: (网格数, F, 2, 2)，各网格段 ABCD 矩阵的逆
+    """
+    num_grids = matrices.shape[0]
+    inverses = abcd_inverse(matrices)
+    boundary = np.zeros(matrices.shape[1:-1], dtype=complex)
+    boundary[..., 1] = 1
+
+    prefix = np.empty((num_grids + 1,) + boundary.shape, dtype=complex)
+    suffix = np.empty((num_grids + 1,) + boundary.shape, dtype=complex)
+    prefix[0] = boundary
+    suffix[num_grids] = boundary
+    for k in range(num_grids):
+        prefix[k + 1] = apply_abcd(matrices[k], prefix[k])
+    for k in range(num_grids - 1, -1, -1):
+        suffix[k] = apply_abcd(inverses[k], suffix[k + 1])
+    return prefix, suffix, inverses
+
+
+def feed_position_sweep(matrices: np.ndarray) -> np.ndarray:
+    """馈电置于每个网格索引时的输入阻抗 (网格数, F)
+
+    馈电位于 f 时左侧状态为 prefix[f]、右侧状态为 suffix[f + 1]，
+    两者都已在一次前缀/后缀级联中得到。
+    """
+    prefix, suffix, _ = _boundary_states(matrices)
+    return port_impedance(prefix[:-1], suffix[1:])
+
+
+def element_position_sweep(matrices: np.ndarray, element_abcd: np.ndarray, feed_index: int) -> np.ndarray:
+    """元件置于每个网格索引时，固定馈电处的输入阻抗 (网格数, F)
+
+    元件在 p < f 时左侧状态为 T_p·E·prefix[p]，其中 T_p = M[f-1]···M[p+1] 由
+    f-1 向 0 逐步累乘得到；元件在 p > f 时右侧状态为 G_p·E⁻¹·suffix[p+1]，
+    其中 G_p = M[f+1]⁻¹···M[p-1]⁻¹ 由 f+1 向右逐步累乘得到。
+    元件位于馈电自身网格段（p = f）时不影响结果。
+    """
+    num_grids = matrices.shape[0]
+    prefix, suffix, inverses = _boundary_states(matrices)
+    left_base = prefix[feed_index]
+    right_base = suffix[feed_index + 1]
+    element_inverse = abcd_inverse(element_abcd)
+    identity = np.broadcast_to(np.identity(2, dtype=complex), matrices.shape[1:]).copy()
+
+    impedance = np.empty((num_grids,) + left_base.shape[:-1], dtype=complex)
+    impedance[feed_index] = port_impedance(left_base, right_base)
+
+    # 元件在馈电左侧
+    transfer = identity
+    for p in range(feed_index - 1, -1, -1):
+        left_state = apply_abcd(transfer, apply_abcd(element_abcd, prefix[p]))
+        impedance[p] = port_impedance(left_state, right_base)
+        transfer = transfer @ matrices[p]
+
+    # 元件在馈电右侧
+    transfer = identity
+    for p in range(feed_index + 1, num_grids):
+        right_state = apply_abcd(transfer, apply_abcd(element_inverse, suffix[p + 1]))
+        impedance[p] = port_impedance(left_base, right_state)
+        transfer = transfer @ inverses[p]
+    return impedance
+
+
+def position_sweep(solver: BatchedFeedSolver, row: int, feed: int = 0,
+                   chunk_size: int = 128) -> Tuple[np.ndarray, np.ndarray]:
+    """把第 row 行（元件或馈电）依次放到每个网格索引，计算馈电输入阻抗图
+
+    被移动的行覆盖目标索引处已有的其他行；原索引处恢复为传输线。
+
+    参数：
+        solver: BatchedFeedSolver，提供频率、网格与各行的 ABCD 矩阵
+        row: 要移动的行号
+        feed: 移动元件时观察的馈电序号；移动馈电时忽略（观察被移动的馈电本身）
+        chunk_size: 每次处理的频点数，用于限制 (网格数, F, 2, 2) 中间数组的内存
+
+    返回：
+        (索引数组, 输入阻抗图)，阻抗图形状为 (网格数, 频率数)
+    """
+    element = solver.antenna_elements[row]
+    moving_feed = element['类型'] == '馈电'
+    sections = solver.section_matrices(exclude_rows=(row,))
+
+    if not moving_feed:
+        if not 0 <= feed < len(solver.feed_rows):
+            raise ValueError(f"馈电序号 {feed} 无效")
+        feed_index = int(solver.table.feed_indices[feed])
+        if not 0 <= feed_index < solver.num_grids:
+            raise ValueError(f"馈电索引 {feed_index} 无效")
+        element_abcd = solver.row_abcd(row)
+        if element_abcd is None:
+            raise ValueError(f"第 {row} 行元件无法解析")
+
+    num_freqs = len(solver.frequencies_ghz)
+    impedance = np.empty((solver.num_grids, num_freqs), dtype=complex)
+    for start in range(0, num_freqs, chunk_size):
+        frequency_slice = slice(start, min(start + chunk_size, num_freqs))
+        matrices = solver.node_matrices(sections, frequency_slice)
+        if moving_feed:
+            impedance[:, frequency_slice] = feed_position_sweep(matrices)
+        else:
+            impedance[:, frequency_slice] = element_position_sweep(
+                matrices, element_abcd[frequency_slice], feed_index)
+    return np.arange(solver.num_grids), impedance
@@ -0,0 +1,58 @@
+import time
+
+
+def format_duration(seconds) -> str:
+    """把秒数格式化为 1h02m / 3m05s / 4.2s"""
+    if seconds is None or seconds != seconds:
+        return '--'
+    seconds = max(0.0, float(seconds))
+    if seconds >= 3600:
+        return f"{int(seconds // 3600)}h{int(seconds % 3600 // 60):02d}m"
+    if seconds >= 60:
+        return f"{int(seconds // 60)}m{int(seconds % 60):02d}s"
+    return f"{seconds:.1f}s"
+
+
+class ProgressReporter:
+    """按时间节流的进度报告
+
+    update(已完成数) 可以每个频点调用一次，但距上次报告不足 min_interval 秒时不回调
+    （第一次和完成时总会回调），避免大扫描时进度信号堵塞事件队列。
+    回调参数为 info 字典：
+        done / total: 已完成 / 总频点数
+        percent: 0-100 的整数
+        rate: 频点/秒
+        elapsed: 已用时间（s）
+        eta: 预计剩余时间（s），尚无法估计时为 None
+    """
+
+    def __init__(self, total: int, callback, min_interval: float = 0.1):
+        self.total = max(int(total), 0)
+        self.callback = callback
+        self.min_interval = float(min_interval)
+        self.start_time = time.perf_counter()
+        self._last_report = None
+
+    def info(self, done: int) -> dict:
+        elapsed = time.perf_counter() - self.start_time
+        rate = done / elapsed if elapsed > 0 and done > 0 else 0.0
+        eta = (self.total - done) / rate if rate > 0 else None
+        percent = int(done * 100 / self.total) if self.total else 100
+        return {'done': done, 'total': self.total, 'percent': percent, 'rate': rate,
+                'elapsed': elapsed, 'eta': eta}
+
+    def update(self, done: int, force: bool = False) -> bool:
+        """报告进度，实际回调时返回 True"""
+        now = time.perf_counter()
+        finished = done >= self.total
+        if not (force or finished or self._last_report is None or now - self._last_report >= self.min_interval):
+            return False
+        self._last_report = now
+        self.callback(self.info(done))
+        return True
+
+    @staticmethod
+    def describe(info: dict) -> str:
+        """状态栏用的一行文字"""
+        return (f"{info['done']}/{info['total']} 频点，{info['rate']:.1f} 频点/s，"
+                f"已用 {format_duration(info['elapsed'])}，剩余约 {format_duration(info['eta'])}")
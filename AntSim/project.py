@@ -0,0 +1,79 @@
+import json
+import os
+
+import touchstone
+
+PROJECT_FORMAT = 'AntSim project'
+PROJECT_VERSION = 1
+PROJECT_EXTENSION = '.antsim'
+
+
+def cache_directory(project_path: str) -> str:
+    """工程的结果缓存目录：与工程文件并列的 <工程名>_cache"""
+    base, _ = os.path.splitext(os.path.abspath(project_path))
+    return base + '_cache'
+
+
+def default_cache_directory():
+    """未保存为工程时使用的结果缓存目录：默认不缓存（返回 None），设置环境变量 ANTSIM_CACHE_DIR 时使用该目录"""
+    directory = os.environ.get('ANTSIM_CACHE_DIR')
+    return os.path.expanduser(directory) if directory else None
+
+
+def project_dict(settings_instance, device, calculator=None) -> dict:
+    """收集设置、元件表和求解选项，返回可写成 JSON 的工程字典"""
+    project = {
+        'format': PROJECT_FORMAT,
+        'version': PROJECT_VERSION,
+        'settings': settings_instance.get_all_settings(),
+        'elements': [{'类型': element['类型'], '索引': element['索引'], '值': element['值']}
+                     for element in device.get_all_data()],
+    }
+    if calculator is not None:
+        load = complex(calculator.load_impedance)
+        project['solver'] = {'method': calculator.solver_method, 'load_impedance': [load.real, load.imag]}
+    return project
+
+
+def save_project(path: str, settings_instance, device, calculator=None):
+    """保存工程文件（UTF-8 JSON），先写临时文件再替换，失败时抛出 OSError"""
+    project = project_dict(settings_instance, device, calculator)
+    temporary = path + '.tmp'
+    with open(temporary, 'w', encoding='utf-8') as f:
+        json.dump(project, f, ensure_ascii=False, indent=2)
+    os.replace(temporary, path)
+
+
+def load_project(path: str) -> dict:
+    """读取并检查工程文件，格式不对时抛出 ValueError"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            project = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise ValueError(f"读取工程文件失败: {e}")
+    if not isinstance(project, dict) or project.get('format') != PROJECT_FORMAT:
+        raise ValueError(f"不是 AntSim 工程文件: {path}")
+    if project.get('version', 0) > PROJECT_VERSION:
+        raise ValueError(f"工程文件版本 {project.get('version')} 高于当前支持的版本 {PROJECT_VERSION}")
+    elements = project.get('elements', [])
+    for row, element in enumerate(elements):
+        if not isinstance(element, dict) or element.get('类型') not in ('馈电', '元件'):
+            raise ValueError(f"工程文件第 {row} 个元件无效: {element}")
+    return project
+
+
+def apply_project(project: dict, path: str, settings_instance, device, calculator=None):
+    """把工程应用到界面：先写设置（更新网格范围），再替换元件表，最后设置求解选项
+
+    工程所在目录加入 Touchstone 文件的查找路径，元件中的相对文件名相对工程文件解析。
+    """
+    touchstone.add_search_path(os.path.dirname(os.path.abspath(path)))
+    settings_instance.apply_settings(project.get('settings', {}))
+    device.set_all_data(project.get('elements', []))
+    solver = project.get('solver')
+    if calculator is not None and solver:
+        if solver.get('method') in calculator.SOLVER_METHODS:
+            calculator.set_solver_method(solver['method'])
+        if 'load_impedance' in solver:
+            real, imag = solver['load_impedance']
+            calculator.load_impedance = complex(real, imag)
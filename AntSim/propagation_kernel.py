@@ -0,0 +1,246 @@
+import numpy as np
+from typing import Tuple
+
+from solver_kernel import BatchedFeedSolver
+
+try:
+    import numba
+except ImportError:  # numba 为可选依赖，未安装时使用 NumPy 实现
+    numba = None
+
+# 可选的计算后端；'auto' 表示有 numba 时使用 numba，否则使用 numpy
+BACKENDS = ('auto', 'numba', 'numpy')
+_backend = 'auto'
+
+
+def available_backends():
+    """当前环境中可用的后端"""
+    return ('numba', 'numpy') if numba is not None else ('numpy',)
+
+
+def set_backend(name: str):
+    """运行时选择后端（'auto' / 'numba' / 'numpy'）"""
+    if name not in BACKENDS:
+        raise ValueError(f"未知的计算后端: {name}")
+    if name == 'numba' and numba is None:
+        raise ValueError("未安装 numba，无法使用 numba 后端")
+    global _backend
+    _backend = name
+    print(f"传播计算后端已切换为: {name}")
+
+
+def get_backend() -> str:
+    """实际使用的后端名称"""
+    if _backend == 'auto':
+        return 'numba' if numba is not None else 'numpy'
+    return _backend
+
+
+def _recurrence_numpy(matrices, feed_indices, voltage, current, impedance, feed_current):
+    """NumPy 实现：沿节点方向顺序递推，每一步对全部频点向量化
+
+    所有馈电共用一次左侧前缀递推和一次右侧后缀递推（馈电自身所在网格段不参与，
+    因此前缀/后缀与馈电位置无关），再按各馈电位置拼接。
+    """
+    num_freqs, num_grids = matrices.shape[0], matrices.shape[1]
+    A, B, C, D = matrices[..., 0, 0], matrices[..., 0, 1], matrices[..., 1, 0], matrices[..., 1, 1]
+    det = A * D - B * C
+    prefix_v = np.empty((num_freqs, num_grids + 1), dtype=complex)
+    prefix_i = np.empty((num_freqs, num_grids + 1), dtype=complex)
+    suffix_v = np.empty((num_freqs, num_grids + 1), dtype=complex)
+    suffix_i = np.empty((num_freqs, num_grids + 1), dtype=complex)
+    prefix_v[:, 0], prefix_i[:, 0] = 0, 1
+    suffix_v[:, num_grids], suffix_i[:, num_grids] = 0, 1
+    for k in range(num_grids):
+        prefix_v[:, k + 1] = A[:, k] * prefix_v[:, k] + B[:, k] * prefix_i[:, k]
+        prefix_i[:, k + 1] = C[:, k] * prefix_v[:, k] + D[:, k] * prefix_i[:, k]
+    for k in range(num_grids - 1, -1, -1):
+        suffix_v[:, k] = (D[:, k] * suffix_v[:, k + 1] - B[:, k] * suffix_i[:, k + 1]) / det[:, k]
+        suffix_i[:, k] = (A[:, k] * suffix_i[:, k + 1] - C[:, k] * suffix_v[:, k + 1]) / det[:, k]
+
+    nodes = np.arange(num_grids)
+    for p, f in enumerate(feed_indices):
+        V_L, I_L = prefix_v[:, f], prefix_i[:, f]
+        V_R, I_R = suffix_v[:, f + 1], suffix_i[:, f + 1]
+        denominator = I_L * V_R - I_R * V_L
+        impedance[:, p] = np.where(denominator != 0, V_L * V_R / np.where(denominator != 0, denominator, 1),
+                                   complex(np.inf, 0))
+        factor = np.where(V_R != 0, V_L / np.where(V_R != 0, V_R, 1), 1)
+        feed_current[:, p] = I_L - I_R * factor
+        left = nodes <= f
+        voltage[:, :, p] = np.where(left, prefix_v[:, :num_grids], suffix_v[:, :num_grids] * factor[:, None])
+        current[:, :, p] = np.where(left, prefix_i[:, :num_grids], suffix_i[:, :num_grids] * factor[:, None])
+        if 0 < f < num_grids - 1:
+            current[:, f, p] = current[:, f - 1, p] + current[:, f + 1, p]
+
+
+if numba is not None:
+    @numba.njit(cache=True, parallel=True)
+    def _recurrence_numba(matrices, feed_indices, voltage, current, impedance, feed_current):
+        """numba 实现：各频点并行，节点方向为紧凑的标量循环，逻辑与 _recurrence_numpy 相同"""
+        num_freqs, num_grids = matrices.shape[0], matrices.shape[1]
+        for fi in numba.prange(num_freqs):
+            prefix_v = np.empty(num_grids + 1, dtype=np.complex128)
+            prefix_i = np.empty(num_grids + 1, dtype=np.complex128)
+            suffix_v = np.empty(num_grids + 1, dtype=np.complex128)
+            suffix_i = np.empty(num_grids + 1, dtype=np.complex128)
+            prefix_v[0], prefix_i[0] = 0, 1
+            suffix_v[num_grids], suffix_i[num_grids] = 0, 1
+            for k in range(num_grids):
+                a, b = matrices[fi, k, 0, 0], matrices[fi, k, 0, 1]
+                c, d = matrices[fi, k, 1, 0], matrices[fi, k, 1, 1]
+                prefix_v[k + 1] = a * prefix_v[k] + b * prefix_i[k]
+                prefix_i[k + 1] = c * prefix_v[k] + d * prefix_i[k]
+            for k in range(num_grids - 1, -1, -1):
+                a, b = matrices[fi, k, 0, 0], matrices[fi, k, 0, 1]
+                c, d = matrices[fi, k, 1, 0], matrices[fi, k, 1, 1]
+                det = a * d - b * c
+                suffix_v[k] = (d * suffix_v[k + 1] - b * suffix_i[k + 1]) / det
+                suffix_i[k] = (a * suffix_i[k + 1] - c * suffix_v[k + 1]) / det
+            for p in range(feed_indices.shape[0]):
+                f = feed_indices[p]
+                v_l, i_l = prefix_v[f], prefix_i[f]
+                v_r, i_r = suffix_v[f + 1], suffix_i[f + 1]
+                denominator = i_l * v_r - i_r * v_l
+                if denominator != 0:
+                    impedance[fi, p] = v_l * v_r / denominator
+                else:
+                    impedance[fi, p] = complex(np.inf, 0)
+                factor = v_l / v_r if v_r != 0 else complex(1, 0)
+                feed_current[fi, p] = i_l - i_r * factor
+                for n in range(num_grids):
+                    if n <= f:
+                        voltage[fi, n, p] = prefix_v[n]
+                        current[fi, n, p] = prefix_i[n]
+                    else:
+                        voltage[fi, n, p] = suffix_v[n] * factor
+                        current[fi, n, p] = suffix_i[n] * factor
+                if 0 < f < num_grids - 1:
+                    current[fi, f, p] = current[fi, f - 1, p] + current[fi, f + 1, p]
+
+
+def shooting_recurrence(matrices: np.ndarray, feed_indices,
+                        backend: str = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """打靶法的左右递推，与 AntSimCalculator._solve_frequency 的逐频点循环等价
+
+    参数：
+        matrices: (F, 网格数, 2, 2)，逐网格段 ABCD 矩阵
+        feed_indices: 各馈电的网格索引（须有效）
+        backend: 'numba' / 'numpy'，缺省使用 get_backend()
+
+    返回：
+        (电压, 电流, 输入阻抗, 馈电电流)，形状 (F, 网格数, 馈电数)、(F, 网格数, 馈电数)、(F, 馈电数)、
+        (F, 馈电数)；与打靶法相同，按左端节点电流为 1 归一化，馈电电流为馈电注入的总电流
+    """
+    backend = backend or get_backend()
+    matrices = np.ascontiguousarray(matrices, dtype=complex)
+    feed_indices = np.asarray(feed_indices, dtype=np.int64)
+    num_freqs, num_grids = matrices.shape[0], matrices.shape[1]
+    voltage = np.empty((num_freqs, num_grids, len(feed_indices)), dtype=complex)
+    current = np.empty((num_freqs, num_grids, len(feed_indices)), dtype=complex)
+    impedance = np.empty((num_freqs, len(feed_indices)), dtype=complex)
+    feed_current = np.empty((num_freqs, len(feed_indices)), dtype=complex)
+    if backend == 'numba':
+        if numba is None:
+            raise ValueError("未安装 numba，无法使用 numba 后端")
+        _recurrence_numba(matrices, feed_indices, voltage, current, impedance, feed_current)
+    else:
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            _recurrence_numpy(matrices, feed_indices, voltage, current, impedance, feed_current)
+    return voltage, current, impedance, feed_current
+
+
+class CompiledKernelSolver:
+    """使用 shooting_recurrence（numba 或 NumPy 后端）的批量打靶求解器
+
+    网格模型与打靶法相同；结果转换为单位馈电电流归一化，与 NodalSolver 等批量求解器一致。
+    与原打靶法一样不做缩放，极长/高损耗网格请使用 ScaledPropagationSolver。
+    """
+
+    def __init__(self, solver: BatchedFeedSolver, backend: str = None):
+        self.solver = solver
+        self.backend = backend
+
+    @classmethod
+    def from_data_source(cls, data_source, frequencies_ghz=None, load_impedance: complex = 50.0):
+        return cls(BatchedFeedSolver.from_data_source(data_source, frequencies_ghz, load_impedance))
+
+    def solve(self, chunk_size: int = 64) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """求解全部频点和馈电，返回 (电压, 电流, 输入阻抗)，形状同 NodalSolver.solve"""
+        solver = self.solver
+        N = solver.num_grids
+        num_freqs = len(solver.frequencies_ghz)
+        num_feeds = len(solver.feed_rows)
+        voltage = np.full((num_freqs, N, num_feeds), np.nan + 0j, dtype=complex)
+        current = np.full((num_freqs, N, num_feeds), np.nan + 0j, dtype=complex)
+        impedance = np.full((num_freqs, num_feeds), np.nan + 0j, dtype=complex)
+        if N < 1:
+            return voltage, current, impedance
+
+        columns, feed_indices = [], []
+        for column, index in enumerate(solver.table.feed_indices.tolist()):
+            if not 0 <= index < N:
+                print(f"馈电节点索引 {index} 无效，跳过此馈电点。")
+                continue
+            columns.append(column)
+            feed_indices.append(index)
+        if not columns:
+            return voltage, current, impedance
+
+        sections = solver.section_matrices()
+        for start in range(0, num_freqs, chunk_size):
+            frequency_slice = slice(start, min(start + chunk_size, num_freqs))
+            matrices = solver.node_matrices(sections, frequency_slice).transpose(1, 0, 2, 3)
+            V, I, Z, feed_current = shooting_recurrence(matrices, feed_indices, self.backend)
+            # 左端单位电流 → 单位馈电电流
+            with np.errstate(divide='ignore', invalid='ignore'):
+                voltage[frequency_slice, :, columns] = V / feed_current[:, None, :]
+                current[frequency_slice, :, columns] = I / feed_current[:, None, :]
+            impedance[frequency_slice, columns] = Z
+        return voltage, current, impedance
+
+
+def check_equivalence(matrices: np.ndarray = None, feed_indices=(3, 40), rtol: float = 1e-9, seed: int = 0) -> dict:
+    """检查 shooting_recurrence 的各可用后端与直接级联矩阵的一致性
+
+    以 numpy 后端为参考：'direct' 为逐个馈电直接级联 matrices 求得的输入阻抗与参考的相对差，
+    其余各项为各后端的电压、电流、阻抗与参考的最大相对差。
+    缺省使用随机的可逆 ABCD 矩阵（互易网络），返回 {名称: 最大相对差}，超出 rtol 时抛出 AssertionError。
+    """
+    if matrices is None:
+        rng = np.random.default_rng(seed)
+        shape = (5, 64)
+        matrices = np.empty(shape + (2, 2), dtype=complex)
+        matrices[..., 0, 0] = 1 + 0.1 * (rng.normal(size=shape) + 1j * rng.normal(size=shape))
+        matrices[..., 0, 1] = 10 * (rng.normal(size=shape) + 1j * rng.normal(size=shape))
+        matrices[..., 1, 1] = 1 + 0.1 * (rng.normal(size=shape) + 1j * rng.normal(size=shape))
+        matrices[..., 1, 0] = (matrices[..., 0, 0] * matrices[..., 1, 1] - 1) / matrices[..., 0, 1]
+    reference = shooting_recurrence(matrices, feed_indices, 'numpy')
+
+    # 与逐个馈电直接级联矩阵得到的阻抗比较
+    differences = {}
+    impedance = []
+    for f in feed_indices:
+        left = np.array([0, 1], dtype=complex)
+        left = np.broadcast_to(left, matrices.shape[:1] + (2,)).copy()
+        for k in range(f):
+            left = (matrices[:, k] @ left[..., None])[..., 0]
+        right = np.broadcast_to(np.array([0, 1], dtype=complex), left.shape).copy()
+        for k in range(matrices.shape[1] - 1, f, -1):
+            right = (np.linalg.inv(matrices[:, k]) @ right[..., None])[..., 0]
+        impedance.append(left[:, 0] * right[:, 0] / (left[:, 1] * right[:, 0] - right[:, 1] * left[:, 0]))
+    impedance = np.stack(impedance, axis=-1)
+    differences['direct'] = float(np.max(np.abs(reference[2] - impedance) / np.abs(impedance)))
+
+    for backend in available_backends():
+        result = shooting_recurrence(matrices, feed_indices, backend)
+        differences[backend] = max(float(np.max(np.abs(a - b)) / np.max(np.abs(b)))
+                                   for a, b in zip(result, reference))
+    for name, difference in differences.items():
+        if not difference <= rtol:
+            raise AssertionError(f"后端 {name} 与参考结果的相对差 {difference:.3e} 超出 {rtol:g}")
+    return differences
+
+
+if __name__ == '__main__':
+    print(check_equivalence())
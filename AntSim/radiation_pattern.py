@@ -0,0 +1,213 @@
+import numpy as np
+
+from element_table import element_table_of
+
+C0 = 299792458.0       # 真空光速（m/s）
+ETA0 = 376.730313668   # 自由空间波阻抗（Ohm）
+
+
+def is_uniform(positions: np.ndarray, rtol: float = 1e-6) -> bool:
+    """判断位置数组是否等间距"""
+    if len(positions) < 3:
+        return True
+    steps = np.diff(positions)
+    return bool(np.allclose(steps, steps[0], rtol=rtol, atol=0))
+
+
+def chirp_array_factor(samples: np.ndarray, phase_step: np.ndarray, u_start: float, u_step: float,
+                       num_points: int) -> np.ndarray:
+    """等间距线源的阵因子，用 chirp-z 变换（Bluestein）批量计算
+
+    AF[b, m] = Σ_n samples[b, n] · exp(j · phase_step[b] · n · u_m)，u_m = u_start + m · u_step
+    samples 形状 (B, N)，phase_step 形状 (B,)（即 k·d），返回 (B, num_points)。
+    每一行的 k·d 不同，因此逐行使用各自的啁啾序列，但全部行在一次批量 FFT 中完成。
+    """
+    num_batch, num_samples = samples.shape
+    n = np.arange(num_samples)
+    m = np.arange(num_points)
+    w = (phase_step * u_step)[:, None] # 相邻角度采样之间的相位增量
+    fft_size = 1 << int(np.ceil(np.log2(num_samples + num_points - 1)))
+
+    # n·m = (n² + m² - (m - n)²) / 2，把求和化为与啁啾序列的卷积
+    weighted = samples * np.exp(1j * (phase_step[:, None] * u_start * n + w * n ** 2 / 2))
+    lags = np.arange(-(num_samples - 1), num_points)
+    chirp = np.exp(-1j * w * lags ** 2 / 2)
+    kernel = np.zeros((num_batch, fft_size), dtype=complex)
+    kernel[:, :len(lags)] = chirp
+    convolved = np.fft.ifft(np.fft.fft(weighted, fft_size) * np.fft.fft(kernel), axis=-1)
+    return np.exp(1j * w * m ** 2 / 2) * convolved[:, num_samples - 1:num_samples - 1 + num_points]
+
+
+def direct_array_factor(samples: np.ndarray, positions: np.ndarray, wavenumbers: np.ndarray, u: np.ndarray,
+                        max_block_elements: int = 4_000_000) -> np.ndarray:
+    """任意位置线源的阵因子，按角度分块做批量矩阵乘，返回 (B, len(u))"""
+    result = np.empty((samples.shape[0], len(u)), dtype=complex)
+    block = max(1, max_block_elements // max(1, len(positions)))
+    for b in range(samples.shape[0]):
+        for start in range(0, len(u), block):
+            steering = np.exp(1j * wavenumbers[b] * np.outer(positions, u[start:start + block]))
+            result[b, start:start + block] = samples[b] @ steering
+    return result
+
+
+class RadiationPattern:
+    """由电流分布计算远场方向图、方向性系数和增益
+
+    天线沿 z 轴放置，节点 n 位于 grid_array[n]，电流 I_n 视为长度 Δz 的 z 向电流元（线源模型）：
+        E_θ(θ) ∝ 单元方向图(θ) · Σ_n I_n Δz exp(j k z_n cosθ)
+    方向图绕 z 轴旋转对称，只与 θ 有关。角度在 u = cosθ 上等间距采样（num_points 个点），
+    因此 ∫U dΩ = 2π ∫U du 可直接用梯形积分。等间距网格用批量 chirp-z 变换，一次求出所有频点的阵因子；
+    非等间距网格按角度分块做矩阵乘。
+
+    属性（F 为频率数，P 为馈电数，M 为角度数）：
+        u, theta: 角度采样（theta 为度，从 180° 递减到 0°）
+        field: (F, M, P) 远场 E_θ·r（V），按电流的归一化（单位馈电电流）
+        intensity: (F, M, P) 辐射强度 U（W/sr）
+        radiated_power: (F, P) 辐射功率（W）
+        directivity: (F, P) 最大方向性系数（线性值）
+        peak_theta: (F, P) 最大辐射方向（度）
+        gain: (F, P) 增益 4πU_max / 输入功率，仅在给出输入阻抗时计算
+    """
+
+    ELEMENT_PATTERNS = ('dipole', 'isotropic')
+
+    def __init__(self, frequencies_ghz, grid_array, current, input_impedance=None, num_points: int = 1801,
+                 element_pattern: str = 'dipole', chunk_size: int = 16):
+        """
+        参数：
+            frequencies_ghz: 频率数组（GHz），长度 F
+            grid_array: 节点位置（m），长度 N
+            current: 电流分布，形状 (F, N, P) 或 (F, N)；可为 LazySweepResult 的视图，按频率分块读取
+            input_impedance: (F, P) 馈电输入阻抗，用于计算增益（电流须按单位馈电电流归一化）
+            num_points: cosθ 上的采样点数
+            element_pattern: 'dipole'（z 向电流元，sinθ）或 'isotropic'
+            chunk_size: 每次计算的频点数
+        """
+        if element_pattern not in self.ELEMENT_PATTERNS:
+            raise ValueError(f"未知的单元方向图: {element_pattern}")
+        self.frequencies_ghz = np.atleast_1d(np.asarray(frequencies_ghz, dtype=float))
+        self.grid_array = np.asarray(grid_array, dtype=float)
+        self.element_pattern = element_pattern
+        num_freqs, num_grids = len(self.frequencies_ghz), len(self.grid_array)
+        if len(current) != num_freqs or current.shape[1] != num_grids:
+            raise ValueError(f"电流分布形状 {tuple(current.shape)} 与频率数 {num_freqs}、网格数 {num_grids} 不一致")
+        squeeze = len(current.shape) == 2
+
+        self.u = np.linspace(-1.0, 1.0, int(num_points))
+        self.theta = np.degrees(np.arccos(self.u))
+        element = np.sqrt(1 - self.u ** 2) if element_pattern == 'dipole' else np.ones_like(self.u)
+        uniform = is_uniform(self.grid_array)
+        weights = self._segment_lengths()
+        wavenumbers = 2 * np.pi * self.frequencies_ghz * 1e9 / C0
+
+        num_feeds = 1 if squeeze else current.shape[2]
+        self.field = np.empty((num_freqs, len(self.u), num_feeds), dtype=complex)
+        for start in range(0, num_freqs, chunk_size):
+            chunk = slice(start, start + chunk_size)
+            block = np.asarray(current[chunk], dtype=complex)
+            if squeeze:
+                block = block[..., None]
+            # (f, N, P) -> (f·P, N)，所有频点和馈电一次变换
+            samples = np.moveaxis(block, 2, 1).reshape(-1, num_grids) * weights
+            k = np.repeat(wavenumbers[chunk], num_feeds)
+            if uniform and num_grids > 1:
+                step = self.grid_array[1] - self.grid_array[0]
+                factor = chirp_array_factor(samples, k * step, self.u[0], self.u[1] - self.u[0], len(self.u))
+                if self.grid_array[0] != 0:
+                    factor *= np.exp(1j * np.outer(k * self.grid_array[0], self.u)) # 起点不在原点时的相位
+            else:
+                factor = direct_array_factor(samples, self.grid_array, k, self.u)
+            factor = factor.reshape(-1, num_feeds, len(self.u))
+            # E_θ·r = j η0 k / (4π) · 单元方向图 · AF
+            self.field[chunk] = np.moveaxis(factor, 1, 2) * (1j * ETA0 * wavenumbers[chunk] / (4 * np.pi))[:, None, None] \
+                * element[None, :, None]
+
+        self.intensity = np.abs(self.field) ** 2 / (2 * ETA0)
+        self.radiated_power = 2 * np.pi * np.trapezoid(self.intensity, self.u, axis=1)
+        peak = np.argmax(self.intensity, axis=1)
+        self.peak_theta = self.theta[peak]
+        u_max = np.max(self.intensity, axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.directivity = 4 * np.pi * u_max / self.radiated_power
+            self.gain = None
+            if input_impedance is not None:
+                input_power = 0.5 * np.real(np.asarray(input_impedance).reshape(num_freqs, -1))
+                self.gain = 4 * np.pi * u_max / input_power
+
+    def _segment_lengths(self) -> np.ndarray:
+        """每个节点代表的长度 Δz（梯形积分权重）"""
+        grid = self.grid_array
+        if len(grid) < 2:
+            return np.ones(len(grid))
+        weights = np.empty(len(grid))
+        weights[1:-1] = (grid[2:] - grid[:-2]) / 2
+        weights[0] = (grid[1] - grid[0]) / 2
+        weights[-1] = (grid[-1] - grid[-2]) / 2
+        return weights
+
+    @staticmethod
+    def _unit_feed_current(calculator, voltage, current, impedance):
+        """把打靶法的电流（左端节点电流为 1）缩放到单位馈电电流 I = V_馈电 / Zin，与批量后端一致
+
+        增益 4πU / (½·Re Zin) 只在单位馈电电流下成立。参数形状 (F, 网格数, 馈电数) 和 (F, 馈电数)。
+        """
+        current = np.array(current, dtype=complex)
+        voltage = np.asarray(voltage)
+        impedance = np.asarray(impedance).reshape(current.shape[0], -1)
+        num_grids = current.shape[1]
+        # 打靶法只为有效的馈电依次输出一列
+        feeds = [index for index in element_table_of(calculator.data_source).feed_indices.tolist()
+                 if 0 <= index < num_grids]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for column, index in enumerate(feeds[:current.shape[2]]):
+                feed_current = voltage[:, index, column] / impedance[:, column]
+                current[:, :, column] /= feed_current[:, None]
+        return current
+
+    @classmethod
+    def from_calculator(cls, calculator, sweep: bool = True, **options):
+        """从计算器的扫描结果（sweep=True）或单频点结果构建，无结果时返回 None
+
+        打靶法的分布按左端节点电流归一化，先缩放到单位馈电电流，增益才与批量后端一致。
+        """
+        grid_array = calculator.data_source.get_grid_array()
+        shooting = calculator.solver_method == 'shooting'
+        if sweep:
+            if calculator.sweep_current_matrix is None:
+                return None
+            current = calculator.sweep_current_matrix
+            impedance = calculator.input_impedance_array
+            if shooting and impedance is not None and calculator.sweep_voltage_matrix is not None:
+                current = cls._unit_feed_current(calculator, calculator.sweep_voltage_matrix, current, impedance)
+            return cls(calculator.data_source.get_freq_array_ghz(), grid_array, current, impedance, **options)
+        if calculator.single_freq_current_matrix is None or calculator.single_freq_ghz is None:
+            return None
+        impedance = calculator.single_freq_input_impedance
+        impedance = None if impedance is None else np.asarray(impedance)[None]
+        current = calculator.single_freq_current_matrix[None]
+        if shooting and impedance is not None and calculator.single_freq_voltage_matrix is not None:
+            current = cls._unit_feed_current(calculator, calculator.single_freq_voltage_matrix[None], current,
+                                             impedance)
+        return cls([calculator.single_freq_ghz], grid_array, current, impedance, **options)
+
+    @property
+    def directivity_dbi(self) -> np.ndarray:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return 10 * np.log10(self.directivity)
+
+    @property
+    def gain_dbi(self):
+        if self.gain is None:
+            return None
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return 10 * np.log10(self.gain)
+
+    def cut(self, freq_index: int, feed: int = 0, db: bool = True, floor_db: float = -40.0):
+        """θ 方向图切面，返回 (θ（度，0→180）, 归一化方向图)；db=True 时为 dB，下限 floor_db"""
+        values = self.intensity[freq_index, :, feed]
+        peak = np.max(values)
+        normalized = values / peak if peak > 0 else values
+        if db:
+            with np.errstate(divide='ignore'):
+                normalized = np.maximum(10 * np.log10(normalized), floor_db)
+        return self.theta[::-1], normalized[::-1]
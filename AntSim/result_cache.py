@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+
+import numpy as np
+
+from touchstone import referenced_files
+
+# 求解器和缓存格式的版本：求解方法、结果归一化或保存内容改变时递增，旧缓存随之失效
+SOLVER_VERSION = '2'
+
+
+def normalized_inputs(data_source, load_impedance: complex, family: str = 'batched') -> dict:
+    """决定扫描结果的全部输入，规范化为可 JSON 序列化的字典
+
+    元件值去掉空白（与解析时一致），只保留类型、索引和值（实际位置由索引导出）；
+    引用的 Touchstone 文件以绝对路径、大小和修改时间代表其内容。
+    family 区分结果的来源：'shooting'（打靶法）或 'batched'（批量求解后端，结果互相一致）。
+    """
+    elements = []
+    files = {}
+    for element in data_source.antenna_elements_data:
+        value = re.sub(r'\s+', '', element.get('值', ''))
+        elements.append([element['类型'], element.get('索引'), value])
+        files.update(referenced_files(value))
+    load_impedance = complex(load_impedance)
+    return {
+        'solver_version': SOLVER_VERSION,
+        'family': family,
+        'num_grids': len(data_source.get_grid_array()),
+        'rlgc_per_step': [float(value) for value in data_source.get_unit_rlgc_per_step()],
+        'elements': elements,
+        'files': files,
+        'load_impedance': [load_impedance.real, load_impedance.imag],
+    }
+
+
+def input_hash(data_source, load_impedance: complex, family: str = 'batched') -> str:
+    """扫描输入的 SHA-256：规范化输入的 JSON 加上频率数组的原始字节"""
+    digest = hashlib.sha256()
+    inputs = normalized_inputs(data_source, load_impedance, family)
+    digest.update(json.dumps(inputs, sort_keys=True, ensure_ascii=False).encode('utf-8'))
+    digest.update(np.ascontiguousarray(data_source.get_freq_array_ghz(), dtype=float).tobytes())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """以输入哈希为键的扫描结果磁盘缓存
+
+    每个条目是目录下的一个 <哈希>.npz，至少包含 impedance、reflection（频率数, 馈电数），
+    电压/电流分布不超过 max_distribution_bytes 时也一并保存（voltage、current）。
+    写入先写临时文件再原子替换；条目数超过 max_entries 或文件总大小超过 max_total_bytes 时
+    从最久未使用的条目开始删除（最新写入的条目总是保留）。
+    """
+
+    def __init__(self, directory: str, max_entries: int = 64, max_total_bytes: int = 1024 * 2 ** 20,
+                 max_distribution_bytes: int = 64 * 2 ** 20):
+        self.directory = os.path.abspath(directory)
+        self.max_entries = max(1, int(max_entries))
+        self.max_total_bytes = int(max_total_bytes)
+        self.max_distribution_bytes = min(int(max_distribution_bytes), self.max_total_bytes)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.npz")
+
+    def __contains__(self, key: str) -> bool:
+        return os.path.isfile(self._path(key))
+
+    def load(self, key: str):
+        """读取条目，返回 {名称: 数组}；不存在或损坏时返回 None"""
+        path = self._path(key)
+        if not os.path.isfile(path):
+            return None
+        try:
+            with np.load(path) as data:
+                entry = {name: data[name] for name in data.files}
+            os.utime(path) # 记录最近使用时间
+        except (OSError, ValueError) as e:
+            print(f"读取结果缓存 {path} 失败: {e}")
+            return None
+        return entry
+
+    def store(self, key: str, impedance, reflection, voltage=None, current=None) -> bool:
+        """保存条目；分布为 None 或超过大小限制时只保存馈电量。成功返回 True"""
+        arrays = {'impedance': np.asarray(impedance, dtype=complex),
+                  'reflection': np.asarray(reflection, dtype=complex)}
+        if voltage is not None and current is not None:
+            size = np.dtype(complex).itemsize * int(np.prod(np.shape(voltage))) * 2
+            if size <= self.max_distribution_bytes:
+                arrays['voltage'] = np.asarray(voltage, dtype=complex)
+                arrays['current'] = np.asarray(current, dtype=complex)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            handle, temporary = tempfile.mkstemp(suffix='.tmp', dir=self.directory)
+            with os.fdopen(handle, 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(temporary, self._path(key))
+        except OSError as e:
+            print(f"写入结果缓存失败: {e}")
+            return False
+        self._prune()
+        return True
+
+    def entries(self):
+        """按最近使用时间从旧到新排列的条目文件"""
+        if not os.path.isdir(self.directory):
+            return []
+        paths = [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith('.npz')]
+        return sorted(paths, key=os.path.getmtime)
+
+    def _prune(self):
+        entries = []
+        for path in self.entries():
+            try:
+                entries.append((path, os.path.getsize(path)))
+            except OSError:
+                pass
+        count, total = len(entries), sum(size for _, size in entries)
+        for path, size in entries[:-1]:
+            if count <= self.max_entries and total <= self.max_total_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            count -= 1
+            total -= size
+
+    def clear(self):
+        for path in self.entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -78,7 +78,8 @@ class ResultPlot:
         # 连接鼠标移动事件
         self.motion_cid = canvas.mpl_connect('motion_notify_event', self.on_mouse_move)
 
-    def update_single_freq_curve(self):
+    def update_single_freq_curve(self, interactive=False):
+        """原地更新单频点电流曲线；interactive=True 时用于实时模式，只请求空闲时重绘"""
         # 获取最新的单频点电流数据
         current_matrix = self.calculator.get_single_freq_current_matrix()
         if current_matrix is None:
@@ -117,9 +118,17 @@ class ResultPlot:
         ax = self.current_widget.current_plot_ax
         # 假设原曲线是第一条（索引0）
         if len(ax.lines) > 0:
-            ax.lines[0].set_ydata(signed_current)
+            line = ax.lines[0]
+            if len(line.get_xdata()) != len(grid_array):
+                line.set_data(grid_array, signed_current) # 网格数变化时同时更新 x
+            else:
+                line.set_ydata(signed_current)
             ax.relim()  # 重新计算数据范围
             ax.autoscale_view()  # 自动调整坐标轴范围
+            if interactive:
+                # 实时模式：合并到下一次事件循环重绘，避免阻塞拖动
+                self.current_widget.current_plot_canvas.draw_idle()
+                return
             # 更新标题（可选）
             ax.set_title('更新后的单频点电流分布（考虑相位）')
             # 重绘画布
@@ -145,4 +154,116 @@ class ResultPlot:
             if not hasattr(self, 'current_text'):
                 self.current_text = ax.text(0.95, 0.95, '', transform=ax.transAxes, ha='right', va='top')
             self.current_text.set_text(f'x: {event.xdata:.2f}, y: {y_val:.2f}')
-            self.current_widget.current_plot_canvas.draw()
\ No newline at end of file
+            self.current_widget.current_plot_canvas.draw()
+
+class PatternPlot:
+    """方向图页：θ 切面（极坐标）和方向性系数/增益随频率的曲线"""
+
+    def __init__(self, result_ui):
+        self.result_ui = result_ui
+        self.pattern_widget = self.result_ui.findChild(QtWidgets.QFrame, 'PatternFrame')
+        if not self.pattern_widget:
+            raise ValueError("未找到名为'PatternFrame'的QFrame子控件")
+        self.canvas = None
+
+    def _create_canvas(self):
+        plt.rcParams['font.family'] = ['SimHei']
+        plt.rcParams['axes.unicode_minus'] = False
+        figure = plt.Figure()
+        self.canvas = FigureCanvas(figure)
+        self.cut_ax = figure.add_subplot(121, projection='polar')
+        self.directivity_ax = figure.add_subplot(122)
+        toolbar = NavigationToolbar(self.canvas, self.pattern_widget)
+        layout = self.pattern_widget.layout()
+        if not layout:
+            layout = QtWidgets.QVBoxLayout(self.pattern_widget)
+        layout.addWidget(toolbar)
+        layout.addWidget(self.canvas)
+
+    def plot(self, pattern, freq_ghz=None, feed=0):
+        """绘制 RadiationPattern：freq_ghz 处（默认第一个频点）的切面和全部频点的方向性系数"""
+        if self.canvas is None:
+            self._create_canvas()
+        freq_index = 0 if freq_ghz is None else int(np.argmin(np.abs(pattern.frequencies_ghz - freq_ghz)))
+        floor_db = -40.0
+        theta, values = pattern.cut(freq_index, feed, db=True, floor_db=floor_db)
+
+        ax = self.cut_ax
+        ax.clear()
+        ax.set_theta_zero_location('N') # θ 从天线轴（z 轴）量起
+        # 方向图绕天线轴对称，镜像得到完整的切面
+        ax.plot(np.radians(np.concatenate([theta, 360 - theta[::-1]])),
+                np.concatenate([values, values[::-1]]) - floor_db)
+        ax.set_rlim(0, -floor_db)
+        ax.set_rticks([10, 20, 30, 40])
+        ax.set_yticklabels(['-30', '-20', '-10', '0 dB'])
+        ax.set_title(f'方向图 {pattern.frequencies_ghz[freq_index] * 1000:.1f} MHz')
+
+        ax = self.directivity_ax
+        ax.clear()
+        frequencies_mhz = pattern.frequencies_ghz * 1000
+        ax.plot(frequencies_mhz, pattern.directivity_dbi[:, feed], '.-' if len(frequencies_mhz) < 50 else '-',
+                label='方向性系数')
+        if pattern.gain is not None:
+            ax.plot(frequencies_mhz, pattern.gain_dbi[:, feed], '--', label='增益')
+        ax.set_xlabel('频率 (MHz)')
+        ax.set_ylabel('dBi')
+        ax.legend()
+        ax.grid(True)
+        self.canvas.draw_idle()
+
+
+class TimeDomainPlot:
+    """时域页：TDR 曲线和各节点 TDT 响应（位置 × 时间）"""
+
+    def __init__(self, result_ui):
+        self.result_ui = result_ui
+        self.time_domain_widget = self.result_ui.findChild(QtWidgets.QFrame, 'TimeDomainFrame')
+        if not self.time_domain_widget:
+            raise ValueError("未找到名为'TimeDomainFrame'的QFrame子控件")
+        self.canvas = None
+
+    def _create_canvas(self):
+        plt.rcParams['font.family'] = ['SimHei']
+        plt.rcParams['axes.unicode_minus'] = False
+        self.figure = plt.Figure()
+        self.canvas = FigureCanvas(self.figure)
+        toolbar = NavigationToolbar(self.canvas, self.time_domain_widget)
+        layout = self.time_domain_widget.layout()
+        if not layout:
+            layout = QtWidgets.QVBoxLayout(self.time_domain_widget)
+        layout.addWidget(toolbar)
+        layout.addWidget(self.canvas)
+
+    def plot(self, analysis, use_distance=False, feed=0):
+        """绘制 TimeDomainAnalysis；use_distance=True 且已知相速度时横轴为距离（mm）"""
+        if self.canvas is None:
+            self._create_canvas()
+        self.figure.clear()
+        # 只显示不混叠的前半段时间
+        shown = slice(0, len(analysis.time) // 2)
+        if use_distance and analysis.velocity is not None:
+            axis, label = analysis.distance(round_trip=True)[shown] * 1000, '距馈电距离 (mm)'
+        else:
+            axis, label = analysis.time[shown] * 1e9, '时间 (ns)'
+
+        ax = self.figure.add_subplot(211 if analysis.tdt is not None else 111)
+        ax.plot(axis, analysis.tdr_db(feed)[shown])
+        ax.set_xlabel(label)
+        ax.set_ylabel('TDR (dB)')
+        ax.grid(True)
+
+        if analysis.tdt is not None:
+            ax = self.figure.add_subplot(212)
+            node_axis = analysis.node_indices
+            # TDT 为单程传播，距离轴按单程换算
+            if use_distance and analysis.velocity is not None:
+                x_axis, x_label = analysis.distance(round_trip=False)[shown] * 1000, '传播距离 (mm)'
+            else:
+                x_axis, x_label = axis, label
+            image = ax.pcolormesh(x_axis, node_axis, analysis.tdt_db(feed)[shown].T, shading='auto',
+                                  vmin=-60, vmax=0)
+            self.figure.colorbar(image, ax=ax, label='TDT (dB)')
+            ax.set_xlabel(x_label)
+            ax.set_ylabel('节点')
+        self.canvas.draw_idle()
@@ -0,0 +1,293 @@
+import sys
+import time
+from typing import Dict, Tuple
+
+import numpy as np
+
+from solver_kernel import BatchedFeedSolver, abcd_inverse, apply_abcd, line_section_abcd, port_impedance
+
+# 单个块内允许的最大增长（以 e 为底的指数），远小于 float64 上限 709
+MAX_BLOCK_GROWTH = 50.0
+
+
+def _block_size(gamma: np.ndarray, requested: int) -> int:
+    """根据每段衰减常数选择块长，保证块内增长不超过 MAX_BLOCK_GROWTH"""
+    attenuation = float(np.max(np.abs(gamma.real))) if gamma.size else 0.0
+    if attenuation <= 0:
+        return requested
+    return int(max(1, min(requested, MAX_BLOCK_GROWTH // attenuation)))
+
+
+def propagate_scaled(gamma: np.ndarray, zc: np.ndarray, sections: Dict[int, np.ndarray], start: int, stop: int,
+                     inverse: bool, block_size: int = 256) -> Tuple[np.ndarray, np.ndarray]:
+    """从边界状态 (0, 1) 出发沿网格段 [start, stop) 级联，按块重新归一化
+
+    inverse=False 时自左向右乘 M[k]，得到节点 start..stop 的状态；
+    inverse=True 时自右向左乘 M[k] 的逆，得到节点 stop..start 的状态。
+    均匀传输线段在块内用闭式解一次性展开到每个节点。
+
+    返回：
+        (mantissa, log_scale)，按节点序号从小到大排列，形状 (节点数, F, 2) 与 (节点数, F)；
+        真实状态为 mantissa * exp(log_scale)
+    """
+    num_nodes = stop - start + 1
+    num_freqs = gamma.shape[0]
+    mantissa = np.empty((num_nodes, num_freqs, 2), dtype=complex)
+    log_scale = np.empty((num_nodes, num_freqs))
+    block_size = _block_size(gamma, block_size)
+
+    state = np.zeros((num_freqs, 2), dtype=complex)
+    state[:, 1] = 1
+    scale = np.zeros(num_freqs)
+    last = num_nodes - 1
+
+    def position(produced):
+        """第 produced 个传播出的节点在输出数组中的位置"""
+        return last - produced if inverse else produced
+
+    mantissa[position(0)] = state
+    log_scale[position(0)] = scale
+    produced = 1
+
+    def renormalize(current_state, current_scale):
+        norm = np.max(np.abs(current_state), axis=-1)
+        norm = np.where(norm > 0, norm, 1.0)
+        return current_state / norm[:, None], current_scale + np.log(norm)
+
+    # 拆分为按传播顺序交替的 ('line', 均匀段长度) 与 ('element', 网格索引)
+    element_positions = sorted(k for k in sections if start <= k < stop)
+    if inverse:
+        element_positions = element_positions[::-1]
+    sign = -1 if inverse else 1
+    cursor = stop - 1 if inverse else start
+    segments = []
+    for k in element_positions:
+        gap = (cursor - k) if inverse else (k - cursor)
+        if gap > 0:
+            segments.append(('line', gap))
+        segments.append(('element', k))
+        cursor = k - 1 if inverse else k + 1
+    remaining = (cursor - start + 1) if inverse else (stop - cursor)
+    if remaining > 0:
+        segments.append(('line', remaining))
+
+    for kind, value in segments:
+        if kind == 'element':
+            matrix = abcd_inverse(sections[value]) if inverse else sections[value]
+            state = apply_abcd(matrix, state)
+            state, scale = renormalize(state, scale)
+            mantissa[position(produced)] = state
+            log_scale[position(produced)] = scale
+            produced += 1
+            continue
+        length = value
+        for block_start in range(0, length, block_size):
+            count = min(block_size, length - block_start)
+            steps = np.arange(1, count + 1)[:, None]
+            powers = line_section_abcd(gamma[None, :] * steps, zc[None, :], sign)  # (count, F, 2, 2)
+            block_states = apply_abcd(powers, state[None])
+            indices = position(produced + np.arange(count))
+            mantissa[indices] = block_states
+            log_scale[indices] = scale
+            produced += count
+            state, scale = renormalize(block_states[-1], scale)
+    return mantissa, log_scale
+
+
+def cascade_scaled(matrices: np.ndarray, inverse: bool) -> Tuple[np.ndarray, np.ndarray]:
+    """从边界状态 (0, 1) 出发逐段级联任意 ABCD 矩阵 (段数, F, 2, 2)，每段后重新归一化
+
+    inverse=False 时自左向右乘 matrices[k]；inverse=True 时自右端向左乘其逆。
+    返回值的含义与 propagate_scaled 相同，节点数为段数 + 1。
+    """
+    num_sections, num_freqs = matrices.shape[0], matrices.shape[1]
+    mantissa = np.empty((num_sections + 1, num_freqs, 2), dtype=complex)
+    log_scale = np.empty((num_sections + 1, num_freqs))
+    state = np.zeros((num_freqs, 2), dtype=complex)
+    state[:, 1] = 1
+    scale = np.zeros(num_freqs)
+    first = num_sections if inverse else 0
+    mantissa[first], log_scale[first] = state, scale
+    steps = range(num_sections - 1, -1, -1) if inverse else range(num_sections)
+    inverses = abcd_inverse(matrices) if inverse else None
+    for k in steps:
+        state = apply_abcd(inverses[k] if inverse else matrices[k], state)
+        norm = np.max(np.abs(state), axis=-1)
+        norm = np.where(norm > 0, norm, 1.0)
+        state = state / norm[:, None]
+        scale = scale + np.log(norm)
+        node = k if inverse else k + 1
+        mantissa[node], log_scale[node] = state, scale
+    return mantissa, log_scale
+
+
+def combine_feed_states(left: np.ndarray, left_log: np.ndarray, right: np.ndarray,
+                        right_log: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """合并馈电点两侧的打靶结果
+
+    left 为左边界到馈电节点（最后一项）的状态，right 为馈电右侧节点（第一项）到右边界的状态，
+    均为 (mantissa, log_scale) 形式。右侧按电压连续条件与左侧对齐后，
+    整体归一化到单位馈电电流 J = I_L - I_R。
+
+    返回：
+        (各节点状态 (节点数, F, 2), 输入阻抗 (F,))
+    """
+    left_feed = left[-1]
+    right_feed = right[0]
+    impedance = port_impedance(left_feed, right_feed)
+
+    # 以馈电点左侧状态为基准，右侧按电压连续条件对齐
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore', under='ignore'):
+        ratio = left_feed[:, 0] / right_feed[:, 0]
+        ratio = np.where(np.isfinite(ratio), ratio, 0)
+        left_states = left * np.exp(left_log - left_log[-1])[..., None]
+        right_states = right * (ratio * np.exp(right_log - right_log[0]))[..., None]
+    states = np.concatenate([left_states, right_states], axis=0)
+
+    feed_current = left_feed[:, 1] - right_feed[:, 1] * ratio
+    with np.errstate(divide='ignore', invalid='ignore'):
+        states = states / feed_current[None, :, None]
+    return states, impedance
+
+
+class ScaledPropagationSolver:
+    """按块重新归一化的打靶法
+
+    与原打靶法的网格模型和左右打靶过程相同，但状态向量每个块重新归一化，
+    缩放因子以对数形式累计，因此长/有损网格（10 万节点以上）也不会上溢或下溢；
+    均匀传输线段用闭式解在块内向量化展开，并对所有频点批量计算。
+    结果按单位馈电电流归一化，与 NodalSolver 一致。
+    """
+
+    def __init__(self, solver: BatchedFeedSolver, block_size: int = 256):
+        self.solver = solver
+        self.block_size = block_size
+
+    @classmethod
+    def from_data_source(cls, data_source, frequencies_ghz=None, load_impedance: complex = 50.0):
+        return cls(BatchedFeedSolver.from_data_source(data_source, frequencies_ghz, load_impedance))
+
+    def solve(self, max_block_elements: int = 4_000_000) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """求解全部频点和馈电，返回 (电压, 电流, 输入阻抗)，形状同 NodalSolver.solve
+
+        max_block_elements 限制每次处理的 网格数 × 频点数，用于控制内存。
+        """
+        solver = self.solver
+        N = solver.num_grids
+        num_freqs = len(solver.frequencies_ghz)
+        num_feeds = len(solver.feed_rows)
+        voltage = np.full((num_freqs, N, num_feeds), np.nan + 0j, dtype=complex)
+        current = np.full((num_freqs, N, num_feeds), np.nan + 0j, dtype=complex)
+        impedance = np.full((num_freqs, num_feeds), np.nan + 0j, dtype=complex)
+        if N < 1:
+            return voltage, current, impedance
+
+        sections = solver.section_matrices()
+        chunk = max(1, max_block_elements // max(N, 1))
+        for column, feed_index in enumerate(solver.table.feed_indices.tolist()):
+            if not 0 <= feed_index < N:
+                print(f"馈电节点索引 {feed_index} 无效，跳过此馈电点。")
+                continue
+            for start in range(0, num_freqs, chunk):
+                frequency_slice = slice(start, min(start + chunk, num_freqs))
+                V, I, Z = self._solve_feed(sections, feed_index, frequency_slice)
+                voltage[frequency_slice, :, column] = V
+                current[frequency_slice, :, column] = I
+                impedance[frequency_slice, column] = Z
+        return voltage, current, impedance
+
+    def _solve_feed(self, sections, feed_index, frequency_slice):
+        solver = self.solver
+        N = solver.num_grids
+        gamma = solver.gamma[frequency_slice]
+        zc = solver.zc[frequency_slice]
+        local_sections = {k: m[frequency_slice] for k, m in sections.items()}
+
+        left, left_log = propagate_scaled(gamma, zc, local_sections, 0, feed_index, False, self.block_size)
+        right, right_log = propagate_scaled(gamma, zc, local_sections, feed_index + 1, N, True, self.block_size)
+        states, Z = combine_feed_states(left, left_log, right, right_log)
+        states = states[:N]  # 节点 0..N-1
+        V = states[..., 0].T
+        I = states[..., 1].T.copy()
+        # 与打靶法输出一致：馈电节点的电流取两侧电流之和
+        if 0 < feed_index < N - 1:
+            I[:, feed_index] = I[:, feed_index - 1] + I[:, feed_index + 1]
+        return V, I, Z
+
+
+def benchmark(grid_counts=(2001, 20001, 100001), frequencies_ghz=(1.0, 4.0, 7.0), shooting_limit: int = 20001,
+              resistance_per_meter: float = 1e6):
+    """对比缩放传播、节点导纳法和原打靶法的精度与速度
+
+    以节点导纳法为参考，计算输入阻抗和电流分布（缩放到单位馈电电流后）的最大相对误差。
+    原打靶法逐频点逐节点循环，只在网格数不超过 shooting_limit 时运行。
+    天线为 1 m 长的有损线，馈电位于 1/10 处，中间串联一个元件；默认的串联电阻使整条线
+    的总衰减约 2500 Np，远超 float64 的指数范围（约 709），原打靶法在此处溢出为 inf/NaN。
+    """
+    from antsim_calculator import AntSimCalculator
+    from nodal_solver import match_shooting_scale
+
+    class _BenchmarkData:
+        """最小化的数据源，接口与 AntSimData 相同"""
+        def __init__(self, grid_count):
+            step = 1.0 / (grid_count - 1)
+            self.grid_array = np.linspace(0, 1.0, grid_count)
+            self.antenna_elements_data = [
+                {'类型': '馈电', '索引': grid_count // 10, '值': ''},
+                {'类型': '元件', '索引': grid_count // 2, '值': 'S(2o+3n)'},
+            ]
+            # 200 Ω 特性阻抗，传播速度 1.456e8 m/s
+            self.rlgc = (resistance_per_meter * step, 200 / 1.456e8 * step, 0.0, 1 / (1.456e8 * 200) * step)
+            self.freq_array = np.asarray(frequencies_ghz) * 1e9
+
+        def get_grid_array(self): return self.grid_array
+        def get_unit_rlgc_per_step(self): return self.rlgc
+        def get_freq_array_ghz(self): return self.freq_array / 1e9
+
+    def relative_error(a, b):
+        # 参考值有限而结果溢出（inf/NaN）时记为 inf
+        if np.any(np.isfinite(b) & ~np.isfinite(a)):
+            return float('inf')
+        scale = np.nanmax(np.abs(b))
+        return float(np.nanmax(np.abs(a - b)) / scale) if scale > 0 else float('nan')
+
+    print(f"{'网格数':>8} {'方法':>10} {'耗时(s)':>10} {'Zin相对误差':>14} {'电流相对误差':>14}")
+    for grid_count in grid_counts:
+        data = _BenchmarkData(grid_count)
+        kernel = BatchedFeedSolver.from_data_source(data)
+
+        start = time.perf_counter()
+        from nodal_solver import NodalSolver
+        V_ref, I_ref, Z_ref = NodalSolver(kernel).solve()
+        print(f"{grid_count:>8} {'nodal':>10} {time.perf_counter() - start:>10.3f} {'(参考)':>14} {'(参考)':>14}")
+
+        start = time.perf_counter()
+        V, I, Z = ScaledPropagationSolver(kernel).solve()
+        elapsed = time.perf_counter() - start
+        print(f"{grid_count:>8} {'scaled':>10} {elapsed:>10.3f} "
+              f"{relative_error(Z, Z_ref):>14.3e} {relative_error(I, I_ref):>14.3e}")
+
+        if grid_count <= shooting_limit:
+            calculator = AntSimCalculator(data)
+            calculator.solver_method = 'shooting' # 默认为 'auto'，此处须测打靶法本身
+            stdout = sys.stdout
+            start = time.perf_counter()
+            try:
+                sys.stdout = None  # 原打靶法逐频点打印矩阵，基准测试时屏蔽
+                with np.errstate(all='ignore'):
+                    shooting_Z = calculator.calculate_feed_impedance(data.get_freq_array_ghz())
+                    currents = []
+                    for freq in data.get_freq_array_ghz():
+                        currents.append(np.array(calculator._solve_frequency(freq)[1]).T)
+            finally:
+                sys.stdout = stdout
+            elapsed = time.perf_counter() - start
+            _, I_ref_scaled = match_shooting_scale(V_ref, I_ref)
+            with np.errstate(all='ignore'):
+                current_error = relative_error(np.array(currents), I_ref_scaled)
+            print(f"{grid_count:>8} {'shooting':>10} {elapsed:>10.3f} "
+                  f"{relative_error(shooting_Z, Z_ref):>14.3e} {current_error:>14.3e}")
+
+
+if __name__ == '__main__':
+    benchmark()
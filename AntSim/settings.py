@@ -39,6 +39,7 @@ class Settings(QObject):
     frequency_changed = pyqtSignal(dict)
     grid_changed = pyqtSignal(dict)
     line_changed = pyqtSignal(dict)
+    auto_trigger_changed = pyqtSignal(bool)
 
     # 类属性作为默认设置
     frequency_settings = {
@@ -279,7 +280,9 @@ class Settings(QObject):
                  return # 不处理对计算字段的直接编辑（如果允许的话）或程序化更改
 
             # 根据更改项的类别触发相应的更新方法
-            if parent_text == '频率设置':
+            if item_text == '自动触发':
+                self.auto_trigger_changed.emit(item.checkState(1) == QtCore.Qt.Checked)
+            elif parent_text == '频率设置':
                 self._update_frequency_settings()
             elif parent_text == '网格设置':
                 self._update_grid_settings()
@@ -287,6 +290,45 @@ class Settings(QObject):
                 # 传输线设置通常不涉及内部计算，可以直接触发更新/信号
                 self._update_line_settings()
 
+    def is_auto_trigger(self):
+        """返回“自动触发”是否勾选"""
+        if not self.setting_tree: return False
+        items = self.setting_tree.findItems('自动触发', Qt.MatchExactly | Qt.MatchRecursive, 0)
+        return bool(items) and items[0].checkState(1) == QtCore.Qt.Checked
+
+    def get_all_settings(self):
+        """返回全部设置 {'frequency': {...}, 'grid': {...}, 'line': {...}, 'auto_trigger': bool}，键同类属性中的默认设置"""
+        return {
+            'frequency': self._read_settings_from_tree("频率设置"),
+            'grid': self._read_settings_from_tree("网格设置"),
+            'line': self._read_settings_from_tree("传输线设置"),
+            'auto_trigger': self.is_auto_trigger(),
+        }
+
+    def apply_settings(self, all_settings):
+        """写入 get_all_settings 格式的设置：先静默写入树，再对每个类别重新计算并各发射一次信号"""
+        if not self.setting_tree: return
+        categories = [("频率设置", 'frequency', self.frequency_settings), ("网格设置", 'grid', self.grid_settings),
+                      ("传输线设置", 'line', self.line_settings)]
+        self.setting_tree.blockSignals(True)
+        try:
+            for category_name, section, defaults in categories:
+                values = all_settings.get(section, {})
+                for key in defaults:
+                    if key in values:
+                        self._update_tree_item(category_name, key, values[key])
+            if 'auto_trigger' in all_settings:
+                items = self.setting_tree.findItems('自动触发', Qt.MatchExactly | Qt.MatchRecursive, 0)
+                if items:
+                    items[0].setCheckState(1, QtCore.Qt.Checked if all_settings['auto_trigger'] else QtCore.Qt.Unchecked)
+        finally:
+            self.setting_tree.blockSignals(False)
+        self._update_frequency_settings()
+        self._update_grid_settings()
+        self._update_line_settings()
+        if 'auto_trigger' in all_settings:
+            self.auto_trigger_changed.emit(self.is_auto_trigger())
+
     def get_current_freq(self):
         """返回当前频点的值"""
         settings = self._read_settings_from_tree("频率设置")
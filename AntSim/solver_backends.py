@@ -0,0 +1,175 @@
+import numpy as np
+from typing import Dict, Sequence
+
+import propagation_kernel
+from adaptive_mesh import AdaptiveMeshSolver
+from nodal_solver import NodalSolver
+from propagation_kernel import CompiledKernelSolver
+from scaled_propagation import ScaledPropagationSolver
+from solver_kernel import BatchedFeedSolver
+
+# 可请求的输出量
+QUANTITIES = ('voltage', 'current', 'impedance')
+
+# 自动选择的阈值
+OVERFLOW_ATTENUATION = 300.0   # 全长衰减（Np）超过此值时不使用不缩放的递推
+LARGE_GRID = 20000             # 网格数达到此值且元件稀疏时使用自适应网格
+SPARSE_ELEMENT_FRACTION = 0.01 # 元件数 / 网格数 低于此值视为稀疏
+MANY_FEEDS = 4                 # 馈电数达到此值时优先使用节点导纳法（多个右端项共享一次消元）
+
+
+class SolverBackend:
+    """求解后端接口
+
+    输入为 BatchedFeedSolver（频率数组、网格数、单位网格 RLGC、已编译的元件 ABCD、馈电），
+    输出为所请求的量 {'voltage', 'current', 'impedance'}：
+    电压/电流形状 (F, 网格数, 馈电数)，按单位馈电电流归一化；输入阻抗形状 (F, 馈电数)。
+    """
+    name = ''
+    description = ''
+    provides_distribution = True # 能否给出电压/电流分布
+
+    def available(self) -> bool:
+        return True
+
+    def solve(self, kernel: BatchedFeedSolver, quantities: Sequence[str]) -> Dict[str, np.ndarray]:
+        raise NotImplementedError
+
+
+class _SolverClassBackend(SolverBackend):
+    """包装 solve() 返回 (电压, 电流, 输入阻抗) 的求解器类"""
+    solver_class = None
+
+    def solve(self, kernel, quantities):
+        voltage, current, impedance = self.solver_class(kernel).solve()
+        result = {'voltage': voltage, 'current': current, 'impedance': impedance}
+        return {key: result[key] for key in quantities}
+
+
+class ClosedFormBackend(SolverBackend):
+    name = 'closed_form'
+    description = '元件之间用闭式解跨越，只求馈电阻抗，代价只与元件数有关'
+    provides_distribution = False
+
+    def solve(self, kernel, quantities):
+        return {'impedance': kernel.feed_impedance()}
+
+
+class NodalBackend(_SolverClassBackend):
+    name = 'nodal'
+    description = '带状节点导纳法，多个馈电共享拓扑批量消元'
+    solver_class = NodalSolver
+
+
+class ScaledBackend(_SolverClassBackend):
+    name = 'scaled'
+    description = '按块归一化的打靶法，长/高损耗网格不溢出'
+    solver_class = ScaledPropagationSolver
+
+
+class AdaptiveBackend(_SolverClassBackend):
+    name = 'adaptive'
+    description = '自适应网格，适合元件稀疏的大网格'
+    solver_class = AdaptiveMeshSolver
+
+
+class CompiledBackend(_SolverClassBackend):
+    name = 'compiled'
+    description = '编译内核（numba，未安装时为 NumPy）批量打靶，所有馈电共用一次递推'
+    solver_class = CompiledKernelSolver
+
+
+_registry: Dict[str, SolverBackend] = {}
+
+
+def register_backend(backend: SolverBackend):
+    """注册（或替换）一个求解后端"""
+    _registry[backend.name] = backend
+
+
+def get_solver_backend(name: str) -> SolverBackend:
+    if name not in _registry:
+        raise ValueError(f"未知的求解后端: {name}")
+    return _registry[name]
+
+
+def backend_names(available_only: bool = True):
+    """已注册的后端名称"""
+    return [name for name, backend in _registry.items() if backend.available() or not available_only]
+
+
+for _backend in (ClosedFormBackend(), NodalBackend(), ScaledBackend(), AdaptiveBackend(), CompiledBackend()):
+    register_backend(_backend)
+
+
+def select_backend(kernel: BatchedFeedSolver, quantities: Sequence[str] = QUANTITIES) -> str:
+    """按问题规模选择后端
+
+    - 只需要馈电阻抗：closed_form
+    - 全长衰减很大：不缩放的递推会溢出，元件稀疏的大网格用 adaptive，否则 scaled
+    - 元件稀疏的大网格：adaptive
+    - 装有 numba：compiled
+    - 馈电较多：nodal
+    - 其余：scaled
+    """
+    def usable(name):
+        return name in _registry and _registry[name].available()
+
+    if 'voltage' not in quantities and 'current' not in quantities and usable('closed_form'):
+        return 'closed_form'
+    num_grids = kernel.num_grids
+    num_elements = int(np.count_nonzero(kernel.table.indices >= 0))
+    attenuation = float(np.max(np.abs(kernel.gamma.real))) * num_grids if kernel.gamma.size else 0.0
+    sparse = num_grids >= LARGE_GRID and num_elements < SPARSE_ELEMENT_FRACTION * num_grids
+
+    if sparse and usable('adaptive'):
+        return 'adaptive'
+    if attenuation > OVERFLOW_ATTENUATION and usable('scaled'):
+        return 'scaled'
+    if propagation_kernel.numba is not None and usable('compiled'):
+        return 'compiled'
+    if len(kernel.feed_rows) >= MANY_FEEDS and usable('nodal'):
+        return 'nodal'
+    return 'scaled'
+
+
+def solve(kernel: BatchedFeedSolver, quantities: Sequence[str] = QUANTITIES, backend: str = 'auto'):
+    """用指定（或自动选择的）后端求解，返回 (后端名称, {量: 数组})"""
+    for quantity in quantities:
+        if quantity not in QUANTITIES:
+            raise ValueError(f"未知的输出量: {quantity}")
+    name = select_backend(kernel, quantities) if backend == 'auto' else backend
+    solver_backend = get_solver_backend(name)
+    if not solver_backend.available():
+        raise ValueError(f"求解后端 {name} 在当前环境中不可用")
+    if not solver_backend.provides_distribution and ('voltage' in quantities or 'current' in quantities):
+        raise ValueError(f"求解后端 {name} 不提供电压/电流分布")
+    return name, solver_backend.solve(kernel, quantities)
+
+
+def solve_chunked(kernel: BatchedFeedSolver, quantities: Sequence[str] = QUANTITIES, backend: str = 'auto',
+                  chunk_size: int = 64, callback=None):
+    """按频率分块求解，返回值同 solve
+
+    元件 ABCD 在全部频点上只计算一次，各块按频率切片复用；后端按整个问题选择一次。
+    callback(已完成频点数) 在每块完成后调用，可用于报告进度，也可抛出异常中止求解。
+    """
+    for quantity in quantities:
+        if quantity not in QUANTITIES:
+            raise ValueError(f"未知的输出量: {quantity}")
+    name = select_backend(kernel, quantities) if backend == 'auto' else backend
+    frequencies = kernel.frequencies_ghz
+    sections = kernel.nominal_sections()
+    chunk_size = max(1, int(chunk_size))
+    parts = []
+    for start in range(0, len(frequencies), chunk_size):
+        chunk = slice(start, start + chunk_size)
+        chunk_sections = {row: None if abcd is None else abcd[chunk] for row, abcd in sections.items()}
+        chunk_kernel = BatchedFeedSolver(frequencies[chunk], kernel.num_grids, kernel.rlgc_per_step,
+                                         kernel.table, kernel.load_impedance, chunk_sections)
+        parts.append(solve(chunk_kernel, quantities, name)[1])
+        if callback is not None:
+            callback(min(start + chunk_size, len(frequencies)))
+    if not parts:
+        return name, {}
+    return name, {key: np.concatenate([part[key] for part in parts]) for key in quantities}
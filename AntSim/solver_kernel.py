@@ -0,0 +1,223 @@
+import numpy as np
+from typing import Dict, List, Optional, Union
+
+from circuit import CircuitEvaluator
+from element_table import ElementTable, element_table_of
+
+
+def unit_line_parameters(rlgc_per_step, frequencies_ghz: np.ndarray):
+    """计算单位网格传输线在各频点的传播常数 γ 和特性阻抗 Zc
+
+    参数：
+        rlgc_per_step: (R, L, G, C)，单位网格的 RLGC
+        frequencies_ghz: np.ndarray，频率数组（GHz），形状 (F,)
+
+    返回：
+        (gamma, zc)，形状均为 (F,)
+    """
+    R, L, G, C = rlgc_per_step
+    omega = 2 * np.pi * np.asarray(frequencies_ghz, dtype=float) * 1e9
+    Z = R + 1j * omega * L
+    Y = G + 1j * omega * C
+    gamma = np.sqrt(Z * Y)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        zc = np.sqrt(Z / Y)
+    return gamma, zc
+
+
+def line_section_abcd(gamma: np.ndarray, zc: np.ndarray, count) -> np.ndarray:
+    """count 段单位网格级联后的 ABCD 矩阵（闭式解），count 可为负数表示逆矩阵
+
+    返回：
+        np.ndarray，形状 (F, 2, 2)
+    """
+    theta = count * gamma
+    cosh_theta = np.cosh(theta)
+    sinh_theta = np.sinh(theta)
+    abcd = np.empty(gamma.shape + (2, 2), dtype=complex)
+    abcd[..., 0, 0] = cosh_theta
+    abcd[..., 0, 1] = zc * sinh_theta
+    with np.errstate(divide='ignore', invalid='ignore'):
+        abcd[..., 1, 0] = np.where(np.isfinite(zc) & (zc != 0), sinh_theta / zc, 0)
+    abcd[..., 1, 1] = cosh_theta
+    return abcd
+
+
+def abcd_inverse(abcd: np.ndarray) -> np.ndarray:
+    """批量求 2x2 ABCD 矩阵的逆"""
+    det = abcd[..., 0, 0] * abcd[..., 1, 1] - abcd[..., 0, 1] * abcd[..., 1, 0]
+    inverse = np.empty(abcd.shape, dtype=complex)
+    inverse[..., 0, 0] = abcd[..., 1, 1] / det
+    inverse[..., 0, 1] = -abcd[..., 0, 1] / det
+    inverse[..., 1, 0] = -abcd[..., 1, 0] / det
+    inverse[..., 1, 1] = abcd[..., 0, 0] / det
+    return inverse
+
+
+def apply_abcd(abcd: np.ndarray, state: np.ndarray) -> np.ndarray:
+    """批量计算 abcd @ state，state 形状 (..., 2)，支持广播"""
+    return (abcd @ state[..., None])[..., 0]
+
+
+def port_impedance(left_state: np.ndarray, right_state: np.ndarray) -> np.ndarray:
+    """由馈电点左右两侧的 (V, I) 计算端口输入阻抗（两侧网络并联）
+
+    与 AntSimCalculator._port_impedance 相同：电流均以指向左侧为正。
+    """
+    V_L, I_L = left_state[..., 0], left_state[..., 1]
+    V_R, I_R = right_state[..., 0], right_state[..., 1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return V_L * V_R / (I_L * V_R - I_R * V_L)
+
+
+def reflection_coefficient(impedance: np.ndarray, load_impedance: complex = 50.0) -> np.ndarray:
+    """以 load_impedance 为参考阻抗计算反射系数"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        gamma = (impedance - load_impedance) / (impedance + load_impedance)
+    return np.where(np.isinf(impedance), 1.0 + 0j, gamma)
+
+
+class BatchedFeedSolver:
+    """批量求解馈电输入阻抗的内核
+
+    与 AntSimCalculator 的打靶法使用相同的网格模型（两端短路，元件/馈电占据其
+    索引处的网格段，馈电自身所在网格段视为理想连接），但只在馈电处求端口阻抗：
+    相邻元件之间的均匀传输线用闭式解一次跨越，因此代价只与元件数有关；
+    元件数值可带任意前导批量维度（如优化器的候选参数集、蒙特卡洛样本），
+    所有候选在一次调用中同时求解。
+    """
+
+    def __init__(self, frequencies_ghz, num_grids: int, rlgc_per_step, antenna_elements: Union[List[dict], ElementTable],
+                 load_impedance: complex = 50.0, nominal_sections: Dict[int, np.ndarray] = None):
+        """
+        antenna_elements 可为行字典列表或已构建的 ElementTable（如 AntSimData 缓存的表，编译句柄随之复用）。
+        nominal_sections 可传入已算好的 {行号: ABCD}（频率须一致），用于在多次求解之间复用。
+        """
+        self.frequencies_ghz = np.atleast_1d(np.asarray(frequencies_ghz, dtype=float))
+        self.num_grids = int(num_grids)
+        self.rlgc_per_step = tuple(rlgc_per_step)
+        self.table = ElementTable.coerce(antenna_elements)
+        self.antenna_elements = self.table.elements
+        self.load_impedance = load_impedance
+        self.gamma, self.zc = unit_line_parameters(self.rlgc_per_step, self.frequencies_ghz)
+        # 馈电所在的行号（antenna_elements 中的位置）
+        self.feed_rows = self.table.feed_rows.tolist()
+        self._nominal_sections = dict(nominal_sections or {})
+        self._evaluator = None # 本内核频率上的 CircuitEvaluator，各行共用的子电路只求值一次
+
+    @classmethod
+    def from_data_source(cls, data_source, frequencies_ghz=None, load_impedance: complex = 50.0):
+        """从 AntSimData（或同接口对象）构建内核，默认使用其完整频率数组"""
+        if frequencies_ghz is None:
+            frequencies_ghz = data_source.get_freq_array_ghz()
+        return cls(frequencies_ghz, len(data_source.get_grid_array()), data_source.get_unit_rlgc_per_step(),
+                   element_table_of(data_source), load_impedance)
+
+    def nominal_sections(self) -> Dict[int, np.ndarray]:
+        """计算并返回所有行在标称取值下的 ABCD {行号: (F, 2, 2)}，解析失败的行为 None
+
+        类型和值字符串相同的行（如周期加载的大量相同元件）共用同一个编译句柄和只读数组，只解析和计算一次；
+        不同行中结构相同的子电路（内部化的语法子树）在本内核的频率上也只求值一次。
+        """
+        for row in range(len(self.antenna_elements)):
+            self._nominal_abcd(row)
+        return dict(self._nominal_sections)
+
+    def _nominal_abcd(self, row: int) -> Optional[np.ndarray]:
+        if row not in self._nominal_sections:
+            self._nominal_sections[row] = self.row_abcd(row)
+        return self._nominal_sections[row]
+
+    def leaf_count(self, row: int) -> int:
+        """指定行的值字符串中元件数值的个数"""
+        return self.table[row].expression.leaf_count
+
+    def row_abcd(self, row: int, leaf_values=None) -> Optional[np.ndarray]:
+        """计算某一行的 ABCD 矩阵 (..., F, 2, 2)，未通过校验或解析失败返回 None（该处保持传输线）
+
+        未通过校验的行已在元件表中标出，这里直接跳过，不再重复报告。
+        """
+        record = self.table[row]
+        if not record.expression.valid:
+            return None
+        if self._evaluator is None:
+            self._evaluator = CircuitEvaluator(self.frequencies_ghz)
+        try:
+            return record.expression.abcd(self.frequencies_ghz, leaf_values, self.load_impedance, self._evaluator)
+        except (ValueError, ZeroDivisionError) as e:
+            print(f"计算第 {row} 行 {self.antenna_elements[row].get('类型')} 的 ABCD 矩阵时出错: {e}")
+        return None
+
+    def section_matrices(self, overrides: Dict[int, np.ndarray] = None, exclude_rows=()) -> Dict[int, np.ndarray]:
+        """返回 {网格索引: ABCD 矩阵}，overrides 为 {行号: 批量数值 (..., 数值个数)}
+
+        同一索引上有多行时以最后一行为准，与打靶法一致；exclude_rows 中的行不参与。
+        """
+        overrides = overrides or {}
+        sections = {}
+        indices = self.table.indices
+        for row in self.table.valid_rows(self.num_grids):
+            row = int(row)
+            if row in exclude_rows:
+                continue
+            index = int(indices[row])
+            if row in overrides:
+                abcd = self.row_abcd(row, overrides[row])
+            else:
+                abcd = self._nominal_abcd(row)
+            if abcd is not None:
+                sections[index] = abcd
+            else:
+                sections.pop(index, None)
+        return sections
+
+    def node_matrices(self, sections: Dict[int, np.ndarray], frequency_slice=slice(None)) -> np.ndarray:
+        """展开为逐网格段的 ABCD 矩阵 (网格数, F, 2, 2)，只支持无批量维度的 sections"""
+        unit = line_section_abcd(self.gamma[frequency_slice], self.zc[frequency_slice], 1)
+        matrices = np.broadcast_to(unit, (self.num_grids,) + unit.shape).copy()
+        for index, abcd in sections.items():
+            matrices[index] = abcd[frequency_slice]
+        return matrices
+
+    def _propagate(self, sections: Dict[int, np.ndarray], start: int, stop: int, inverse: bool) -> np.ndarray:
+        """从边界状态 (0, 1) 沿网格段 [start, stop) 级联
+
+        inverse=False 时自左向右乘 M[k]；inverse=True 时自右向左乘 M[k] 的逆。
+        """
+        state = np.zeros(self.frequencies_ghz.shape + (2,), dtype=complex)
+        state[..., 1] = 1
+        indices = sorted(k for k in sections if start <= k < stop)
+        if inverse:
+            indices = indices[::-1]
+        position = stop if inverse else start
+        for k in indices:
+            gap = (position - (k + 1)) if inverse else (k - position)
+            if gap > 0:
+                state = apply_abcd(line_section_abcd(self.gamma, self.zc, -gap if inverse else gap), state)
+            matrix = abcd_inverse(sections[k]) if inverse else sections[k]
+            state = apply_abcd(matrix, state)
+            position = k if inverse else k + 1
+        gap = (position - start) if inverse else (stop - position)
+        if gap > 0:
+            state = apply_abcd(line_section_abcd(self.gamma, self.zc, -gap if inverse else gap), state)
+        return state
+
+    def feed_impedance(self, overrides: Dict[int, np.ndarray] = None) -> np.ndarray:
+        """各馈电的输入阻抗，形状 (..., F, 馈电数)，无效馈电为 NaN"""
+        sections = self.section_matrices(overrides)
+        results = []
+        for feed_index in self.table.feed_indices.tolist():
+            if not 0 <= feed_index < self.num_grids:
+                results.append(np.full(self.frequencies_ghz.shape, np.nan + 0j))
+                continue
+            # 馈电自身所在的网格段不参与本馈电的求解
+            left_state = self._propagate(sections, 0, feed_index, inverse=False)
+            right_state = self._propagate(sections, feed_index + 1, self.num_grids, inverse=True)
+            results.append(port_impedance(left_state, right_state))
+        if not results:
+            return np.zeros(self.frequencies_ghz.shape + (0,), dtype=complex)
+        return np.stack(np.broadcast_arrays(*results), axis=-1)
+
+    def feed_reflection_coefficient(self, overrides: Dict[int, np.ndarray] = None) -> np.ndarray:
+        """各馈电的反射系数，形状同 feed_impedance"""
+        return reflection_coefficient(self.feed_impedance(overrides), self.load_impedance)
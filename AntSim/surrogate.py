@@ -0,0 +1,207 @@
+import numpy as np
+from typing import Callable, List, Optional
+
+
+def vector_fit(s: np.ndarray, response: np.ndarray, order: int, iterations: int = 10):
+    """矢量拟合（Vector Fitting）：用极点-留数模型逼近频率响应
+
+    模型形式为 f(s) ≈ Σ r_k / (s - p_k) + d + e·s。
+    极点通过迭代求解 σ(s)f(s) 的最小二乘问题并重定位得到，
+    不稳定极点（实部 > 0）会被翻转到左半平面。
+
+    参数：
+        s: np.ndarray，复频率变量（已归一化），形状 (K,)
+        response: np.ndarray，对应的复数响应，形状 (K,)
+        order: int，极点个数
+        iterations: int，极点重定位迭代次数
+
+    返回：
+        (poles, residues, d, e)
+    """
+    # 初始极点：沿虚轴均匀分布在频带内，带少量衰减
+    beta = np.linspace(s.imag.min(), s.imag.max(), order)
+    span = max(s.imag.max() - s.imag.min(), 1e-12)
+    poles = -0.01 * span + 1j * beta
+
+    for _ in range(iterations):
+        basis = 1.0 / (s[:, None] - poles[None, :])
+        A = np.hstack([
+            basis,
+            np.ones((len(s), 1)),
+            s[:, None],
+            -response[:, None] * basis
+        ])
+        # 列归一化以改善条件数
+        scale = np.linalg.norm(A, axis=0)
+        scale[scale == 0] = 1.0
+        x = np.linalg.lstsq(A / scale, response, rcond=None)[0] / scale
+        sigma_residues = x[order + 2:]
+        # σ(s) 的零点即为新的极点
+        poles = np.linalg.eigvals(np.diag(poles) - np.outer(np.ones(order), sigma_residues))
+        unstable = poles.real > 0
+        poles[unstable] = -poles[unstable].real + 1j * poles[unstable].imag
+
+    # 固定极点，求解最终的留数和常数项
+    basis = 1.0 / (s[:, None] - poles[None, :])
+    A = np.hstack([basis, np.ones((len(s), 1)), s[:, None]])
+    scale = np.linalg.norm(A, axis=0)
+    scale[scale == 0] = 1.0
+    x = np.linalg.lstsq(A / scale, response, rcond=None)[0] / scale
+    return poles, x[:order], x[order], x[order + 1]
+
+
+def evaluate_pole_residue(s: np.ndarray, poles, residues, d, e) -> np.ndarray:
+    """计算极点-留数模型在 s 处的响应"""
+    s = np.asarray(s)
+    return (residues[None, :] / (s[:, None] - poles[None, :])).sum(axis=1) + d + e * s
+
+
+class ImpedanceSurrogate:
+    """馈电输入阻抗的有理函数代理模型
+
+    用少量精确求解的频点拟合低阶极点-留数模型，并用留出的验证频点检查误差。
+    拟合可信时几乎零成本地给出任意频点密度下的 Zin/Γ；不可信时
+    （误差超限或频点超出拟合频带）自动回退到精确求解。
+    """
+
+    def __init__(self, exact_solver: Callable[[np.ndarray], np.ndarray], load_impedance: complex = 50.0,
+                 tolerance: float = 1e-2, min_order: int = 2, max_order: int = 40, iterations: int = 10):
+        """
+        参数：
+            exact_solver: 可调用对象，输入频率数组（GHz），返回 (频率数, 馈电数) 的输入阻抗
+            load_impedance: 计算反射系数的参考阻抗
+            tolerance: 留出点上允许的最大 |ΔΓ|
+            min_order / max_order: 逐步尝试的极点阶数范围
+            iterations: 每次拟合的极点重定位迭代次数
+        """
+        self.exact_solver = exact_solver
+        self.load_impedance = load_impedance
+        self.tolerance = tolerance
+        self.min_order = min_order
+        self.max_order = max_order
+        self.iterations = iterations
+
+        self.band = None          # (起始频率, 终止频率) GHz
+        self.models = []          # 每个馈电一个 (poles, residues, d, e)，拟合失败为 None
+        self.errors = []          # 每个馈电在留出点上的最大 |ΔΓ|
+        self.orders = []          # 每个馈电最终采用的阶数
+        self.exact_solve_count = 0
+
+    @classmethod
+    def from_calculator(cls, calculator, **kwargs):
+        """使用 AntSimCalculator 的精确求解构建代理模型"""
+        kwargs.setdefault('load_impedance', calculator.load_impedance)
+        return cls(calculator.calculate_feed_impedance, **kwargs)
+
+    def _normalize(self, frequencies_ghz):
+        """把频率映射到 [-1, 1] 后作为虚轴上的复频率"""
+        start, stop = self.band
+        center = (start + stop) / 2
+        half_span = (stop - start) / 2 if stop > start else 1.0
+        return 1j * (np.asarray(frequencies_ghz, dtype=float) - center) / half_span
+
+    def _reflection(self, impedance):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return (impedance - self.load_impedance) / (impedance + self.load_impedance)
+
+    def _solve_exact(self, frequencies_ghz):
+        self.exact_solve_count += len(frequencies_ghz)
+        return np.asarray(self.exact_solver(np.asarray(frequencies_ghz, dtype=float)), dtype=complex)
+
+    def fit(self, start_ghz: float, stop_ghz: float, sample_count: int = 81) -> bool:
+        """在 [start_ghz, stop_ghz] 上精确求解 sample_count 个频点并拟合
+
+        偶数序号的频点用于拟合，奇数序号的频点留作验证；阶数从 min_order
+        逐步增加，直到验证误差低于 tolerance。选定阶数后用全部频点重新拟合。
+
+        返回：
+            bool：是否所有馈电的拟合都可信
+        """
+        self.band = (float(start_ghz), float(stop_ghz))
+        sample_count = max(int(sample_count), 5)
+        frequencies = np.linspace(start_ghz, stop_ghz, sample_count)
+        impedances = self._solve_exact(frequencies)
+        if impedances.ndim == 1:
+            impedances = impedances[:, None]
+
+        s = self._normalize(frequencies)
+        train = np.arange(sample_count) % 2 == 0
+        holdout = ~train
+        # 阶数不能超过拟合点数可支撑的范围
+        max_order = min(self.max_order, (int(train.sum()) - 2) // 2)
+
+        self.models, self.errors, self.orders = [], [], []
+        for column in range(impedances.shape[1]):
+            z = impedances[:, column]
+            if not np.all(np.isfinite(z)):
+                print(f"馈电 {column} 的精确解包含无效值，无法拟合代理模型。")
+                self.models.append(None)
+                self.errors.append(np.inf)
+                self.orders.append(0)
+                continue
+
+            best = (np.inf, None)
+            for order in range(self.min_order, max_order + 1, 2):
+                model = vector_fit(s[train], z[train], order, self.iterations)
+                z_check = evaluate_pole_residue(s[holdout], *model)
+                error = np.max(np.abs(self._reflection(z_check) - self._reflection(z[holdout])))
+                if error < best[0]:
+                    best = (error, order)
+                if error <= self.tolerance:
+                    break
+
+            error, order = best
+            if order is None:
+                self.models.append(None)
+            else:
+                self.models.append(vector_fit(s, z, order, self.iterations))
+            self.errors.append(error)
+            self.orders.append(order or 0)
+            print(f"馈电 {column} 代理模型：阶数 {order}，验证误差 |ΔΓ|max = {error:.3g}")
+
+        return self.is_trustworthy()
+
+    def is_trustworthy(self, feed: Optional[int] = None) -> bool:
+        """拟合是否可信（验证误差不超过 tolerance）"""
+        if not self.models:
+            return False
+        feeds = range(len(self.models)) if feed is None else [feed]
+        return all(self.models[i] is not None and self.errors[i] <= self.tolerance for i in feeds)
+
+    def report(self) -> List[dict]:
+        """返回每个馈电的拟合信息"""
+        return [
+            {'馈电': i, '阶数': self.orders[i], '验证误差': self.errors[i], '可信': self.is_trustworthy(i)}
+            for i in range(len(self.models))
+        ]
+
+    def predict_impedance(self, frequencies_ghz) -> np.ndarray:
+        """直接用代理模型计算输入阻抗 (频率数, 馈电数)，不做可信度检查"""
+        frequencies_ghz = np.atleast_1d(np.asarray(frequencies_ghz, dtype=float))
+        result = np.full((len(frequencies_ghz), len(self.models)), np.nan + 0j, dtype=complex)
+        if self.band is None:
+            return result
+        s = self._normalize(frequencies_ghz)
+        for column, model in enumerate(self.models):
+            if model is not None:
+                result[:, column] = evaluate_pole_residue(s, *model)
+        return result
+
+    def impedance(self, frequencies_ghz) -> np.ndarray:
+        """计算输入阻抗：可信且在拟合频带内的频点用代理模型，其余频点精确求解"""
+        frequencies_ghz = np.atleast_1d(np.asarray(frequencies_ghz, dtype=float))
+        if not self.is_trustworthy():
+            print("代理模型不可信，改用精确求解。")
+            return self._solve_exact(frequencies_ghz)
+
+        result = self.predict_impedance(frequencies_ghz)
+        start, stop = self.band
+        outside = (frequencies_ghz < start) | (frequencies_ghz > stop)
+        if np.any(outside):
+            print(f"{int(outside.sum())} 个频点超出代理模型频带，改用精确求解。")
+            result[outside] = self._solve_exact(frequencies_ghz[outside])
+        return result
+
+    def reflection_coefficient(self, frequencies_ghz) -> np.ndarray:
+        """计算反射系数 Γ，规则同 impedance()"""
+        return self._reflection(self.impedance(frequencies_ghz))
@@ -0,0 +1,141 @@
+from collections import OrderedDict
+
+import numpy as np
+
+import solver_backends
+from solver_kernel import BatchedFeedSolver, reflection_coefficient
+
+
+class LazySweepResult:
+    """按需计算的频率扫描结果
+
+    馈电输入阻抗和反射系数在创建时对全部频点计算（代价只与元件数有关）；
+    某个频点的电压/电流分布在第一次被请求时才求解，并保存在容量为 cache_size（频点数）的 LRU 缓存中，
+    内存和计算量只与实际查看的频点数有关。
+    电压/电流按单位馈电电流归一化，形状 (网格数, 馈电数)，与批量求解后端一致。
+    """
+
+    def __init__(self, kernel: BatchedFeedSolver, backend: str = 'auto', cache_size: int = 8,
+                 chunk_size: int = 64, progress=None, input_impedance=None):
+        """
+        参数：
+            kernel: 全部扫描频点的 BatchedFeedSolver
+            backend: 求解后端名称，'auto' 时按问题规模选择
+            cache_size: 缓存的频点分布个数
+            chunk_size / progress: 计算输入阻抗时的分块大小和进度回调，见 solver_backends.solve_chunked
+            input_impedance: 已知的输入阻抗 (频率数, 馈电数)（如来自结果缓存），给出时不再求解
+        """
+        self.kernel = kernel
+        self.backend = backend
+        self.cache_size = max(1, int(cache_size))
+        self._sections = kernel.nominal_sections() # 元件只解析一次，按需求解时按频率切片复用
+        self._cache = OrderedDict() # {频点序号: (电压, 电流)}
+        if input_impedance is not None:
+            self.impedance_backend = 'cache'
+            self.input_impedance = np.asarray(input_impedance, dtype=complex)
+        else:
+            self.impedance_backend, result = solver_backends.solve_chunked(kernel, ('impedance',), backend,
+                                                                           chunk_size, progress)
+            self.input_impedance = result.get('impedance', np.zeros((0, len(kernel.feed_rows)), dtype=complex))
+        self.reflection_coefficient = reflection_coefficient(self.input_impedance, kernel.load_impedance)
+        self.last_backend = self.impedance_backend
+        self.voltage = LazyDistribution(self, 0)
+        self.current = LazyDistribution(self, 1)
+
+    @property
+    def frequencies_ghz(self) -> np.ndarray:
+        return self.kernel.frequencies_ghz
+
+    @property
+    def shape(self):
+        """电压/电流分布整体的形状 (频率数, 网格数, 馈电数)"""
+        return len(self.frequencies_ghz), self.kernel.num_grids, len(self.kernel.feed_rows)
+
+    def index_of(self, frequency_ghz: float) -> int:
+        """离给定频率（GHz）最近的频点序号"""
+        return int(np.argmin(np.abs(self.frequencies_ghz - frequency_ghz)))
+
+    def cached_indices(self):
+        return list(self._cache)
+
+    def distributions(self, indices):
+        """返回给定频点的 (电压, 电流)，形状 (len(indices), 网格数, 馈电数)；未缓存的频点一次批量求解"""
+        indices = [int(index) for index in np.atleast_1d(indices)]
+        num_freqs = len(self.frequencies_ghz)
+        for index in indices:
+            if not -num_freqs <= index < num_freqs:
+                raise IndexError(f"频点序号 {index} 超出范围（共 {num_freqs} 个频点）")
+        indices = [index % num_freqs for index in indices]
+        missing = sorted(set(index for index in indices if index not in self._cache))
+        fresh = self._solve(missing) if missing else {}
+        voltage = np.empty((len(indices),) + self.shape[1:], dtype=complex)
+        current = np.empty_like(voltage)
+        for k, index in enumerate(indices):
+            voltage[k], current[k] = fresh[index] if index in fresh else self._cache[index]
+        # 更新缓存：本次用到的频点移到最近端，超出容量时淘汰最久未用的
+        for index in indices:
+            if index in fresh:
+                self._cache[index] = fresh[index]
+            self._cache.move_to_end(index)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return voltage, current
+
+    def distribution(self, index: int):
+        """单个频点的 (电压, 电流)，形状 (网格数, 馈电数)"""
+        voltage, current = self.distributions([index])
+        return voltage[0], current[0]
+
+    def distribution_at(self, frequency_ghz: float):
+        """离给定频率最近的频点的 (电压, 电流)"""
+        return self.distribution(self.index_of(frequency_ghz))
+
+    def _solve(self, indices):
+        """批量求解给定频点的分布，返回 {频点序号: (电压, 电流)}"""
+        kernel = self.kernel
+        chunk_sections = {row: None if abcd is None else abcd[indices] for row, abcd in self._sections.items()}
+        chunk_kernel = BatchedFeedSolver(kernel.frequencies_ghz[indices], kernel.num_grids, kernel.rlgc_per_step,
+                                         kernel.table, kernel.load_impedance, chunk_sections)
+        backend = 'auto' if self.backend == 'closed_form' else self.backend
+        self.last_backend, result = solver_backends.solve(chunk_kernel, ('voltage', 'current'), backend)
+        return {index: (result['voltage'][k], result['current'][k]) for k, index in enumerate(indices)}
+
+
+class LazyDistribution:
+    """LazySweepResult 的电压或电流分布视图，按 (频率, 网格, 馈电) 索引时只求解用到的频点
+
+    例如 view[i]、view[i, :, 0]、view[[0, 10, 20]]；np.asarray(view) 会求解全部频点。
+    """
+
+    def __init__(self, result: LazySweepResult, component: int):
+        self._result = result
+        self._component = component
+
+    @property
+    def shape(self):
+        return self._result.shape
+
+    @property
+    def ndim(self):
+        return 3
+
+    @property
+    def dtype(self):
+        return np.dtype(complex)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            key = (key,)
+        frequency_key, rest = key[0], key[1:]
+        indices = np.arange(self.shape[0])[frequency_key]
+        values = self._result.distributions(np.atleast_1d(indices))[self._component]
+        if np.ndim(indices) == 0:
+            values = values[0]
+        return values[(slice(None),) * (np.ndim(indices) > 0) + rest] if rest else values
+
+    def __array__(self, dtype=None, copy=None):
+        values = self._result.distributions(np.arange(self.shape[0]))[self._component]
+        return values if dtype is None else values.astype(dtype)
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# 各模块以扁平的绝对导入互相引用，测试从 AntSim 目录导入
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from multiport import MultiportSolver
+from solver_kernel import BatchedFeedSolver
+
+FREQUENCIES_GHZ = np.array([1.0, 2.0, 3.0])
+NUM_GRIDS = 301
+STEP = 5e-5
+RLGC_PER_STEP = (200 * STEP, 1.3736e-6 * STEP, 0.0, 3.434e-11 * STEP)
+
+
+def make_solver(feed_indices):
+    """在 feed_indices 上放置馈电（奇数列带 P(20o) 匹配网络），另加一个串联元件"""
+    rows = [{'类型': '馈电', '索引': index, '值': 'P(20o)' if column % 2 else ''}
+            for column, index in enumerate(feed_indices)]
+    rows.append({'类型': '元件', '索引': 200, '值': 'S(2p+3n)'})
+    return BatchedFeedSolver(FREQUENCIES_GHZ, NUM_GRIDS, RLGC_PER_STEP, rows, 50.0)
+
+
+@pytest.mark.parametrize('feed_indices', [
+    (50, 150, 250),       # 互不相同的馈电
+    (0, 150),             # 接地的首节点
+    (NUM_GRIDS - 1, 100), # 接地的末节点
+    (150, 150),           # 同一索引上的两个馈电
+    (150, 0, 150, 60),    # 接地、重合和普通端口混合
+    (150, 99999),         # 索引超出网格的馈电
+])
+def test_embedded_impedance_matches_single_feed_solver(feed_indices):
+    """其余端口接各自负载时的输入阻抗与单馈电求解一致（接地端口为 0，无效端口为 NaN）"""
+    solver = make_solver(feed_indices)
+    expected = solver.feed_impedance()
+    embedded = MultiportSolver(solver).solve().embedded_impedance()
+    assert np.array_equal(np.isnan(embedded), np.isnan(expected))
+    finite = np.isfinite(expected)
+    np.testing.assert_allclose(embedded[finite], expected[finite], rtol=1e-8, atol=1e-8)
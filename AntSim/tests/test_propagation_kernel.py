@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+
+import propagation_kernel
+from antsim_calculator import AntSimCalculator
+from propagation_kernel import CompiledKernelSolver, shooting_recurrence
+from solver_kernel import BatchedFeedSolver
+
+FREQUENCIES_GHZ = np.array([1.0, 2.5, 4.0])
+FEED_INDICES = (0, 7, 25, 40)
+
+
+class GridData:
+    """计算器所需的最小数据源：41 个网格、两端和中间各有馈电，另有串联和并联元件"""
+    num_grids = 41
+    step = 5e-4
+
+    def __init__(self):
+        self.antenna_elements_data = [
+            {'类型': '馈电', '索引': FEED_INDICES[0], '值': ''},
+            {'类型': '馈电', '索引': FEED_INDICES[1], '值': 'P(20o)'},
+            {'类型': '元件', '索引': 12, '值': 'S(2p+3n)'},
+            {'类型': '馈电', '索引': FEED_INDICES[2], '值': ''},
+            {'类型': '元件', '索引': 31, '值': 'P(100o/5n)'},
+            {'类型': '馈电', '索引': FEED_INDICES[3], '值': 'S(10o)'},
+        ]
+
+    def get_grid_array(self):
+        return np.arange(self.num_grids) * self.step
+
+    def get_grid_step(self):
+        return self.step
+
+    def get_unit_rlgc_per_step(self):
+        return 200 * self.step, 1.3736e-6 * self.step, 1e-4 * self.step, 3.434e-11 * self.step
+
+    def get_freq_array(self):
+        return FREQUENCIES_GHZ * 1e9
+
+    def get_freq_array_ghz(self):
+        return FREQUENCIES_GHZ
+
+
+@pytest.fixture(scope='module')
+def data():
+    return GridData()
+
+
+@pytest.fixture(scope='module')
+def reference(data):
+    """计算器逐频点打靶法的结果 (电压, 电流, 输入阻抗)，形状 (F, 网格数, 馈电数) / (F, 馈电数)，左端电流为 1"""
+    calculator = AntSimCalculator(data)
+    voltage, current, impedance = [], [], []
+    for frequency in FREQUENCIES_GHZ:
+        V, I, Z = calculator._solve_frequency(frequency)
+        voltage.append(np.array(V).T)
+        current.append(np.array(I).T)
+        impedance.append(np.array(Z))
+    return np.array(voltage), np.array(current), np.array(impedance)
+
+
+@pytest.fixture(scope='module')
+def matrices(data):
+    solver = BatchedFeedSolver.from_data_source(data, FREQUENCIES_GHZ)
+    return solver.node_matrices(solver.section_matrices()).transpose(1, 0, 2, 3)
+
+
+def assert_close(actual, expected, rtol=1e-9):
+    """按数组整体量级比较，避免接近 0 的个别元素放大相对误差"""
+    scale = np.max(np.abs(expected))
+    np.testing.assert_allclose(actual, expected, rtol=0, atol=rtol * scale)
+
+
+@pytest.mark.parametrize('backend', ['numpy', 'numba'])
+def test_recurrence_matches_calculator(backend, matrices, reference):
+    """shooting_recurrence 的电压、电流、输入阻抗与计算器的打靶法一致（同为左端单位电流归一化）
+
+    末节点上的馈电节点电流除外：打靶法在两侧电流之和中计入了边界的初始电流，
+    各批量后端（节点导纳法、缩放传播）在两端都保留单侧电流，此处与它们一致。
+    """
+    if backend == 'numba':
+        pytest.importorskip('numba')
+    voltage, current, impedance, _ = shooting_recurrence(matrices, FEED_INDICES, backend)
+    assert_close(impedance, reference[2])
+    assert_close(voltage, reference[0])
+    last = FEED_INDICES.index(GridData.num_grids - 1)
+    mask = np.ones(current.shape, dtype=bool)
+    mask[:, -1, last] = False
+    assert_close(current[mask], reference[1][mask])
+
+
+@pytest.mark.parametrize('backend', ['numpy', 'numba'])
+def test_compiled_solver_matches_calculator(backend, data, reference):
+    """CompiledKernelSolver（单位馈电电流归一化）与计算器结果换算到单位馈电电流后一致
+
+    两端的馈电节点接地（输入阻抗为 0），馈电电流 V/Zin 无定义，分布只比较中间的馈电。
+    """
+    if backend == 'numba':
+        pytest.importorskip('numba')
+    solver = CompiledKernelSolver(BatchedFeedSolver.from_data_source(data, FREQUENCIES_GHZ), backend)
+    voltage, current, impedance = solver.solve(chunk_size=2)
+    ref_voltage, ref_current, ref_impedance = reference
+    assert_close(impedance, ref_impedance)
+    interior = [1, 2]
+    feed_current = ref_voltage[:, [FEED_INDICES[p] for p in interior], interior] / ref_impedance[:, interior]
+    assert_close(voltage[..., interior], ref_voltage[..., interior] / feed_current[:, None, :])
+    assert_close(current[..., interior], ref_current[..., interior] / feed_current[:, None, :])
+
+
+def test_backends_agree_with_direct_cascade():
+    """check_equivalence：各可用后端与 numpy 参考一致，参考阻抗与直接级联一致"""
+    differences = propagation_kernel.check_equivalence()
+    assert set(differences) == {'direct'} | set(propagation_kernel.available_backends())
@@ -0,0 +1,168 @@
+import numpy as np
+
+WINDOWS = ('hann', 'hamming', 'blackman', 'kaiser', 'rect')
+
+
+def is_uniform_frequency(frequencies: np.ndarray, rtol: float = 1e-6) -> bool:
+    """判断频率数组是否等间距递增"""
+    if len(frequencies) < 2:
+        return False
+    steps = np.diff(frequencies)
+    return bool(steps[0] > 0 and np.allclose(steps, steps[0], rtol=rtol, atol=0))
+
+
+def resample_uniform(frequencies: np.ndarray, values: np.ndarray, num_points: int = None):
+    """把 values（第 0 维为频率）线性插值到同一频段内等间距的 num_points 个频点，返回 (新频率, 新数值)"""
+    order = np.argsort(frequencies)
+    frequencies = np.asarray(frequencies)[order]
+    values = np.asarray(values)[order]
+    uniform = np.linspace(frequencies[0], frequencies[-1], num_points or len(frequencies))
+    flat = values.reshape(len(frequencies), -1)
+    resampled = np.empty((len(uniform), flat.shape[1]), dtype=complex)
+    for column in range(flat.shape[1]):
+        resampled[:, column] = (np.interp(uniform, frequencies, flat[:, column].real)
+                                + 1j * np.interp(uniform, frequencies, flat[:, column].imag))
+    return uniform, resampled.reshape((len(uniform),) + values.shape[1:])
+
+
+def frequency_window(name: str, size: int, beta: float = 6.0) -> np.ndarray:
+    """频域窗函数"""
+    if name == 'hann':
+        return np.hanning(size)
+    if name == 'hamming':
+        return np.hamming(size)
+    if name == 'blackman':
+        return np.blackman(size)
+    if name == 'kaiser':
+        return np.kaiser(size, beta)
+    if name == 'rect':
+        return np.ones(size)
+    raise ValueError(f"未知的窗函数: {name}")
+
+
+class TimeDomainAnalysis:
+    """时域反射/传输（TDR/TDT）分析
+
+    对等间距的频率扫描做带通冲激响应：加窗、补零后沿频率维批量逆 FFT，
+    馈电反射系数得到 TDR，各节点电流（相对单位馈电电流）得到由馈电到该节点的 TDT。
+    响应已按窗函数归一化：时延 τ 处幅度为 |Γ| 的单个反射，在 t = τ 处的幅度为 |Γ|。
+    时间分辨率约为 1 / 扫描带宽，补零只让曲线更平滑。
+    频率不等间距时抛出 ValueError，resample=True 时先线性插值到等间距频点。
+
+    属性（T 为时间点数，K 为选取的节点数，P 为馈电数）：
+        frequencies_ghz: 实际使用的频率（重采样后）
+        time: (T,) 时间（s）
+        tdr: (T, P) 复数反射冲激响应
+        tdt: (T, K, P) 复数节点冲激响应，未给出电流时为 None
+        node_indices: tdt 对应的节点序号
+        velocity: 传输线相速度（m/s），给出时可换算距离
+    """
+
+    def __init__(self, frequencies_ghz, reflection, current=None, window: str = 'hann', pad_factor: int = 4,
+                 resample: bool = False, velocity: float = None, node_indices=None,
+                 max_elements: int = 20_000_000, chunk_size: int = 32):
+        """
+        参数：
+            frequencies_ghz: (F,) 扫描频率（GHz）
+            reflection: (F, P) 馈电反射系数
+            current: (F, N, P) 节点电流，可为 LazySweepResult 的视图（按频率分块读取）
+            window: 窗函数，见 WINDOWS
+            pad_factor: 补零倍数（逆 FFT 长度为不小于 F·pad_factor 的 2 的幂）
+            resample: 频率不等间距时是否插值到等间距
+            velocity: 相速度（m/s），用于换算距离
+            node_indices: TDT 的节点序号，默认在 max_elements 限制内等间隔选取
+            chunk_size: 读取电流时每块的频点数
+        """
+        frequencies = np.atleast_1d(np.asarray(frequencies_ghz, dtype=float))
+        reflection = np.asarray(reflection, dtype=complex)
+        if reflection.ndim == 1:
+            reflection = reflection[:, None]
+        if len(frequencies) < 2:
+            raise ValueError("时域分析至少需要两个频点")
+        if len(reflection) != len(frequencies):
+            raise ValueError(f"反射系数的频点数 {len(reflection)} 与频率数 {len(frequencies)} 不一致")
+        uniform = is_uniform_frequency(frequencies)
+        if not uniform and not resample:
+            raise ValueError("频率扫描不是等间距的，不能直接做逆 FFT；可设置 resample=True 插值到等间距频点")
+
+        self.window = window
+        self.velocity = velocity
+        num_freqs = len(frequencies)
+        fft_size = 1 << int(np.ceil(np.log2(num_freqs * max(1, int(pad_factor)))))
+
+        # TDT 的节点：限制 时间点数 × 节点数 × 馈电数 的规模
+        if current is not None:
+            num_grids, num_feeds = current.shape[1], current.shape[2]
+            if node_indices is None:
+                max_nodes = max(1, max_elements // (fft_size * num_feeds))
+                node_indices = np.unique(np.linspace(0, num_grids - 1, min(num_grids, max_nodes)).round().astype(int))
+            node_indices = np.asarray(node_indices, dtype=int)
+            current = np.concatenate([np.asarray(current[start:start + chunk_size])[:, node_indices]
+                                      for start in range(0, num_freqs, chunk_size)])
+        self.node_indices = node_indices
+
+        if not uniform:
+            _, reflection = resample_uniform(frequencies, reflection)
+            if current is not None:
+                _, current = resample_uniform(frequencies, current)
+            frequencies = np.linspace(frequencies.min(), frequencies.max(), num_freqs)
+        self.frequencies_ghz = frequencies
+
+        step_hz = (frequencies[1] - frequencies[0]) * 1e9
+        self.time = np.arange(fft_size) / (fft_size * step_hz)
+        weights = frequency_window(window, num_freqs)
+        self.tdr = self._impulse(reflection, weights, fft_size)
+        self.tdt = None if current is None else self._impulse(current, weights, fft_size)
+
+    @staticmethod
+    def _impulse(values: np.ndarray, weights: np.ndarray, fft_size: int) -> np.ndarray:
+        """沿第 0 维加窗、补零并批量逆 FFT，按窗函数之和归一化"""
+        shape = (len(weights),) + (1,) * (values.ndim - 1)
+        return np.fft.ifft(values * weights.reshape(shape), n=fft_size, axis=0) * fft_size / np.sum(weights)
+
+    @classmethod
+    def from_calculator(cls, calculator, include_current: bool = True, **options):
+        """从计算器的频率扫描结果构建，无扫描结果时返回 None；相速度由单位网格 L、C 求得"""
+        if calculator.reflection_coefficient_array is None:
+            return None
+        data_source = calculator.data_source
+        if options.get('velocity') is None:
+            _, inductance, _, capacitance = data_source.get_unit_rlgc_per_step()
+            if inductance > 0 and capacitance > 0 and data_source.get_grid_step() > 0:
+                options['velocity'] = data_source.get_grid_step() / np.sqrt(inductance * capacitance)
+        current = calculator.sweep_current_matrix if include_current else None
+        return cls(data_source.get_freq_array_ghz(), calculator.reflection_coefficient_array, current, **options)
+
+    @property
+    def unambiguous_time(self) -> float:
+        """不混叠的最大时间（s），即 1 / 频率步进"""
+        return self.time[-1] + self.time[1]
+
+    def distance(self, round_trip: bool = True):
+        """时间轴换算的距离（m）：TDR 为往返（除以 2），TDT 为单程；未知相速度时返回 None"""
+        if self.velocity is None:
+            return None
+        return self.velocity * self.time / (2 if round_trip else 1)
+
+    def tdr_db(self, feed: int = 0, floor_db: float = -80.0) -> np.ndarray:
+        with np.errstate(divide='ignore'):
+            return np.maximum(20 * np.log10(np.abs(self.tdr[:, feed])), floor_db)
+
+    def tdt_db(self, feed: int = 0, floor_db: float = -80.0):
+        if self.tdt is None:
+            return None
+        with np.errstate(divide='ignore'):
+            return np.maximum(20 * np.log10(np.abs(self.tdt[:, :, feed])), floor_db)
+
+    def find_reflections(self, feed: int = 0, threshold_db: float = -40.0, max_count: int = 10):
+        """TDR 前半段（后半段为负时间的混叠）中高于 threshold_db 的局部峰，
+        按幅度从大到小返回 [(时间 s, 距离 m 或 None, 幅度)]"""
+        magnitude = np.abs(self.tdr[:len(self.time) // 2, feed])
+        threshold = 10 ** (threshold_db / 20)
+        padded = np.concatenate([[-np.inf], magnitude, [-np.inf]])
+        inner = padded[1:-1]
+        peaks = np.nonzero((inner >= padded[:-2]) & (inner > padded[2:]) & (inner >= threshold))[0]
+        peaks = peaks[np.argsort(magnitude[peaks])[::-1]][:max_count]
+        distance = self.distance(round_trip=True)
+        return [(float(self.time[i]), None if distance is None else float(distance[i]), float(magnitude[i]))
+                for i in peaks]
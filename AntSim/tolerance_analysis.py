@@ -0,0 +1,156 @@
+import numpy as np
+from typing import Dict, Optional, Sequence, Tuple, Union
+
+from circuit import circuit_leaf_values
+from solver_kernel import BatchedFeedSolver
+
+
+class ToleranceResult:
+    """蒙特卡洛容差分析结果
+
+    属性：
+        frequencies_ghz: 频率数组 (F,)
+        samples: 实际样本数
+        nominal: 标称取值下的 |Γ|，形状 (F, 馈电数)
+        feeds: 参与统计的馈电列号；标称 |Γ| 含非有限值的馈电（如索引超出网格）无法求解，不参与统计和良率
+        dropped_feeds: 被排除的馈电列号
+        mean / std: 样本 |Γ| 的均值和标准差，形状 (F, len(feeds))
+        percentiles: {百分位: (F, len(feeds))}
+        worst: 样本中的最大 |Γ|，形状 (F, len(feeds))
+        mask: 展开到各频点的 |Γ| 上限 (F,)
+        passed: 每个样本是否满足模板 (S,)
+        yield_fraction: 良率（满足模板的样本比例）
+    """
+
+    def __init__(self, frequencies_ghz, nominal, magnitudes, mask, percentiles=(5, 50, 95)):
+        self.frequencies_ghz = frequencies_ghz
+        self.samples = magnitudes.shape[0]
+        self.nominal = nominal
+        solvable = np.all(np.isfinite(nominal), axis=0)
+        self.feeds = np.flatnonzero(solvable)
+        self.dropped_feeds = np.flatnonzero(~solvable)
+        magnitudes = magnitudes[..., self.feeds]
+        # 可求解的馈电个别样本仍得到非有限值时按全反射计（与 optimizer.band_objective 一致）
+        magnitudes = np.where(np.isfinite(magnitudes), magnitudes, 1.0)
+        self.mean = magnitudes.mean(axis=0)
+        self.std = magnitudes.std(axis=0)
+        self.percentiles = {p: np.percentile(magnitudes, p, axis=0) for p in percentiles}
+        self.worst = magnitudes.max(axis=0)
+        self.mask = mask
+        self.passed = np.all(magnitudes <= mask[None, :, None], axis=(1, 2)) & (len(self.feeds) > 0)
+        self.yield_fraction = float(self.passed.mean()) if self.samples else 0.0
+
+    def summary(self) -> str:
+        """用于打印的简要结果"""
+        if not len(self.feeds):
+            return f"样本数 {self.samples}，没有可求解的馈电"
+        text = (f"样本数 {self.samples}，良率 {self.yield_fraction * 100:.1f}%，"
+                f"最大 |Γ| 标称 {self.nominal[:, self.feeds].max():.4f} / 样本最坏 {self.worst.max():.4f}")
+        if len(self.dropped_feeds):
+            text += f"；馈电 {', '.join(str(feed + 1) for feed in self.dropped_feeds)} 无法求解，未计入统计和良率"
+        return text
+
+
+class ToleranceAnalysis:
+    """元件容差的蒙特卡洛分析
+
+    按各元件数值（p/n/o）的分布抽样，把全部样本作为一个批量维度一次送入
+    BatchedFeedSolver 的 ABCD 流程，统计 |Γ| 并计算相对 |Γ| 模板的良率。
+    """
+
+    DISTRIBUTIONS = ('uniform', 'normal')
+
+    def __init__(self, solver: BatchedFeedSolver, default_tolerance: float = 0.05,
+                 default_distribution: str = 'uniform',
+                 tolerances: Optional[Dict[Tuple[int, int], Tuple[float, str]]] = None,
+                 rows: Optional[Sequence[int]] = None):
+        """
+        参数：
+            solver: BatchedFeedSolver，批量求解内核
+            default_tolerance: 默认相对容差（0.05 表示 ±5%）
+            default_distribution: 'uniform'（在 ±容差内均匀）或 'normal'（容差为 3σ）
+            tolerances: 单独指定的容差 {(行号, 数值序号): (相对容差, 分布)}
+            rows: 参与抽样的行号，默认全部行（元件和馈电）
+        """
+        self.solver = solver
+        rows = range(len(solver.antenna_elements)) if rows is None else rows
+        tolerances = tolerances or {}
+
+        # 每个参与抽样的数值: (行号, 数值序号, 标称值, 相对容差, 分布)
+        self.components = []
+        self._nominal_leaves = {}
+        for row in rows:
+            leaves = circuit_leaf_values(solver.antenna_elements[row].get('值', ''))
+            if not leaves:
+                continue
+            self._nominal_leaves[row] = np.array([value for value, _ in leaves], dtype=float)
+            for leaf, (value, _) in enumerate(leaves):
+                tolerance, distribution = tolerances.get((row, leaf), (default_tolerance, default_distribution))
+                if distribution not in self.DISTRIBUTIONS:
+                    raise ValueError(f"未知的分布类型: {distribution}")
+                self.components.append((row, leaf, value, float(tolerance), distribution))
+
+    @classmethod
+    def from_calculator(cls, calculator, frequencies_ghz=None, **kwargs):
+        """用 AntSimCalculator 的数据源构建分析，默认使用完整扫描频带"""
+        solver = BatchedFeedSolver.from_data_source(calculator.data_source, frequencies_ghz,
+                                                    calculator.load_impedance)
+        return cls(solver, **kwargs)
+
+    def sample(self, count: int, rng: np.random.Generator) -> Dict[int, np.ndarray]:
+        """抽取 count 组样本，返回 {行号: (count, 数值个数)}"""
+        overrides = {row: np.tile(values, (count, 1)) for row, values in self._nominal_leaves.items()}
+        for row, leaf, value, tolerance, distribution in self.components:
+            if distribution == 'uniform':
+                factor = rng.uniform(1 - tolerance, 1 + tolerance, count)
+            else:
+                factor = rng.normal(1.0, tolerance / 3, count)
+            # 元件数值必须为正
+            overrides[row][:, leaf] = np.maximum(value * factor, value * 1e-6)
+        return overrides
+
+    def _expand_mask(self, mask) -> np.ndarray:
+        """把模板展开为各频点的 |Γ| 上限
+
+        mask 可以是标量、长度为频点数的数组，或 [(起始GHz, 终止GHz, 上限)] 分段列表
+        （分段之外的频点不作要求）。
+        """
+        frequencies = self.solver.frequencies_ghz
+        if mask is None:
+            return np.full(frequencies.shape, np.inf)
+        if np.isscalar(mask):
+            return np.full(frequencies.shape, float(mask))
+        mask_array = np.asarray(mask, dtype=float)
+        if mask_array.ndim == 1 and mask_array.shape == frequencies.shape:
+            return mask_array
+        if mask_array.ndim == 2 and mask_array.shape[1] == 3:
+            limit = np.full(frequencies.shape, np.inf)
+            for start, stop, value in mask_array:
+                in_band = (frequencies >= start) & (frequencies <= stop)
+                limit[in_band] = np.minimum(limit[in_band], value)
+            return limit
+        raise ValueError("无法识别的 |Γ| 模板格式")
+
+    def run(self, sample_count: int = 2000, mask: Union[float, Sequence, None] = None,
+            seed: Optional[int] = None, chunk_size: int = 2000) -> ToleranceResult:
+        """执行蒙特卡洛分析
+
+        chunk_size 限制单次批量求解的样本数以控制内存，每块内所有样本一起求解。
+        """
+        if int(sample_count) <= 0:
+            raise ValueError(f"样本数必须为正整数: {sample_count}")
+        rng = np.random.default_rng(seed)
+        magnitudes = []
+        remaining = int(sample_count)
+        while remaining > 0:
+            count = min(remaining, chunk_size)
+            reflection = self.solver.feed_reflection_coefficient(self.sample(count, rng))
+            # 没有可求解的馈电时结果不带样本维度
+            magnitudes.append(np.broadcast_to(np.abs(reflection), (count,) + reflection.shape[-2:]))
+            remaining -= count
+        magnitudes = np.concatenate(magnitudes, axis=0)
+        nominal = np.abs(self.solver.feed_reflection_coefficient())
+
+        result = ToleranceResult(self.solver.frequencies_ghz, nominal, magnitudes, self._expand_mask(mask))
+        print(result.summary())
+        return result
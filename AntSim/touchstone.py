@@ -0,0 +1,297 @@
+import os
+import re
+import numpy as np
+from typing import List
+
+# 元件表达式中引用的 Touchstone 文件名（紧贴在括号内）：S(文件.s1p)、P(文件.s1p)、T(文件.s2p)
+FILE_REFERENCE = re.compile(r'(?<=\()[^()+]*\.[sS](\d+)[pP](?=\))')
+
+FREQUENCY_UNITS = {'hz': 1.0, 'khz': 1e3, 'mhz': 1e6, 'ghz': 1e9}
+DATA_FORMATS = ('RI', 'MA', 'DB')
+
+_search_paths: List[str] = [] # 相对路径的查找目录，之后才查找当前工作目录
+_file_cache = {} # {绝对路径: (修改时间, TouchstoneData)}
+
+
+def is_file_reference(text: str) -> bool:
+    """判断字符串是否为 Touchstone 文件名（扩展名 .sNp）"""
+    return re.fullmatch(r'[^()+]*\.[sS]\d+[pP]', text) is not None
+
+
+def file_reference_spans(text: str):
+    """字符串中所有文件名所占的 [start, end) 区间，数值解析时应跳过"""
+    return [match.span() for match in FILE_REFERENCE.finditer(text)]
+
+
+def port_count_from_path(path: str) -> int:
+    """由扩展名 .sNp 得到端口数，不是 Touchstone 扩展名时返回 0"""
+    match = re.search(r'\.[sS](\d+)[pP]$', path)
+    return int(match.group(1)) if match else 0
+
+
+def add_search_path(directory: str):
+    """添加相对文件名的查找目录（如工程文件所在目录），后添加的优先"""
+    directory = os.path.abspath(directory)
+    if directory in _search_paths:
+        _search_paths.remove(directory)
+    _search_paths.insert(0, directory)
+
+
+def resolve_path(name: str) -> str:
+    """按查找目录、当前工作目录的顺序解析文件名，找不到时抛出 ValueError"""
+    if os.path.isabs(name):
+        candidates = [name]
+    else:
+        candidates = [os.path.join(directory, name) for directory in _search_paths] + [os.path.abspath(name)]
+    for candidate in candidates:
+        if os.path.isfile(candidate):
+            return os.path.abspath(candidate)
+    raise ValueError(f"找不到 Touchstone 文件：{name}")
+
+
+def file_signature(name: str):
+    """引用文件的 (绝对路径, 大小, 修改时间)，代表文件当前的内容；找不到时返回 None"""
+    try:
+        path = resolve_path(name)
+        return (path, os.path.getsize(path), os.path.getmtime(path))
+    except (ValueError, OSError):
+        return None
+
+
+def referenced_files(text: str) -> dict:
+    """字符串中引用的全部文件 {文件名: file_signature}"""
+    return {match.group(0): file_signature(match.group(0)) for match in FILE_REFERENCE.finditer(text)}
+
+
+def load_touchstone(name: str) -> 'TouchstoneData':
+    """读取 Touchstone 文件，按绝对路径和修改时间缓存：文件不变时只解析一次"""
+    path = resolve_path(name)
+    mtime = os.path.getmtime(path)
+    cached = _file_cache.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    data = read_touchstone(path)
+    _file_cache[path] = (mtime, data)
+    return data
+
+
+def clear_cache():
+    _file_cache.clear()
+
+
+def _to_complex(first: np.ndarray, second: np.ndarray, data_format: str) -> np.ndarray:
+    if data_format == 'RI':
+        return first + 1j * second
+    magnitude = 10 ** (first / 20) if data_format == 'DB' else first
+    return magnitude * np.exp(1j * np.radians(second))
+
+
+def _from_complex(values: np.ndarray, data_format: str):
+    if data_format == 'RI':
+        return values.real, values.imag
+    magnitude = np.abs(values)
+    if data_format == 'DB':
+        with np.errstate(divide='ignore'):
+            magnitude = 20 * np.log10(magnitude)
+    return magnitude, np.degrees(np.angle(values))
+
+
+def read_touchstone(path: str) -> 'TouchstoneData':
+    """解析 Touchstone v1 文件（.sNp）
+
+    支持频率单位 Hz/kHz/MHz/GHz，参数 S/Y/Z（Y/Z 为按 R 归一化的值，读入后换算为 S），
+    数据格式 RI/MA/DB；2 端口文件末尾的噪声参数被忽略。
+    """
+    num_ports = port_count_from_path(path)
+    if num_ports < 1:
+        raise ValueError(f"无法由扩展名确定端口数：{path}")
+    unit, parameter, data_format, reference = 'ghz', 'S', 'MA', 50.0
+    values_per_record = 1 + 2 * num_ports * num_ports
+    records = []
+    buffer = []
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                line = line.split('!', 1)[0].strip()
+                if not line:
+                    continue
+                if line.startswith('#'):
+                    tokens = line[1:].split()
+                    i = 0
+                    while i < len(tokens):
+                        token = tokens[i].upper()
+                        if token.lower() in FREQUENCY_UNITS:
+                            unit = token.lower()
+                        elif token in ('S', 'Y', 'Z'):
+                            parameter = token
+                        elif token in DATA_FORMATS:
+                            data_format = token
+                        elif token == 'R' and i + 1 < len(tokens):
+                            reference = float(tokens[i + 1])
+                            i += 1
+                        elif token in ('G', 'H'):
+                            raise ValueError(f"不支持 {token} 参数")
+                        i += 1
+                    continue
+                numbers = [float(token) for token in line.split()]
+                # 2 端口文件的噪声参数：新记录的频率不大于上一个频点
+                if not buffer and records and num_ports == 2 and numbers[0] <= records[-1][0]:
+                    break
+                buffer.extend(numbers)
+                if len(buffer) >= values_per_record:
+                    if len(buffer) > values_per_record:
+                        raise ValueError(f"数据行的数值个数与 {num_ports} 端口不符")
+                    records.append(buffer)
+                    buffer = []
+    except OSError as e:
+        raise ValueError(f"读取 Touchstone 文件失败：{e}")
+    if buffer:
+        raise ValueError("文件末尾的数据记录不完整")
+    if not records:
+        raise ValueError(f"Touchstone 文件中没有数据：{path}")
+
+    table = np.array(records, dtype=float)
+    frequencies_hz = table[:, 0] * FREQUENCY_UNITS[unit]
+    values = _to_complex(table[:, 1::2], table[:, 2::2], data_format).reshape(-1, num_ports, num_ports)
+    if num_ports == 2:
+        values = values.transpose(0, 2, 1) # 2 端口的顺序为 S11 S21 S12 S22
+    if parameter != 'S':
+        identity = np.identity(num_ports)
+        z = values if parameter == 'Z' else np.linalg.inv(values)
+        values = (z - identity) @ np.linalg.inv(z + identity)
+    if np.any(np.diff(frequencies_hz) <= 0):
+        raise ValueError("Touchstone 文件的频率必须严格递增")
+    return TouchstoneData(frequencies_hz, values, reference, path)
+
+
+class TouchstoneData:
+    """Touchstone 文件中的 S 参数，可按频率数组向量化插值
+
+    幅度和（展开后的）相位分别线性插值；超出文件频率范围的频点取边界值并提示一次。
+    最近一次插值的结果按频率数组缓存，同一扫描中多行引用同一文件时不重复计算。
+
+    属性：
+        frequencies_hz: (K,) 文件中的频率（Hz）
+        s: (K, P, P) S 参数
+        reference_impedance: 参考阻抗（Ohm）
+    """
+
+    def __init__(self, frequencies_hz, s: np.ndarray, reference_impedance: float = 50.0, path: str = ''):
+        self.frequencies_hz = np.asarray(frequencies_hz, dtype=float)
+        self.s = np.asarray(s, dtype=complex)
+        self.reference_impedance = float(reference_impedance)
+        self.path = path
+        self._magnitude = np.abs(self.s)
+        self._phase = np.unwrap(np.angle(self.s), axis=0)
+        self._interpolated = None # (频率数组字节, 结果)
+        self._warned = False
+
+    @property
+    def num_ports(self) -> int:
+        return self.s.shape[-1]
+
+    def interpolate(self, frequency_ghz) -> np.ndarray:
+        """插值到给定频率（GHz），返回 (F, P, P)"""
+        frequency_ghz = np.atleast_1d(np.asarray(frequency_ghz, dtype=float))
+        key = frequency_ghz.tobytes()
+        if self._interpolated is not None and self._interpolated[0] == key:
+            return self._interpolated[1]
+        target = frequency_ghz * 1e9
+        known = self.frequencies_hz
+        if len(known) == 1:
+            result = np.broadcast_to(self.s, (len(target),) + self.s.shape[1:]).copy()
+        else:
+            if not self._warned and (target.min() < known[0] * (1 - 1e-9) or target.max() > known[-1] * (1 + 1e-9)):
+                print(f"频率超出 {os.path.basename(self.path)} 的范围 "
+                      f"[{known[0] / 1e9:g}, {known[-1] / 1e9:g}] GHz，超出部分取边界值。")
+                self._warned = True
+            upper = np.clip(np.searchsorted(known, target), 1, len(known) - 1)
+            lower = upper - 1
+            weight = np.clip((target - known[lower]) / (known[upper] - known[lower]), 0.0, 1.0)[:, None, None]
+            magnitude = self._magnitude[lower] * (1 - weight) + self._magnitude[upper] * weight
+            phase = self._phase[lower] * (1 - weight) + self._phase[upper] * weight
+            result = magnitude * np.exp(1j * phase)
+        self._interpolated = (key, result)
+        return result
+
+    def impedance(self, frequency_ghz) -> np.ndarray:
+        """1 端口的输入阻抗 Z = R (1 + S11) / (1 - S11)，形状 (F,)"""
+        if self.num_ports != 1:
+            raise ValueError(f"{os.path.basename(self.path)} 不是 1 端口文件，不能用作阻抗")
+        s11 = self.interpolate(frequency_ghz)[:, 0, 0]
+        return self.reference_impedance * (1 + s11) / (1 - s11)
+
+    def abcd(self, frequency_ghz) -> np.ndarray:
+        """2 端口的 ABCD 矩阵，形状 (F, 2, 2)"""
+        if self.num_ports != 2:
+            raise ValueError(f"{os.path.basename(self.path)} 不是 2 端口文件，不能级联")
+        s = self.interpolate(frequency_ghz)
+        s11, s12, s21, s22 = s[:, 0, 0], s[:, 0, 1], s[:, 1, 0], s[:, 1, 1]
+        z0 = self.reference_impedance
+        result = np.empty(s.shape, dtype=complex)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result[:, 0, 0] = ((1 + s11) * (1 - s22) + s12 * s21) / (2 * s21)
+            result[:, 0, 1] = z0 * ((1 + s11) * (1 + s22) - s12 * s21) / (2 * s21)
+            result[:, 1, 0] = ((1 - s11) * (1 - s22) - s12 * s21) / (2 * s21 * z0)
+            result[:, 1, 1] = ((1 - s11) * (1 + s22) + s12 * s21) / (2 * s21)
+        return result
+
+
+class TouchstoneWriter:
+    """逐块写出 Touchstone v1 文件（频率单位 GHz，S 参数）
+
+    用法：
+        with TouchstoneWriter('antenna.s2p', 2) as writer:
+            writer.write(frequencies_ghz, s)  # 每算完一块频点写一次
+    """
+
+    def __init__(self, path: str, num_ports: int, reference_impedance: float = 50.0, data_format: str = 'RI',
+                 comments=()):
+        data_format = data_format.upper()
+        if data_format not in DATA_FORMATS:
+            raise ValueError(f"未知的数据格式: {data_format}")
+        if port_count_from_path(path) != num_ports:
+            raise ValueError(f"{num_ports} 端口网络的文件扩展名应为 .s{num_ports}p")
+        self.path = path
+        self.num_ports = num_ports
+        self.data_format = data_format
+        self.rows_written = 0
+        self._file = open(path, 'w', encoding='utf-8', newline='\n')
+        for comment in comments:
+            self._file.write(f"! {comment}\n")
+        self._file.write(f"# GHz S {data_format} R {float(np.real(reference_impedance)):g}\n")
+        # 每个频点的行格式：3 端口及以上每行最多 4 对数值，矩阵的每一行另起一行
+        pair = '%.12g %.12g'
+        if num_ports <= 2:
+            self._line_format = '%.12g ' + ' '.join([pair] * num_ports * num_ports) + '\n'
+        else:
+            rows = []
+            for _ in range(num_ports):
+                chunks = [' '.join([pair] * min(4, num_ports - k)) for k in range(0, num_ports, 4)]
+                rows.append('\n'.join(chunks))
+            self._line_format = '%.12g ' + '\n'.join(rows) + '\n'
+
+    def write(self, frequencies_ghz, s: np.ndarray):
+        """写出一块频点，s 形状 (F, P, P)"""
+        frequencies_ghz = np.atleast_1d(np.asarray(frequencies_ghz, dtype=float))
+        s = np.asarray(s, dtype=complex).reshape(len(frequencies_ghz), self.num_ports, self.num_ports)
+        if self.num_ports == 2:
+            s = s.transpose(0, 2, 1)
+        first, second = _from_complex(s.reshape(len(frequencies_ghz), -1), self.data_format)
+        table = np.empty((len(frequencies_ghz), 1 + 2 * first.shape[1]))
+        table[:, 0] = frequencies_ghz
+        table[:, 1::2] = first
+        table[:, 2::2] = second
+        self._file.write(''.join(self._line_format % tuple(row) for row in table))
+        self._file.flush()
+        self.rows_written += len(frequencies_ghz)
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
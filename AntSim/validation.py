@@ -0,0 +1,177 @@
+import re
+from functools import lru_cache
+from typing import List, Tuple
+
+from circuit import CircuitSyntaxError, parse_circuit, tokenize
+from touchstone import is_file_reference, load_touchstone, port_count_from_path
+
+ELEMENT_TYPES = ('馈电', '元件')
+
+
+class Diagnostic:
+    """值字符串的一条诊断：position 为原字符串中的字符位置（从 0 开始），message 为说明"""
+    __slots__ = ('position', 'message')
+
+    def __init__(self, position: int, message: str):
+        self.position = position
+        self.message = message
+
+    def __str__(self):
+        return f"第 {self.position + 1} 个字符：{self.message}"
+
+    def __repr__(self):
+        return f"Diagnostic({self.position}, {self.message!r})"
+
+    def __eq__(self, other):
+        return isinstance(other, Diagnostic) and (self.position, self.message) == (other.position, other.message)
+
+    def __hash__(self):
+        return hash((self.position, self.message))
+
+
+SYNTAX_CACHE_SIZE = 4096 # 语法检查结果缓存的 (类型, 值字符串) 个数，超出时淘汰最久未用的
+
+
+def _zero_impedance(node) -> Tuple[bool, bool]:
+    """返回 (子树阻抗是否在所有频率恒为 0, 是否含有两侧阻抗都为 0 的并联即 0/0)
+
+    0o、0n 的阻抗为 0；串联两侧都为 0、或并联任一侧为 0 时子树阻抗为 0。用显式栈后序遍历。
+    """
+    zero = {}
+    degenerate = False
+    stack = [(node, False)]
+    while stack:
+        current, expanded = stack.pop()
+        if current in zero:
+            continue
+        if current.op == 'leaf':
+            zero[current] = current.value == 0 and current.unit in 'on'
+        elif not expanded:
+            stack.extend(((current, True), (current.right, False), (current.left, False)))
+        else:
+            left, right = zero[current.left], zero[current.right]
+            if current.op == '+':
+                zero[current] = left and right
+            else:
+                zero[current] = left or right
+                degenerate = degenerate or (left and right)
+    return zero[node], degenerate
+
+
+def _check_circuit(text: str, start: int, end: int, term_type: str = 'S') -> List[Tuple[int, str]]:
+    """用 circuit.parse_circuit 检查 text[start:end]，返回 [(位置, 说明)]；语法正确的结果由解析器缓存
+
+    并联项 P(...) 的阻抗恒为 0（如 P(0o)、P(0n)）时 1/Z 无穷大，两侧都为 0 的并联（如 0o/0n）为 0/0，
+    均视为无效，计算时跳过。
+    """
+    inner = text[start:end]
+    try:
+        node = parse_circuit(inner)
+    except CircuitSyntaxError as e:
+        return [(start + e.position, str(e))]
+    tokens = tokenize(inner)
+    problems = [(start + position, "电容值为 0，阻抗无穷大")
+                for kind, content, position in tokens if kind == 'value' and content == (0.0, 'p')]
+    zero, degenerate = _zero_impedance(node)
+    if degenerate or (zero and term_type == 'P'):
+        # 指向第一个阻抗为 0 的元件值
+        position = next(position for kind, content, position in tokens
+                        if kind == 'value' and content[0] == 0 and content[1] in 'on')
+        if degenerate:
+            problems.append((start + position, "并联的两侧阻抗都为 0（0/0）"))
+        else:
+            problems.append((start + position, "并联项的阻抗为 0（短路），1/Z 无穷大"))
+    return problems
+
+
+def _check_syntax(text: str):
+    """检查去掉空白的值字符串，返回 ([(位置, 说明)], [(位置, 文件名, 项类型)])"""
+    diagnostics, files = [], []
+    depth = 0
+    start = 0
+    terms = []
+    for i, ch in enumerate(text):
+        if ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+            if depth < 0:
+                return [(i, "多余的右括号")], []
+        elif ch == '+' and depth == 0:
+            terms.append((start, i))
+            start = i + 1
+    if depth != 0:
+        return [(len(text), "括号不匹配，缺少右括号")], []
+    if not text:
+        return [], []
+    terms.append((start, len(text)))
+
+    for start, end in terms:
+        term = text[start:end]
+        if not term:
+            diagnostics.append((start, "级联的 + 号之间缺少 S(...) 或 P(...) 项"))
+            continue
+        if term[:2] not in ('S(', 'P(', 'T(') or not term.endswith(')'):
+            diagnostics.append((start, f"{term} 不是 S(...)、P(...) 或 T(文件.s2p) 形式"))
+            continue
+        inner = term[2:-1]
+        if is_file_reference(inner):
+            files.append((start + 2, inner, term[0]))
+        elif term[0] == 'T':
+            diagnostics.append((start + 2, "T(...) 只能引用 2 端口 Touchstone 文件（.s2p）"))
+        elif not inner:
+            diagnostics.append((start + 2, "括号内缺少元件值"))
+        else:
+            diagnostics.extend(_check_circuit(text, start + 2, end - 1, term[0]))
+    return diagnostics, files
+
+
+def _check_file(name: str, term_type: str):
+    """检查引用的 Touchstone 文件：端口数是否与项类型相符、能否找到并解析。通过时返回 None"""
+    ports = port_count_from_path(name)
+    required = 2 if term_type == 'T' else 1
+    if ports != required:
+        return f"{term_type}(...) 需要 {required} 端口文件，{name} 为 {ports} 端口"
+    try:
+        load_touchstone(name)
+    except (ValueError, OSError) as e:
+        return str(e)
+    return None
+
+
+def validate_expression(value: str, element_type: str = '元件') -> Tuple[Diagnostic, ...]:
+    """检查一行的类型和值字符串，返回诊断元组（空元组表示有效）
+
+    语法检查的结果按 (类型, 值字符串) 缓存（最近用过的 SYNTAX_CACHE_SIZE 个），同一字符串只检查一次；
+    引用的 Touchstone 文件可能在之后被添加或修改，每次调用都重新查找（文件内容本身由 touchstone 缓存）。
+    位置对应原字符串（含空白）。
+    """
+    value = value or ''
+    syntax, files = _cached_syntax(element_type, value)
+    problems = list(syntax)
+    for position, name, term_type in files:
+        message = _check_file(name, term_type)
+        if message:
+            problems.append((position, message))
+    if not problems:
+        return ()
+    # 去空白字符串中的位置换算为原字符串中的位置
+    original = [i for i, ch in enumerate(value) if not ch.isspace()]
+    return tuple(Diagnostic(original[p] if p < len(original) else len(value), message) for p, message in problems)
+
+
+@lru_cache(maxsize=SYNTAX_CACHE_SIZE)
+def _cached_syntax(element_type: str, value: str):
+    """(语法诊断, 文件引用)，按 (类型, 值字符串) 缓存"""
+    if element_type not in ELEMENT_TYPES:
+        return [(0, f"未知的类型 {element_type}")], []
+    return _check_syntax(re.sub(r'\s+', '', value))
+
+
+def format_diagnostics(diagnostics) -> str:
+    """诊断的多行文字说明，用于提示和日志"""
+    return "\n".join(str(diagnostic) for diagnostic in diagnostics)
+
+
+def clear_cache():
+    _cached_syntax.cache_clear()